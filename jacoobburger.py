@@ -1,12 +1,37 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog, simpledialog
+import argparse
 import datetime
 import os
 import json
+import re
 import calendar
+import csv
 import random
+import threading
+import time
+import sqlite3
+import mmap
+import struct
+import bisect
+import math
+import itertools
+import shutil
+import hashlib
+import base64
+import uuid
+import tempfile
+import tracemalloc
+import zipfile
+import gzip
+import lzma
+import zlib
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from collections.abc import MutableMapping
 from functools import lru_cache
-from typing import Dict, List, Any, Optional, Tuple, Union, Set
+from typing import Dict, List, Any, Optional, Tuple, Union, Set, Iterator, Iterable
 import sys
 
 # Check for required dependencies
@@ -67,21 +92,479 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import customtkinter as ctk
 
+# Optional serializers for persisted files
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Vectorized aggregates over history columns; plain loops are used without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Advisory file locking for data shared between processes (fcntl on POSIX, msvcrt on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+class SymbolTable:
+    """Food, category and exercise names interned as small integer ids.
+    
+    Ids only exist in memory (entries are saved and cached with their names), so
+    one table is shared by every data manager in the process.
+    """
+    
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self._lock = threading.Lock()
+    
+    def intern(self, name: str) -> int:
+        """Id of a name, assigning the next one the first time it is seen."""
+        symbol = self.ids.get(name)
+        if symbol is None:
+            with self._lock:
+                symbol = self.ids.get(name)
+                if symbol is None:
+                    symbol = len(self.names)
+                    self.names.append(name)
+                    self.ids[name] = symbol
+        return symbol
+    
+    def lookup(self, name: str) -> Optional[int]:
+        """Id of a name, or None if no entry ever used it."""
+        return self.ids.get(name)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+SYMBOLS = SymbolTable()
+
+
+class DayOrdinals:
+    """Cached two-way conversion between "YYYY-MM-DD" dates and date.toordinal() day numbers.
+    
+    Range helpers work on ordinals, so stepping through days is integer arithmetic and
+    strings are only made where a day is read from or written to history.
+    """
+    
+    def __init__(self):
+        self._ordinals = {}
+        self._dates = {}
+    
+    def ordinal(self, date: str) -> int:
+        """Day number of a date string."""
+        ordinal = self._ordinals.get(date)
+        if ordinal is None:
+            day = datetime.date.fromisoformat(date)
+            ordinal = day.toordinal()
+            self._ordinals[date] = ordinal
+            self._dates[ordinal] = day.isoformat()
+        return ordinal
+    
+    def date(self, ordinal: int) -> str:
+        """Date string of a day number."""
+        date = self._dates.get(ordinal)
+        if date is None:
+            date = datetime.date.fromordinal(ordinal).isoformat()
+            self._dates[ordinal] = date
+            self._ordinals[date] = ordinal
+        return date
+    
+    @staticmethod
+    def today() -> int:
+        """Day number of the local date."""
+        return datetime.date.today().toordinal()
+    
+    @staticmethod
+    def week_start(ordinal: int) -> int:
+        """Day number of the Monday on or before a day (ordinal 1 is a Monday)."""
+        return ordinal - (ordinal - 1) % 7
+    
+    @staticmethod
+    def weekday_name(ordinal: int) -> str:
+        """Abbreviated weekday name, as strftime("%a") gives it."""
+        return calendar.day_abbr[(ordinal - 1) % 7]
+
+
+DAYS = DayOrdinals()
+
+# Marks an entry field that is not set
+_UNSET = object()
+
+
+class Entry(MutableMapping):
+    """One logged item, stored in __slots__ but read and written like the dict it is saved as.
+    
+    FIELDS are the slots, in saved key order. An unset slot is a missing key, and keys
+    outside FIELDS go to a small overflow dict, so to_dict() gives back what was loaded.
+    Names in SYMBOL_FIELDS are kept as ids from the symbol table and only turned back
+    into strings when read through the mapping interface.
+    """
+    
+    __slots__ = ("_extra",)
+    FIELDS = ()
+    SYMBOL_FIELDS = ()
+    symbols = SYMBOLS
+    
+    def __init__(self, data: Optional[Dict[str, Any]] = None, **fields):
+        for source in (data or {}, fields):
+            for key, value in source.items():
+                if key in self.FIELDS and key not in self.SYMBOL_FIELDS:
+                    setattr(self, key, value)
+                else:
+                    self[key] = value
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Entry":
+        """Record for a decoded entry; records are returned as they are."""
+        return data if isinstance(data, cls) else cls(data)
+    
+    def symbol(self, key: str) -> Optional[int]:
+        """Id of a name field, for counting and grouping without the strings (None if unset)."""
+        return getattr(self, key, None)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The entry in its JSON layout."""
+        data = {key: value for key in self.FIELDS if (value := getattr(self, key, _UNSET)) is not _UNSET}
+        for key in self.SYMBOL_FIELDS:
+            if data.get(key) is not None:
+                data[key] = self.symbols.names[data[key]]
+        extra = getattr(self, "_extra", None)
+        if extra:
+            data.update(extra)
+        return data
+    
+    # Faster than the MutableMapping defaults, which go through __getitem__ and exceptions
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.FIELDS:
+            value = getattr(self, key, _UNSET)
+            if value is not _UNSET:
+                if value is not None and key in self.SYMBOL_FIELDS:
+                    return self.symbols.names[value]
+                return value
+        extra = getattr(self, "_extra", None)
+        return default if extra is None else extra.get(key, default)
+    
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        value = self.get(key, _UNSET)
+        if value is _UNSET:
+            self[key] = value = default
+        return value
+    
+    def __contains__(self, key) -> bool:
+        if key in self.FIELDS and hasattr(self, key):
+            return True
+        extra = getattr(self, "_extra", None)
+        return extra is not None and key in extra
+    
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _UNSET)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.SYMBOL_FIELDS:
+            extra = getattr(self, "_extra", None)
+            if extra:
+                extra.pop(key, None)
+            if isinstance(value, str):
+                setattr(self, key, self.symbols.intern(value))
+                return
+            if value is not None:
+                # Not a name, so it is kept aside rather than mistaken for an id
+                if hasattr(self, key):
+                    delattr(self, key)
+                self._set_extra(key, value)
+                return
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            self._set_extra(key, value)
+    
+    def __delitem__(self, key: str) -> None:
+        if key in self.FIELDS and hasattr(self, key):
+            delattr(self, key)
+            return
+        try:
+            del self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def __iter__(self):
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        yield from getattr(self, "_extra", ())
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __reduce__(self):
+        return type(self), (self.to_dict(),)
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+    
+    def _set_extra(self, key: str, value: Any) -> None:
+        try:
+            self._extra[key] = value
+        except AttributeError:
+            self._extra = {key: value}
+
+
+class FoodEntry(Entry):
+    """A logged food."""
+    
+    FIELDS = ("food", "amount", "calories", "category", "kyle_tax", "id")
+    SYMBOL_FIELDS = ("food", "category")
+    __slots__ = FIELDS
+
+
+class ExerciseEntry(Entry):
+    """A logged exercise."""
+    
+    FIELDS = ("exercise", "duration", "calories_burnt", "id")
+    SYMBOL_FIELDS = ("exercise",)
+    __slots__ = FIELDS
+
+
 # Type aliases for better code readability
-FoodEntry = Dict[str, Any]
-ExerciseEntry = Dict[str, Any]
 DayData = Dict[str, Any]
 History = Dict[str, DayData]
 Achievement = Dict[str, Any]
 Challenge = Dict[str, Any]
 
 
+def as_entry_records(day_data: DayData) -> DayData:
+    """Turn the food and exercise dicts of a decoded day into entry records, in place."""
+    if isinstance(day_data, dict):
+        for key, entry_class in (("food", FoodEntry), ("exercise", ExerciseEntry)):
+            entries = day_data.get(key)
+            if entries:
+                day_data[key] = [entry_class.from_dict(entry) for entry in entries]
+    return day_data
+
+
+def entry_symbol(entry: Union[Entry, Dict[str, Any]], key: str) -> Optional[int]:
+    """Symbol id of a name field of a record or of a still undecoded dict entry."""
+    if isinstance(entry, Entry):
+        return entry.symbol(key)
+    value = entry.get(key)
+    return SYMBOLS.intern(value) if isinstance(value, str) else None
+
+
+def encode_entry(obj: Any) -> Dict[str, Any]:
+    """default= hook of the serializers: entry records are saved as plain dicts."""
+    if isinstance(obj, Entry):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class JsonCodec:
+    """Serializer for persisted files; pretty-printed stdlib JSON unless indent is None."""
+    
+    family = "json"
+    # Strings (so braces inside them are skipped) and structural brackets
+    TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+    
+    def __init__(self, name: str = "json", indent: Optional[int] = 4):
+        self.name = name
+        self.indent = indent
+        # Built once; json.dumps would build a new encoder per call for these options
+        if indent is None:
+            self._encoder = json.JSONEncoder(separators=(",", ":"), default=encode_entry)
+        else:
+            self._encoder = json.JSONEncoder(indent=indent, default=encode_entry)
+    
+    @property
+    def available(self) -> bool:
+        return True
+    
+    def dumps(self, obj: Any) -> bytes:
+        """Encode a whole file."""
+        return self._encoder.encode(obj).encode("utf-8")
+    
+    def loads(self, data: bytes) -> Any:
+        """Decode a whole file or a single value."""
+        return json.loads(data)
+    
+    def dumps_value(self, obj: Any) -> bytes:
+        """Encode one value of a top-level map, indented to sit inside it."""
+        if self.indent is None:
+            return self.dumps(obj)
+        return self.dumps(obj).replace(b"\n", b"\n" + b" " * self.indent)
+    
+    def write_map(self, f, items: Iterable[Tuple[str, bytes]], count: int) -> Dict[str, Tuple[int, int]]:
+        """Write a top-level map of already encoded values; returns their byte ranges."""
+        offsets = {}
+        pad = b"" if self.indent is None else b"\n" + b" " * self.indent
+        separator = b":" if self.indent is None else b": "
+        f.write(b"{")
+        for i, (key, value) in enumerate(items):
+            f.write((b"," if i else b"") + pad + json.dumps(key).encode("utf-8") + separator)
+            offsets[key] = (f.tell(), len(value))
+            f.write(value)
+        f.write((b"\n" if pad else b"") + b"}")
+        return offsets
+    
+    def scan_map(self, f) -> Dict[str, Tuple[int, int]]:
+        """Find the byte range of every top-level value in one pass, without decoding them."""
+        offsets = {}
+        if os.fstat(f.fileno()).st_size == 0:
+            return offsets
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            depth = 0
+            key = None
+            value_start = 0
+            for match in self.TOKEN.finditer(data):
+                token = match.group()
+                if token[:1] == b'"':
+                    if depth == 1:
+                        if key is None:
+                            key = json.loads(token)
+                        else:
+                            offsets[key] = (match.start(), len(token))
+                            key = None
+                elif token in (b"{", b"["):
+                    if depth == 0 and token != b"{":
+                        raise ValueError("file does not hold a JSON object")
+                    if depth == 1:
+                        value_start = match.start()
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 1:
+                        offsets[key] = (value_start, match.end() - value_start)
+                        key = None
+        return offsets
+
+
+class OrjsonCodec(JsonCodec):
+    """Compact JSON through orjson, when it is installed."""
+    
+    def __init__(self, name: str = "orjson"):
+        super().__init__(name, indent=None)
+    
+    @property
+    def available(self) -> bool:
+        return orjson is not None
+    
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=encode_entry)
+    
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    """Binary MessagePack, when msgpack is installed."""
+    
+    family = "msgpack"
+    
+    def __init__(self, name: str = "msgpack"):
+        self.name = name
+    
+    @property
+    def available(self) -> bool:
+        return msgpack is not None
+    
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True, default=encode_entry)
+    
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+    
+    def dumps_value(self, obj: Any) -> bytes:
+        return self.dumps(obj)
+    
+    def write_map(self, f, items: Iterable[Tuple[str, bytes]], count: int) -> Dict[str, Tuple[int, int]]:
+        """Write a map32 header followed by the key/value pairs; returns the value byte ranges."""
+        offsets = {}
+        f.write(b"\xdf" + struct.pack(">I", count))
+        for key, value in items:
+            f.write(self.dumps(key))
+            offsets[key] = (f.tell(), len(value))
+            f.write(value)
+        return offsets
+    
+    def scan_map(self, f) -> Dict[str, Tuple[int, int]]:
+        """Skip over every value of the top-level map, recording where each one sits."""
+        offsets = {}
+        if os.fstat(f.fileno()).st_size == 0:
+            return offsets
+        unpacker = msgpack.Unpacker(f, raw=False)
+        for _ in range(unpacker.read_map_header()):
+            key = unpacker.unpack()
+            start = unpacker.tell()
+            unpacker.skip()
+            offsets[key] = (start, unpacker.tell() - start)
+        return offsets
+
+
+# Serializers selectable for persisted files; any of them reads the others' output
+CODECS = {
+    "json": JsonCodec("json"),
+    "compact": JsonCodec("compact", indent=None),
+    "orjson": OrjsonCodec("orjson"),
+    "msgpack": MsgpackCodec("msgpack")
+}
+
+
+def get_codec(name: str) -> Union[JsonCodec, MsgpackCodec]:
+    """Look up a codec by name, falling back to pretty JSON when its library is missing."""
+    codec = CODECS.get(name)
+    if codec is None or not codec.available:
+        print(f"Codec '{name}' is not available, using json")
+        return CODECS["json"]
+    return codec
+
+
+def detect_codec(head: bytes) -> Union[JsonCodec, MsgpackCodec]:
+    """Pick the codec to decode a file with from its first byte."""
+    if head[:1] in (b"\xde", b"\xdf") or (head and 0x80 <= head[0] <= 0x8f):
+        if msgpack is None:
+            raise ValueError("file is MessagePack but msgpack is not installed")
+        return CODECS["msgpack"]
+    return CODECS["orjson"] if orjson is not None else CODECS["json"]
+
+
+def read_data_file(path: str) -> Any:
+    """Read a persisted file written with any codec."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return detect_codec(data).loads(data)
+
+
+def write_data_file(path: str, obj: Any, codec: Union[JsonCodec, MsgpackCodec]) -> None:
+    """Atomically replace a persisted file."""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(codec.dumps(obj))
+    os.replace(tmp_file, path)
+
+
 class GamificationManager:
     """Class to handle gamification features including achievements, challenges, and rewards."""
     
     def __init__(self, data_manager):
         self.data_manager = data_manager
-        self.gamification_file = "burger_tracker_gamification.json"
+        self.gamification_file = os.path.join(data_manager.data_dir, "burger_tracker_gamification.json")
         
         # Initialize gamification data
         self.data = self.load_gamification_data()
@@ -98,10 +581,12 @@ class GamificationManager:
     
     def load_gamification_data(self) -> Dict[str, Any]:
         """Load gamification data from file."""
+        cached = self.data_manager.state_cache.get("gamification", [self.gamification_file])
+        if cached is not None:
+            return cached
         if os.path.exists(self.gamification_file):
             try:
-                with open(self.gamification_file, "r") as f:
-                    data = json.load(f)
+                data = self.data_manager.read_data_file(self.gamification_file)
                 return data
             except Exception as e:
                 print(f"Failed to load gamification data: {e}")
@@ -126,9 +611,12 @@ class GamificationManager:
     
     def save_gamification_data(self) -> bool:
         """Save gamification data to file."""
+        if self.data_manager.readonly:
+            return True
         try:
-            with open(self.gamification_file, "w") as f:
-                json.dump(self.data, f, indent=4)
+            self.data_manager.write_data_file(self.gamification_file, self.data)
+            # Picked up by the state cache when the data manager closes
+            self.data_manager.state_cache.put("gamification", [self.gamification_file], self.data)
             return True
         except Exception as e:
             print(f"Failed to save gamification data: {e}")
@@ -315,11 +803,10 @@ class GamificationManager:
         
         # Check if we need to update the last login streak
         if "last_login_date" in self.data:
-            last_date = datetime.datetime.strptime(self.data["last_login_date"], "%Y-%m-%d")
-            today_date = datetime.datetime.strptime(today, "%Y-%m-%d")
+            days_since = DAYS.ordinal(today) - DAYS.ordinal(self.data["last_login_date"])
             
             # If last login was yesterday, increment streaks
-            if (today_date - last_date).days == 1:
+            if days_since == 1:
                 if self._logged_food_yesterday():
                     self.data["streaks"]["food_logging"] += 1
                 else:
@@ -335,7 +822,7 @@ class GamificationManager:
                 else:
                     self.data["streaks"]["weight_logging"] = 0
             # If more than a day has passed, reset streaks
-            elif (today_date - last_date).days > 1:
+            elif days_since > 1:
                 self.data["streaks"]["food_logging"] = 0
                 self.data["streaks"]["exercise_logging"] = 0
                 self.data["streaks"]["weight_logging"] = 0
@@ -354,8 +841,7 @@ class GamificationManager:
             }
         
         # Check if we need to generate weekly challenges
-        today_date = datetime.datetime.strptime(today, "%Y-%m-%d")
-        week_start = (today_date - datetime.timedelta(days=today_date.weekday())).strftime("%Y-%m-%d")
+        week_start = DAYS.date(DAYS.week_start(DAYS.ordinal(today)))
         
         if week_start not in self.data["weekly_challenges"]:
             # Select 2 random weekly challenges
@@ -391,8 +877,7 @@ class GamificationManager:
     def check_challenges(self) -> Tuple[List[Challenge], List[Challenge]]:
         """Check for completed challenges."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        today_date = datetime.datetime.strptime(today, "%Y-%m-%d")
-        week_start = (today_date - datetime.timedelta(days=today_date.weekday())).strftime("%Y-%m-%d")
+        week_start = DAYS.date(DAYS.week_start(DAYS.ordinal(today)))
         
         newly_completed_daily = []
         newly_completed_weekly = []
@@ -464,8 +949,7 @@ class GamificationManager:
     def get_active_weekly_challenges(self) -> List[Challenge]:
         """Get the active weekly challenges."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        today_date = datetime.datetime.strptime(today, "%Y-%m-%d")
-        week_start = (today_date - datetime.timedelta(days=today_date.weekday())).strftime("%Y-%m-%d")
+        week_start = DAYS.date(DAYS.week_start(DAYS.ordinal(today)))
         
         if week_start not in self.data["weekly_challenges"]:
             self._ensure_daily_challenges()  # This also ensures weekly challenges
@@ -538,58 +1022,31 @@ class GamificationManager:
     
     def _has_food_category(self, category: str) -> bool:
         """Check if user has logged any food in the specified category."""
-        for date, day_data in self.data_manager.history.items():
-            for food in day_data.get("food", []):
-                if food.get("category") == category:
-                    return True
-        return False
+        return len(self.data_manager.get_unique_foods(category)) > 0
     
     def _count_unique_foods_in_category(self, category: str) -> int:
         """Count unique foods logged in a specific category."""
-        unique_foods = set()
-        for date, day_data in self.data_manager.history.items():
-            for food in day_data.get("food", []):
-                if food.get("category") == category:
-                    unique_foods.add(food["food"])
-        return len(unique_foods)
+        return len(self.data_manager.get_unique_foods(category))
     
     def _has_any_exercise(self) -> bool:
         """Check if user has logged any exercise."""
-        for date, day_data in self.data_manager.history.items():
-            if day_data.get("exercise", []):
-                return True
-        return False
+        return len(self.data_manager.get_unique_exercises()) > 0
     
     def _total_calories_burnt(self) -> int:
         """Calculate total calories burnt through exercise."""
-        total = 0
-        for date, day_data in self.data_manager.history.items():
-            for exercise in day_data.get("exercise", []):
-                total += exercise.get("calories_burnt", 0)
-        return total
+        return self.data_manager.get_stats_summary()["total_burned"]
     
     def _has_any_weight_entry(self) -> bool:
         """Check if user has logged any weight entries."""
-        for date, day_data in self.data_manager.history.items():
-            if day_data.get("weight") is not None:
-                return True
-        return False
+        return len(self.data_manager.get_weight_history()) > 0
     
     def _days_under_calorie_goal(self, days: int) -> bool:
         """Check if user stayed under calorie goal for specified consecutive days."""
         # This is a simplified version - would need to track goal history for accuracy
         consecutive_days = 0
-        dates = sorted(self.data_manager.history.keys())
+        daily_net = list(self.data_manager.daily_net_calories().values())
         
-        for i in range(len(dates) - 1, -1, -1):
-            date = dates[i]
-            day_data = self.data_manager.history[date]
-            
-            # Calculate net calories
-            total_in = sum(food.get("calories", 0) for food in day_data.get("food", []))
-            total_out = sum(ex.get("calories_burnt", 0) for ex in day_data.get("exercise", []))
-            net_calories = total_in - total_out
-            
+        for net_calories in reversed(daily_net):
             # Assume goal is 2000 calories (simplified)
             if net_calories <= 2000:
                 consecutive_days += 1
@@ -602,182 +1059,2841 @@ class GamificationManager:
     
     def _has_custom_foods(self) -> bool:
         """Check if user has created any custom foods."""
-        return os.path.exists(self.data_manager.custom_food_file) and os.path.getsize(self.data_manager.custom_food_file) > 2
+        return len(self.data_manager.custom_foods) > 0
     
     def _count_unique_exercises(self) -> int:
         """Count unique exercises logged."""
-        unique_exercises = set()
-        for date, day_data in self.data_manager.history.items():
-            for exercise in day_data.get("exercise", []):
-                unique_exercises.add(exercise["exercise"])
-        return len(unique_exercises)
+        return len(self.data_manager.get_unique_exercises())
     
     def _logged_food_category_today(self, category: str) -> bool:
         """Check if user logged food in specified category today."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
         day_data = self.data_manager.get_day_data(today)
         
-        for food in day_data.get("food", []):
-            if food.get("category") == category:
-                return True
-        return False
+        category_id = self.data_manager.symbols.lookup(category)
+        if category_id is None:
+            return False
+        return any(entry_symbol(food, "category") == category_id for food in day_data.get("food", []))
     
     def _exercise_minutes_today(self) -> float:
         """Calculate total exercise minutes logged today."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        day_data = self.data_manager.get_day_data(today)
-        
-        return sum(ex.get("duration", 0) for ex in day_data.get("exercise", []))
+        return self.data_manager.day_summary(today).minutes
     
     def _logged_weight_today(self) -> bool:
         """Check if user logged weight today."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        day_data = self.data_manager.get_day_data(today)
-        
-        return day_data.get("weight") is not None
+        return self.data_manager.day_summary(today).weight is not None
     
     def _under_calorie_goal_today(self) -> bool:
         """Check if user is under calorie goal today."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        day_data = self.data_manager.get_day_data(today)
-        
-        # Calculate net calories
-        total_in = sum(food.get("calories", 0) for food in day_data.get("food", []))
-        total_out = sum(ex.get("calories_burnt", 0) for ex in day_data.get("exercise", []))
-        net_calories = total_in - total_out
         
         # Assume goal is 2000 calories (simplified)
-        return net_calories <= 2000
+        return self.data_manager.day_summary(today).net_calories <= 2000
     
     def _food_category_variety_today(self) -> int:
         """Count unique food categories logged today."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
         day_data = self.data_manager.get_day_data(today)
         
-        categories = set()
-        for food in day_data.get("food", []):
-            if "category" in food:
-                categories.add(food["category"])
-        
+        categories = {entry_symbol(food, "category") for food in day_data.get("food", []) if "category" in food}
         return len(categories)
     
     def _calories_burnt_today(self) -> int:
         """Calculate calories burnt through exercise today."""
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        day_data = self.data_manager.get_day_data(today)
-        
-        return sum(ex.get("calories_burnt", 0) for ex in day_data.get("exercise", []))
+        return self.data_manager.day_summary(today).calories_burnt
     
     def _logged_food_days_this_week(self) -> int:
         """Count days with food logs this week."""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        today_date = datetime.datetime.strptime(today, "%Y-%m-%d")
-        
-        # Get start of week (Monday)
-        week_start = today_date - datetime.timedelta(days=today_date.weekday())
-        
         days_with_food = 0
-        for i in range(7):
-            date = (week_start + datetime.timedelta(days=i)).strftime("%Y-%m-%d")
-            day_data = self.data_manager.get_day_data(date)
-            
-            if day_data.get("food", []):
+        for date in self._week_dates():
+            if self.data_manager.day_summary(date).foods:
                 days_with_food += 1
                 
         return days_with_food
     
     def _exercise_days_this_week(self) -> int:
         """Count days with exercise logs this week."""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        today_date = datetime.datetime.strptime(today, "%Y-%m-%d")
-        
-        # Get start of week (Monday)
-        week_start = today_date - datetime.timedelta(days=today_date.weekday())
-        
         days_with_exercise = 0
-        for i in range(7):
-            date = (week_start + datetime.timedelta(days=i)).strftime("%Y-%m-%d")
-            day_data = self.data_manager.get_day_data(date)
-            
-            if day_data.get("exercise", []):
+        for date in self._week_dates():
+            if self.data_manager.day_summary(date).exercises:
                 days_with_exercise += 1
                 
         return days_with_exercise
     
     def _days_under_calorie_goal_this_week(self) -> int:
         """Count days under calorie goal this week."""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        today_date = datetime.datetime.strptime(today, "%Y-%m-%d")
-        
-        # Get start of week (Monday)
-        week_start = today_date - datetime.timedelta(days=today_date.weekday())
-        
         days_under_goal = 0
-        for i in range(7):
-            date = (week_start + datetime.timedelta(days=i)).strftime("%Y-%m-%d")
-            day_data = self.data_manager.get_day_data(date)
-            
-            # Calculate net calories
-            total_in = sum(food.get("calories", 0) for food in day_data.get("food", []))
-            total_out = sum(ex.get("calories_burnt", 0) for ex in day_data.get("exercise", []))
-            net_calories = total_in - total_out
-            
+        for date in self._week_dates():
             # Assume goal is 2000 calories (simplified)
-            if net_calories <= 2000:
+            if self.data_manager.day_summary(date).net_calories <= 2000:
                 days_under_goal += 1
                 
         return days_under_goal
     
     def _unique_foods_this_week(self) -> int:
         """Count unique foods logged this week."""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        today_date = datetime.datetime.strptime(today, "%Y-%m-%d")
-        
-        # Get start of week (Monday)
-        week_start = today_date - datetime.timedelta(days=today_date.weekday())
-        
         unique_foods = set()
-        for i in range(7):
-            date = (week_start + datetime.timedelta(days=i)).strftime("%Y-%m-%d")
+        for date in self._week_dates():
             day_data = self.data_manager.get_day_data(date)
             
             for food in day_data.get("food", []):
-                unique_foods.add(food["food"])
+                unique_foods.add(entry_symbol(food, "food"))
                 
         return len(unique_foods)
     
+    def _week_dates(self) -> List[str]:
+        """Dates of the current week, Monday first."""
+        week_start = DAYS.week_start(DAYS.today())
+        return [DAYS.date(ordinal) for ordinal in range(week_start, week_start + 7)]
+    
     def _logged_food_yesterday(self) -> bool:
         """Check if user logged food yesterday."""
-        today = datetime.datetime.now()
-        yesterday = (today - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-        day_data = self.data_manager.get_day_data(yesterday)
+        day_data = self.data_manager.get_day_data(DAYS.date(DAYS.today() - 1))
         
         return len(day_data.get("food", [])) > 0
     
     def _logged_exercise_yesterday(self) -> bool:
         """Check if user logged exercise yesterday."""
-        today = datetime.datetime.now()
-        yesterday = (today - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-        day_data = self.data_manager.get_day_data(yesterday)
+        day_data = self.data_manager.get_day_data(DAYS.date(DAYS.today() - 1))
         
         return len(day_data.get("exercise", [])) > 0
     
     def _logged_weight_yesterday(self) -> bool:
         """Check if user logged weight yesterday."""
-        today = datetime.datetime.now()
-        yesterday = (today - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-        day_data = self.data_manager.get_day_data(yesterday)
+        day_data = self.data_manager.get_day_data(DAYS.date(DAYS.today() - 1))
         
         return day_data.get("weight") is not None
 
 
+class FileLock:
+    """Advisory exclusive lock on a file, shared by every process using the data directory.
+    
+    Re-entrant for the owning thread; other threads of the same process wait on it too.
+    An exclusive lock keeps its file open between acquisitions, so taking it for each
+    change is a single flock call. A shared lock only keeps writers out; it never creates
+    the lock file, and is skipped when the file does not exist (nothing has written
+    there) or on Windows.
+    """
+    
+    def __init__(self, path: str, shared: bool = False):
+        self.path = path
+        self.shared = shared
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+        self._file = None
+    
+    def acquire(self) -> None:
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                if self.shared:
+                    handle = self._open_shared()
+                else:
+                    if self._file is None:
+                        self._file = open(self.path, "a+b")
+                    handle = self._file
+                    if fcntl is not None:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                    elif msvcrt is not None:
+                        handle.seek(0)
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            except Exception:
+                self._lock.release()
+                raise
+            self._handle = handle
+        self._depth += 1
+    
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._handle is not None:
+            if fcntl is not None:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+            if self.shared:
+                self._handle.close()
+            self._handle = None
+        self._lock.release()
+    
+    def close(self) -> None:
+        """Close the kept lock file; the next acquire opens it again."""
+        with self._lock:
+            if self._depth == 0 and self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def _open_shared(self):
+        if fcntl is None:
+            return None
+        try:
+            handle = open(self.path, "rb")
+        except FileNotFoundError:
+            return None
+        fcntl.flock(handle.fileno(), fcntl.LOCK_SH)
+        return handle
+    
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class HistoryJournal:
+    """Append-only log of history mutations, stored as one JSON record per line."""
+    
+    ENCODER = json.JSONEncoder(separators=(",", ":"), default=encode_entry)
+    
+    def __init__(self, journal_file: str):
+        self.journal_file = journal_file
+        self.record_count = 0
+        # How far the file has been read or written, and which file that was (device, inode),
+        # so records appended by other processes can be picked up incrementally
+        self.position = 0
+        self.identity = None
+        self._handle = None
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append a single mutation record to the end of the journal."""
+        self.append_many([record])
+    
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """Append several mutation records with a single write."""
+        if self._handle is None:
+            self._handle = open(self.journal_file, "a", encoding="utf-8")
+            stat = os.fstat(self._handle.fileno())
+            self.identity = (stat.st_dev, stat.st_ino)
+        lines = "".join(self.ENCODER.encode(record) + "\n" for record in records)
+        self._handle.write(lines)
+        self._handle.flush()
+        self.position += len(lines.encode("utf-8"))
+        self.record_count += len(records)
+    
+    def sync(self) -> None:
+        """Force appended records onto disk."""
+        if self._handle is not None:
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+    
+    def dup_fd(self) -> Optional[int]:
+        """Flush and return a duplicate descriptor that can be fsynced after the handle moves on."""
+        if self._handle is None:
+            return None
+        self._handle.flush()
+        return os.dup(self._handle.fileno())
+    
+    def read(self, after_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield records with a sequence number greater than after_seq."""
+        self.record_count = 0
+        if not os.path.exists(self.journal_file):
+            return
+        
+        valid_size = 0
+        with open(self.journal_file, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash, nothing after it is trustworthy
+                    break
+                valid_size += len(line)
+                self.record_count += 1
+                if record.get("seq", 0) > after_seq:
+                    yield record
+        
+        # Cut off the torn tail so new appends are not hidden behind it
+        if valid_size < os.path.getsize(self.journal_file):
+            os.truncate(self.journal_file, valid_size)
+        stat = os.stat(self.journal_file)
+        self.position = valid_size
+        self.identity = (stat.st_dev, stat.st_ino)
+    
+    def read_new(self) -> List[Dict[str, Any]]:
+        """Records other processes appended since the journal was last read or written.
+        
+        If the journal was replaced (another process compacted it) it is read from the start.
+        """
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            self.close()
+            self.position = 0
+            self.identity = None
+            return []
+        
+        if (stat.st_dev, stat.st_ino) != self.identity or stat.st_size < self.position:
+            self.close()
+            self.position = 0
+            self.record_count = 0
+            self.identity = (stat.st_dev, stat.st_ino)
+        if stat.st_size == self.position:
+            return []
+        
+        records = []
+        with open(self.journal_file, "rb") as f:
+            f.seek(self.position)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.position += len(line)
+                self.record_count += 1
+                records.append(record)
+        return records
+    
+    def truncate_through(self, seq: int) -> None:
+        """Drop every record up to and including seq (already folded into a snapshot)."""
+        self.close()
+        
+        kept_lines = []
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if record.get("seq", 0) > seq:
+                        kept_lines.append(line)
+        
+        tmp_file = self.journal_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.writelines(kept_lines)
+        os.replace(tmp_file, self.journal_file)
+        self.record_count = len(kept_lines)
+        stat = os.stat(self.journal_file)
+        self.position = stat.st_size
+        self.identity = (stat.st_dev, stat.st_ino)
+    
+    def close(self) -> None:
+        """Close the append handle; it is reopened lazily on the next append."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class HistoryArchive:
+    """Compressed cold tier for old days: one gzip or lzma file per month or year.
+    
+    A small index of which dates live in which segment is kept next to the segments,
+    so lookups only decompress the segment holding the requested day. Recently used
+    segments stay decompressed in a small LRU cache.
+    """
+    
+    COMPRESSORS = {"gzip": (gzip, ".gz"), "lzma": (lzma, ".xz")}
+    
+    def __init__(self, archive_dir: str, group: str = "month", compression: str = "gzip",
+                 codec: Union[JsonCodec, MsgpackCodec] = CODECS["json"], cache_size: int = 4,
+                 segments: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.archive_dir = archive_dir
+        self.index_file = os.path.join(archive_dir, "index.json")
+        self.group = group
+        self.compression = compression
+        self.codec = codec
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._segments = {}
+        self._date_segments = {}
+        if segments is None:
+            self.reload()
+        else:
+            self.restore(segments)
+    
+    def reload(self) -> None:
+        """Re-read the segment index, e.g. after another process archived days."""
+        segments = {}
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, "r") as f:
+                    segments = json.load(f)["segments"]
+            except Exception as e:
+                print(f"Failed to load history archive index: {e}")
+        self.restore(segments)
+    
+    def state(self) -> Dict[str, Dict[str, Any]]:
+        """The segment index, for the startup cache."""
+        with self._lock:
+            return dict(self._segments)
+    
+    def restore(self, segments: Dict[str, Dict[str, Any]]) -> None:
+        """Use a segment index read earlier instead of the file."""
+        with self._lock:
+            self._cache.clear()
+            self._segments = segments
+            self._date_segments = {}
+            for key, segment in segments.items():
+                for date in segment["dates"]:
+                    self._date_segments[date] = key
+    
+    def segment_key(self, date: str) -> str:
+        """Segment a new day is archived into ("YYYY-MM" or "YYYY")."""
+        return date[:7] if self.group == "month" else date[:4]
+    
+    def has_day(self, date: str) -> bool:
+        """Check the index for a day without decompressing anything."""
+        return date in self._date_segments
+    
+    def dates(self) -> List[str]:
+        """Every archived date, oldest first."""
+        with self._lock:
+            return sorted(self._date_segments)
+    
+    def get_day(self, date: str) -> Optional[DayData]:
+        """Copy of an archived day, or None if it is not archived."""
+        with self._lock:
+            key = self._date_segments.get(date)
+            if key is None:
+                return None
+            day_data = self._load_segment(key).get(date)
+        if day_data is None:
+            return None
+        return {
+            **day_data,
+            "food": list(day_data.get("food", [])),
+            "exercise": list(day_data.get("exercise", [])),
+            "weight": day_data.get("weight")
+        }
+    
+    def add_days(self, days: History, removed: Iterable[str] = ()) -> None:
+        """Merge days into their segments and drop removed ones, rewriting only segments that change."""
+        with self._lock:
+            by_segment = {}
+            for date, day_data in days.items():
+                key = self._date_segments.get(date) or self.segment_key(date)
+                by_segment.setdefault(key, {})[date] = day_data
+            for date in removed:
+                if date in self._date_segments:
+                    by_segment.setdefault(self._date_segments[date], {})[date] = None
+            
+            os.makedirs(self.archive_dir, exist_ok=True)
+            for key, new_days in sorted(by_segment.items()):
+                old_days = self._load_segment(key) if key in self._segments else {}
+                if all(old_days.get(date) == day_data for date, day_data in new_days.items()):
+                    continue
+                segment_days = dict(old_days)
+                segment_days.update(new_days)
+                segment_days = {date: day_data for date, day_data in sorted(segment_days.items())
+                                if day_data is not None}
+                
+                old_name = self._segments.get(key, {}).get("file")
+                for date in old_days:
+                    if date not in segment_days:
+                        del self._date_segments[date]
+                if not segment_days:
+                    if old_name is not None:
+                        os.remove(os.path.join(self.archive_dir, old_name))
+                    del self._segments[key]
+                    self._cache.pop(key, None)
+                    continue
+                
+                module, extension = self.COMPRESSORS[self.compression]
+                name = f"{key}{extension}"
+                tmp_file = os.path.join(self.archive_dir, name + ".tmp")
+                with open(tmp_file, "wb") as f:
+                    f.write(module.compress(self.codec.dumps(segment_days)))
+                os.replace(tmp_file, os.path.join(self.archive_dir, name))
+                
+                if old_name is not None and old_name != name:
+                    os.remove(os.path.join(self.archive_dir, old_name))
+                self._segments[key] = {"file": name, "dates": list(segment_days)}
+                for date in segment_days:
+                    self._date_segments[date] = key
+                self._remember(key, segment_days)
+            
+            self._write_index()
+    
+    def clear(self) -> None:
+        """Delete every segment."""
+        with self._lock:
+            for segment in self._segments.values():
+                path = os.path.join(self.archive_dir, segment["file"])
+                if os.path.exists(path):
+                    os.remove(path)
+            self._segments = {}
+            self._date_segments = {}
+            self._cache.clear()
+            if os.path.exists(self.index_file):
+                os.remove(self.index_file)
+    
+    def _load_segment(self, key: str) -> History:
+        """Decompress a segment, going through the LRU cache."""
+        if key in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        
+        self.cache_misses += 1
+        name = self._segments[key]["file"]
+        module = gzip if name.endswith(".gz") else lzma
+        with open(os.path.join(self.archive_dir, name), "rb") as f:
+            data = module.decompress(f.read())
+        days = detect_codec(data[:1]).loads(data)
+        self._remember(key, days)
+        return days
+    
+    def _remember(self, key: str, days: History) -> None:
+        self._cache[key] = days
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def _write_index(self) -> None:
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"segments": self._segments}, f, separators=(",", ":"))
+        os.replace(tmp_file, self.index_file)
+
+
+class IndexedHistoryFile(MutableMapping):
+    """Lazy date -> day mapping over the history data file, decoding days from a byte-offset index.
+    
+    The index is built with one streaming pass over the file and persisted next to it,
+    so later starts only read it back. Days moved to the optional cold archive are
+    read from there; a day in the data file takes precedence over its archived copy.
+    Writes only update the cache; DataManager persists them through the journal and
+    folds them in on compaction.
+    
+    With a memory budget, decoded days are grouped by month and the least recently used
+    months are dropped once their stored size passes it; they are read again on access.
+    Days changed since the last compaction are pinned until it folds them in. Read-only
+    mode memory-maps the data file and never writes the index.
+    """
+    
+    def __init__(self, data_file: str, index_file: str, codec: Union[JsonCodec, MsgpackCodec] = CODECS["json"],
+                 lock: Optional[threading.RLock] = None, archive: Optional[HistoryArchive] = None,
+                 readonly: bool = False, memory_budget: Optional[int] = None,
+                 state: Optional[Dict[str, Any]] = None):
+        self.data_file = data_file
+        self.index_file = index_file
+        self.codec = codec
+        self.archive = archive
+        self.reader = codec
+        self.lock = lock or threading.RLock()
+        self.readonly = readonly
+        # Bytes of stored day data kept decoded, besides pinned days; None never evicts
+        self.memory_budget = memory_budget
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.evicted_months = 0
+        self.evicted_days = 0
+        self.resident_bytes = 0
+        # Upgrade applied to each day as it is read, for older files that cannot be migrated
+        self.upgrade = None
+        # Called with the dates of each month the memory budget drops
+        self.on_evict = None
+        self.meta = {}
+        self.offsets = {}
+        self.cleared = False
+        self.generation = 0
+        # (device, inode, size, mtime) of the data file the offsets describe
+        self.signature = None
+        self._days = {}
+        # Days changed in memory, which must not be evicted
+        self._pinned = set()
+        # month -> {date: stored size} of the evictable decoded days, least recently used first
+        self._months = OrderedDict()
+        self._handle = None
+        self._map = None
+        
+        if state is not None:
+            self.restore(state)
+        elif os.path.exists(data_file):
+            try:
+                self._open_index()
+            except Exception as e:
+                print(f"Failed to load history: {e}")
+                self.offsets = {}
+                self.meta = {}
+    
+    def state(self, dates: Iterable[str]) -> Dict[str, Any]:
+        """Index and the given in-memory days (None for deleted ones), for the startup cache."""
+        with self.lock:
+            return {"signature": self.signature, "reader": self.reader.name, "meta": self.meta,
+                    "offsets": self.offsets, "cleared": self.cleared,
+                    "days": {date: self._days[date] for date in dates if date in self._days}}
+    
+    def restore(self, state: Dict[str, Any]) -> None:
+        """Take over the index and days saved by state() instead of reading the files."""
+        with self.lock:
+            self.signature = tuple(state["signature"]) if state["signature"] is not None else None
+            self.meta = state["meta"]
+            self.offsets = {date: tuple(span) for date, span in state["offsets"].items()}
+            self.cleared = state["cleared"]
+            self._days = {date: as_entry_records(day_data) for date, day_data in state["days"].items()}
+            self._months = OrderedDict()
+            self.resident_bytes = 0
+            if self.memory_budget is not None:
+                self._pinned = set(self._days)
+            reader = CODECS.get(state["reader"])
+            self.reader = reader if reader is not None and reader.available else self._detect_reader()
+    
+    def changed_on_disk(self) -> bool:
+        """Whether the data file was replaced since it was indexed, e.g. by another process."""
+        return self._stat_signature() != self.signature
+    
+    def reload(self) -> None:
+        """Index the data file again and drop every cached day; only safe with nothing unsaved."""
+        with self.lock:
+            self._close_handle()
+            self._forget_days()
+            self.cleared = False
+            self.generation += 1
+            self.offsets = {}
+            self.meta = {}
+            self.signature = None
+            if self.archive is not None:
+                self.archive.reload()
+            if os.path.exists(self.data_file):
+                try:
+                    self._open_index()
+                except Exception as e:
+                    print(f"Failed to load history: {e}")
+                    self.offsets = {}
+                    self.meta = {}
+    
+    def snapshot(self) -> Dict[str, Union[DayData, Tuple[int, int]]]:
+        """Copies of the cached days plus the byte ranges of days never decoded.
+        
+        Archived days that were not touched stay out; they remain in the archive.
+        """
+        snapshot = {}
+        for date in self._dates():
+            day_data = self._days.get(date)
+            if day_data is None:
+                if date in self.offsets:
+                    snapshot[date] = self.offsets[date]
+            else:
+                snapshot[date] = {
+                    **day_data,
+                    "food": list(day_data.get("food", [])),
+                    "exercise": list(day_data.get("exercise", [])),
+                    "weight": day_data.get("weight")
+                }
+        return snapshot
+    
+    def write_snapshot(self, snapshot: Dict[str, Union[DayData, Tuple[int, int]]],
+                       meta: Dict[str, Any], generation: int, archive_before: Optional[str] = None) -> None:
+        """Write a new data file and its index in one go (see prepare_snapshot and commit_snapshot)."""
+        if not self.commit_snapshot(self.prepare_snapshot(snapshot, meta, archive_before), generation):
+            raise ValueError(f"{self.data_file} was replaced while the snapshot was written")
+    
+    def prepare_snapshot(self, snapshot: Dict[str, Union[DayData, Tuple[int, int]]],
+                         meta: Dict[str, Any], archive_before: Optional[str] = None) -> Dict[str, Any]:
+        """Encode a new data file into a temporary file of this process, with the configured codec.
+        
+        Undecoded days are copied as raw bytes when the old file uses the same codec family.
+        Days dated before archive_before are left out for commit_snapshot() to archive.
+        Nothing other readers use is touched, so no file lock is needed.
+        """
+        with self.lock:
+            signature = self.signature
+            reader = self.reader
+        fd, tmp_file = tempfile.mkstemp(prefix=os.path.basename(self.data_file) + ".", suffix=".tmp",
+                                        dir=os.path.dirname(self.data_file) or ".")
+        os.close(fd)
+        source = open(self.data_file, "rb") if os.path.exists(self.data_file) else None
+        if source is not None:
+            shutil.copymode(self.data_file, tmp_file)
+        
+        cold = {}
+        if self.archive is not None and archive_before is not None:
+            cold = {date: snapshot.pop(date) for date in [date for date in snapshot if date < archive_before]}
+        
+        def encoded_items():
+            for date, day_data in itertools.chain(snapshot.items(), [("__meta__", meta)]):
+                if isinstance(day_data, tuple):
+                    source.seek(day_data[0])
+                    value = source.read(day_data[1])
+                    if reader.family != self.codec.family:
+                        value = self.codec.dumps_value(reader.loads(value))
+                else:
+                    value = self.codec.dumps_value(day_data)
+                yield date, value
+        
+        try:
+            with open(tmp_file, "wb") as f:
+                offsets = self.codec.write_map(f, encoded_items(), len(snapshot) + 1)
+        except Exception:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        finally:
+            if source is not None:
+                source.close()
+        del offsets["__meta__"]
+        return {"tmp_file": tmp_file, "offsets": offsets, "meta": meta, "cold": cold, "signature": signature}
+    
+    def commit_snapshot(self, prepared: Dict[str, Any], generation: int) -> bool:
+        """Archive the cold days and swap in a prepared data file; must hold the file lock.
+        
+        Returns False, dropping the prepared file, if the data file was replaced since it
+        was prepared (another process compacted first).
+        """
+        tmp_file = prepared["tmp_file"]
+        with self.lock:
+            if self.signature != prepared["signature"] or self.changed_on_disk():
+                os.remove(tmp_file)
+                return False
+        
+        if self.archive is not None:
+            cold = {date: self.read_span(day_data) if isinstance(day_data, tuple) else day_data
+                    for date, day_data in prepared["cold"].items()}
+            with self.lock:
+                removed = [date for date, day_data in self._days.items()
+                           if day_data is None and self.archive.has_day(date)]
+            if cold or removed:
+                # Archive before the data file drops them, so a crash leaves a copy in both
+                self.archive.add_days(cold, removed)
+        
+        with self.lock:
+            self._close_handle()
+            os.replace(tmp_file, self.data_file)
+            self.signature = self._stat_signature()
+            self.reader = self._detect_reader()
+            self.offsets = prepared["offsets"]
+            self.meta = prepared["meta"]
+            if self.generation == generation:
+                self.cleared = False
+            self._write_index()
+        return True
+    
+    def iter_days(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Tuple[str, DayData]]:
+        """Yield (date, day) in date order; days not already cached are decoded without caching them."""
+        for date in sorted(self._dates()):
+            if (start is not None and date < start) or (end is not None and date > end):
+                continue
+            with self.lock:
+                day_data = self._days.get(date)
+                if day_data is None:
+                    if date in self.offsets and not self.cleared:
+                        day_data = self._read_day(date)
+                    elif self.archive is not None:
+                        day_data = self.archive.get_day(date)
+            if day_data is not None:
+                yield date, day_data
+    
+    def release_days(self) -> None:
+        """Forget decoded days so they are read from the file again; only safe with nothing unsaved."""
+        with self.lock:
+            self._forget_days()
+    
+    def close(self) -> None:
+        """Close the data file handle."""
+        with self.lock:
+            self._close_handle()
+    
+    def __getitem__(self, date: str) -> DayData:
+        with self.lock:
+            if date in self._days:
+                self.cache_hits += 1
+                if date[:7] in self._months:
+                    self._months.move_to_end(date[:7])
+            else:
+                if self.cleared:
+                    raise KeyError(date)
+                if date in self.offsets:
+                    self._days[date] = as_entry_records(self._read_day(date))
+                elif self.archive is not None and self.archive.has_day(date):
+                    self._days[date] = as_entry_records(self.archive.get_day(date))
+                else:
+                    raise KeyError(date)
+                self.cache_misses += 1
+                if self.memory_budget is not None:
+                    self._track(date, self._days[date])
+                    self._evict()
+            
+            day_data = self._days[date]
+            if day_data is None:
+                raise KeyError(date)
+            return day_data
+    
+    def __contains__(self, date) -> bool:
+        if date in self._days:
+            return self._days[date] is not None
+        if self.cleared:
+            return False
+        return date in self.offsets or (self.archive is not None and self.archive.has_day(date))
+    
+    def __setitem__(self, date: str, day_data: DayData) -> None:
+        self._days[date] = day_data
+        self.pin(date)
+    
+    def __delitem__(self, date: str) -> None:
+        if date not in self:
+            raise KeyError(date)
+        self._days[date] = None
+        self.pin(date)
+    
+    def pin(self, date: str) -> None:
+        """Keep a day changed in place in memory; a memory budget would otherwise evict it."""
+        with self.lock:
+            if self.memory_budget is not None and date in self._days:
+                self._untrack(date)
+                self._pinned.add(date)
+    
+    def unpin(self, dates: Iterable[str]) -> None:
+        """Let days a compaction wrote to the data file be evicted again."""
+        with self.lock:
+            for date in dates:
+                if date not in self._pinned:
+                    continue
+                self._pinned.discard(date)
+                day_data = self._days.get(date)
+                if day_data is not None:
+                    self._track(date, day_data)
+                elif date not in self.offsets and not (self.archive is not None and self.archive.has_day(date)):
+                    # Deleted and no longer stored anywhere, so the marker is not needed
+                    self._days.pop(date, None)
+            if self.memory_budget is not None:
+                self._evict()
+    
+    def memory_stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters of the decoded-day cache."""
+        with self.lock:
+            return {"budget": self.memory_budget, "resident_bytes": self.resident_bytes,
+                    "resident_months": len(self._months), "decoded_days": len(self._days),
+                    "pinned_days": len(self._pinned), "hits": self.cache_hits, "misses": self.cache_misses,
+                    "evicted_months": self.evicted_months, "evicted_days": self.evicted_days}
+    
+    def _track(self, date: str, day_data: DayData) -> None:
+        """Count a decoded day against the budget, by its stored size."""
+        if date in self.offsets:
+            size = self.offsets[date][1]
+        else:
+            size = len(self.codec.dumps(day_data))
+        month = self._months.setdefault(date[:7], {})
+        self._months.move_to_end(date[:7])
+        self.resident_bytes += size - month.get(date, 0)
+        month[date] = size
+    
+    def _untrack(self, date: str) -> None:
+        month = self._months.get(date[:7])
+        if month is not None and date in month:
+            self.resident_bytes -= month.pop(date)
+            if not month:
+                del self._months[date[:7]]
+    
+    def _evict(self) -> None:
+        """Drop the least recently used months past the budget, always keeping the latest one."""
+        while self.resident_bytes > self.memory_budget and len(self._months) > 1:
+            _, month = self._months.popitem(last=False)
+            for date, size in month.items():
+                del self._days[date]
+                self.resident_bytes -= size
+            self.evicted_months += 1
+            self.evicted_days += len(month)
+            if self.on_evict is not None:
+                self.on_evict(list(month))
+    
+    def _forget_days(self) -> None:
+        self._days = {}
+        self._pinned = set()
+        self._months = OrderedDict()
+        self.resident_bytes = 0
+    
+    def __iter__(self):
+        return iter(self._dates())
+    
+    def __len__(self) -> int:
+        return len(self._dates())
+    
+    def clear(self) -> None:
+        self._forget_days()
+        self.cleared = True
+        self.generation += 1
+        # The journal's delete_all record keeps the data file consistent with this
+        if self.archive is not None:
+            self.archive.clear()
+    
+    def _dates(self) -> List[str]:
+        """Archived dates, then dates of the data file in file order, then days added since."""
+        dates = {}
+        if not self.cleared:
+            if self.archive is not None:
+                dates = dict.fromkeys(self.archive.dates())
+            dates.update(dict.fromkeys(self.offsets))
+        for date, day_data in self._days.items():
+            if day_data is None:
+                dates.pop(date, None)
+            else:
+                dates[date] = None
+        return list(dates)
+    
+    def loaded_days(self) -> Dict[str, Optional[DayData]]:
+        """Days held in memory (decoded or changed), with None for deleted ones."""
+        with self.lock:
+            return dict(self._days)
+    
+    def read_span(self, span: Tuple[int, int]) -> DayData:
+        """Decode the day stored at a byte range of the current data file."""
+        with self.lock:
+            return self._read_span(*span)
+    
+    def _read_day(self, date: str) -> DayData:
+        """Decode one day exactly as stored; older schemas are upgraded by DataManager."""
+        return self._read_span(*self.offsets[date])
+    
+    def _read_span(self, offset: int, length: int) -> DayData:
+        if self.readonly:
+            if self._map is None:
+                self._handle = open(self.data_file, "rb")
+                self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+            day_data = self.reader.loads(self._map[offset:offset + length])
+        else:
+            if self._handle is None:
+                self._handle = open(self.data_file, "rb")
+            self._handle.seek(offset)
+            day_data = self.reader.loads(self._handle.read(length))
+        return self.upgrade(day_data) if self.upgrade is not None else day_data
+    
+    def _open_index(self) -> None:
+        """Use the persisted index if it matches the data file, otherwise rebuild it."""
+        stat = os.stat(self.data_file)
+        self.signature = self._stat_signature()
+        self.reader = self._detect_reader()
+        try:
+            with open(self.index_file, "r") as f:
+                index = json.load(f)
+            if index["size"] == stat.st_size and index["mtime_ns"] == stat.st_mtime_ns:
+                self.offsets = {date: tuple(span) for date, span in index["days"].items()}
+                self.meta = index["meta"]
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        with open(self.data_file, "rb") as f:
+            self.offsets = self.reader.scan_map(f)
+            self.meta = {}
+            if "__meta__" in self.offsets:
+                offset, length = self.offsets.pop("__meta__")
+                f.seek(offset)
+                self.meta = self.reader.loads(f.read(length))
+        self._write_index()
+    
+    def _stat_signature(self) -> Optional[Tuple[int, int, int, int]]:
+        try:
+            stat = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    
+    def _detect_reader(self) -> Union[JsonCodec, MsgpackCodec]:
+        """Codec matching the data file on disk."""
+        with open(self.data_file, "rb") as f:
+            return detect_codec(f.read(1))
+    
+    def _write_index(self) -> None:
+        """Persist the index, stamped with the size and mtime of the data file it describes."""
+        if self.readonly:
+            return
+        stat = os.stat(self.data_file)
+        index = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "meta": self.meta, "days": self.offsets}
+        try:
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(index, f, separators=(",", ":"))
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"Failed to write history index: {e}")
+    
+    def _close_handle(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class DaySummary:
+    """Totals of one day, computed in one pass over its entries.
+    
+    DataManager.day_summary() caches these per date and drops a date's summary when a
+    mutation touches it, so per-day readers do not walk the entries again.
+    """
+    
+    __slots__ = ("calories_in", "calories_in_raw", "calories_in_all_taxed", "calories_burnt",
+                 "minutes", "foods", "exercises", "categories", "weight")
+    
+    def __init__(self, day_data: DayData):
+        # Calories in with the Kyle Tax on flagged entries, without it, and on every entry
+        self.calories_in = self.calories_in_raw = self.calories_in_all_taxed = 0
+        self.calories_burnt = self.minutes = 0
+        self.foods = self.exercises = 0
+        self.weight = day_data.get("weight")
+        
+        # Grouped by category symbol id, then keyed by name (missing is "Uncategorized")
+        categories = {}
+        for entry in day_data.get("food", []):
+            calories = entry["calories"]
+            taxed = int(calories * 0.85)
+            self.calories_in += taxed if entry.get("kyle_tax", False) else calories
+            self.calories_in_raw += calories
+            self.calories_in_all_taxed += taxed
+            self.foods += 1
+            category = entry_symbol(entry, "category") if "category" in entry else SYMBOLS.intern("Uncategorized")
+            categories[category] = categories.get(category, 0) + calories
+        self.categories = {}
+        for category, calories in categories.items():
+            name = None if category is None else SYMBOLS.names[category]
+            self.categories[name] = self.categories.get(name, 0) + calories
+        
+        for exercise in day_data.get("exercise", []):
+            self.calories_burnt += exercise.get("calories_burnt", 0)
+            self.minutes += exercise.get("duration", 0)
+            self.exercises += 1
+    
+    @property
+    def net_calories(self) -> int:
+        """Raw calories in minus calories burnt."""
+        return self.calories_in_raw - self.calories_burnt
+    
+    def totals(self) -> Dict[str, Any]:
+        """The numbers in the sidecar's per-day format."""
+        return {"in": self.calories_in, "in_raw": self.calories_in_raw, "out": self.calories_burnt,
+                "minutes": self.minutes, "foods": self.foods, "exercises": self.exercises,
+                "categories": dict(self.categories), "weight": self.weight}
+
+
+class DayTotalsIndex:
+    """Sidecar of per-day totals for the data file and the archive, so summaries need not parse entries.
+    
+    It is stamped with CRC32 checksums of the data file and the archive index and ignored
+    when either no longer matches; compaction rewrites it along with the data file.
+    """
+    
+    def __init__(self, path: str, data_file: str, archive_index_file: str,
+                 codec: Union[JsonCodec, MsgpackCodec] = CODECS["json"]):
+        self.path = path
+        self.data_file = data_file
+        self.archive_index_file = archive_index_file
+        self.codec = codec
+        self.days = {}
+        self.valid = False
+    
+    @staticmethod
+    def day_totals(day_data: DayData) -> Dict[str, Any]:
+        """Summary numbers of one day, as kept in the sidecar."""
+        return DaySummary(day_data).totals()
+    
+    def load(self) -> bool:
+        """Read the sidecar; True if it matches the files it describes."""
+        self.days = {}
+        self.valid = False
+        try:
+            sidecar = read_data_file(self.path)
+            if sidecar["checksums"] == self._checksums():
+                self.days = sidecar["days"]
+                self.valid = True
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Failed to load history totals: {e}")
+        return self.valid
+    
+    def restore(self, days: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        """Use totals already checked against the files; None marks the sidecar as stale."""
+        self.days = days or {}
+        self.valid = days is not None
+    
+    def write(self, days: Dict[str, Dict[str, Any]]) -> None:
+        """Replace the sidecar after the data file (and archive) were rewritten."""
+        try:
+            write_data_file(self.path, {"checksums": self._checksums(), "days": days}, self.codec)
+            self.days = days
+            self.valid = True
+        except Exception as e:
+            print(f"Failed to write history totals: {e}")
+    
+    def _checksums(self) -> Dict[str, Optional[int]]:
+        return {"data": self._crc32(self.data_file), "archive": self._crc32(self.archive_index_file)}
+    
+    @staticmethod
+    def _crc32(path: str) -> Optional[int]:
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return 0
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    return zlib.crc32(data)
+        except FileNotFoundError:
+            return None
+
+
+class SqliteHistoryStore:
+    """SQLite persistence engine with food, exercise and weight tables indexed by date.
+    
+    Entry ids, the day's last-updated time and its tombstones (ids of removed entries)
+    are stored too, so days come back the same as from the JSON engines.
+    """
+    
+    # Aggregates below can replace DataManager's Python loops
+    indexed_queries = True
+    
+    # Kyle Tax applied in SQL the same way int(calories * 0.85) does in Python
+    TAXED_CALORIES = "CASE WHEN kyle_tax THEN CAST(calories * 0.85 AS INTEGER) ELSE calories END"
+    
+    def __init__(self, database_file: str, lock: Optional[threading.RLock] = None):
+        self.database_file = database_file
+        self.record_count = 0
+        # Shared with DataManager so the autosave thread can commit safely
+        self.lock = lock or threading.RLock()
+        self.history = None
+        self.conn = sqlite3.connect(database_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS days (
+                date TEXT PRIMARY KEY,
+                weight REAL,
+                updated REAL,
+                deleted TEXT
+            );
+            CREATE TABLE IF NOT EXISTS food_entries (
+                id INTEGER PRIMARY KEY,
+                date TEXT NOT NULL,
+                food TEXT NOT NULL,
+                amount REAL,
+                calories INTEGER,
+                category TEXT,
+                kyle_tax INTEGER NOT NULL DEFAULT 0,
+                entry_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_food_entries_date ON food_entries(date);
+            CREATE TABLE IF NOT EXISTS exercise_entries (
+                id INTEGER PRIMARY KEY,
+                date TEXT NOT NULL,
+                exercise TEXT NOT NULL,
+                duration REAL,
+                calories_burnt INTEGER,
+                entry_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_exercise_entries_date ON exercise_entries(date);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        # Databases created before ids were stored get the columns added
+        for table, column, kind in (("days", "updated", "REAL"), ("days", "deleted", "TEXT"),
+                                    ("food_entries", "entry_id", "TEXT"), ("exercise_entries", "entry_id", "TEXT")):
+            if column not in {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        self.conn.commit()
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        """Read a value from the meta table."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: str) -> None:
+        """Write a value to the meta table."""
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        self.conn.commit()
+    
+    def is_migrated(self) -> bool:
+        """Check whether the one-shot JSON import already ran."""
+        return self.get_meta("migrated_from") is not None
+    
+    def mark_migrated(self, source: str) -> None:
+        """Remember that the JSON history was imported."""
+        self.set_meta("migrated_from", source)
+    
+    def open_history(self) -> "SqliteHistory":
+        """Return a lazy history mapping backed by this store."""
+        self.history = SqliteHistory(self)
+        return self.history
+    
+    def has_day(self, date: str) -> bool:
+        """Check whether a day row exists."""
+        return self.conn.execute("SELECT 1 FROM days WHERE date = ?", (date,)).fetchone() is not None
+    
+    def count_days(self) -> int:
+        """Count stored days."""
+        return self.conn.execute("SELECT COUNT(*) FROM days").fetchone()[0]
+    
+    def dates(self) -> List[str]:
+        """Dates of stored days, oldest first."""
+        return [row[0] for row in self.conn.execute("SELECT date FROM days ORDER BY date")]
+    
+    def ensure_day(self, date: str) -> None:
+        """Create an empty day row if the date has none yet."""
+        self.conn.execute("INSERT OR IGNORE INTO days (date, weight) VALUES (?, NULL)", (date,))
+    
+    def load_day(self, date: str) -> Optional[DayData]:
+        """Load a single day, or None if it was never stored."""
+        row = self.conn.execute("SELECT weight, updated, deleted FROM days WHERE date = ?", (date,)).fetchone()
+        if row is None:
+            return None
+        
+        day_data = self._day_from_row(row)
+        day_data["food"] = [
+            self._food_from_row(r) for r in self.conn.execute(
+                "SELECT food, amount, calories, category, kyle_tax, entry_id FROM food_entries "
+                "WHERE date = ? ORDER BY id",
+                (date,)
+            )
+        ]
+        day_data["exercise"] = [
+            self._exercise_from_row(r) for r in self.conn.execute(
+                "SELECT exercise, duration, calories_burnt, entry_id FROM exercise_entries WHERE date = ? ORDER BY id",
+                (date,)
+            )
+        ]
+        return day_data
+    
+    def load_all(self) -> History:
+        """Load every day with three table scans instead of one query per day."""
+        history = {}
+        for row in self.conn.execute("SELECT date, weight, updated, deleted FROM days ORDER BY date"):
+            history[row[0]] = self._day_from_row(row[1:])
+        
+        for row in self.conn.execute(
+            "SELECT date, food, amount, calories, category, kyle_tax, entry_id FROM food_entries ORDER BY date, id"
+        ):
+            history.setdefault(row[0], {"food": [], "exercise": [], "weight": None})["food"].append(
+                self._food_from_row(row[1:])
+            )
+        
+        for row in self.conn.execute(
+            "SELECT date, exercise, duration, calories_burnt, entry_id FROM exercise_entries ORDER BY date, id"
+        ):
+            history.setdefault(row[0], {"food": [], "exercise": [], "weight": None})["exercise"].append(
+                self._exercise_from_row(row[1:])
+            )
+        
+        return history
+    
+    def import_history(self, history: History) -> None:
+        """Bulk insert a full history dict in a single transaction."""
+        with self.conn:
+            for date, day_data in history.items():
+                self._insert_day(date, day_data)
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        """Apply one mutation record (same records as the JSON journal).
+        
+        Statements join the open transaction; the autosave writer commits them in groups.
+        """
+        op = record["op"]
+        date = record.get("date")
+        
+        if op == "delete_all":
+            self.conn.execute("DELETE FROM food_entries")
+            self.conn.execute("DELETE FROM exercise_entries")
+            self.conn.execute("DELETE FROM days")
+        elif op == "delete_day":
+            self._delete_day(date)
+        elif op in DataManager.REMOVING_OPS:
+            # The day in memory already has the change, the ids its older entries were
+            # given and the tombstones of the removed ones, so it is stored as a whole
+            day_data = self.history.get(date) if self.history is not None else None
+            if day_data is None:
+                day_data = record.get("day") or {"food": [], "exercise": [], "weight": None}
+            self._delete_day(date)
+            self._insert_day(date, day_data)
+        else:
+            self.ensure_day(date)
+            if op == "add_food":
+                self.conn.execute(
+                    "INSERT INTO food_entries (date, food, amount, calories, category, kyle_tax, entry_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._food_params(date, record["entry"])
+                )
+            elif op == "add_exercise":
+                self.conn.execute(
+                    "INSERT INTO exercise_entries (date, exercise, duration, calories_burnt, entry_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    self._exercise_params(date, record["entry"])
+                )
+            elif op == "set_weight":
+                self.conn.execute("UPDATE days SET weight = ? WHERE date = ?", (record["weight"], date))
+        
+        if "updated" in record and op not in ("delete_all", "delete_day"):
+            self.conn.execute("UPDATE days SET updated = ? WHERE date = ?", (record["updated"], date))
+        self.record_count += 1
+    
+    def _insert_day(self, date: str, day_data: DayData) -> None:
+        deleted = day_data.get("deleted")
+        self.conn.execute(
+            "INSERT OR REPLACE INTO days (date, weight, updated, deleted) VALUES (?, ?, ?, ?)",
+            (date, day_data.get("weight"), day_data.get("updated"), json.dumps(deleted) if deleted else None)
+        )
+        self.conn.executemany(
+            "INSERT INTO food_entries (date, food, amount, calories, category, kyle_tax, entry_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [self._food_params(date, entry) for entry in day_data.get("food", [])]
+        )
+        self.conn.executemany(
+            "INSERT INTO exercise_entries (date, exercise, duration, calories_burnt, entry_id) VALUES (?, ?, ?, ?, ?)",
+            [self._exercise_params(date, entry) for entry in day_data.get("exercise", [])]
+        )
+    
+    def _delete_day(self, date: str) -> None:
+        self.conn.execute("DELETE FROM food_entries WHERE date = ?", (date,))
+        self.conn.execute("DELETE FROM exercise_entries WHERE date = ?", (date,))
+        self.conn.execute("DELETE FROM days WHERE date = ?", (date,))
+    
+    def sync(self) -> None:
+        """Commit every mutation applied since the last sync as one transaction."""
+        with self.lock:
+            self.conn.commit()
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+    
+    def daily_calorie_totals(self, start_date: str, end_date: str) -> Dict[str, Tuple[int, int]]:
+        """Get (taxed calories in, calories burnt) per date in an inclusive date range."""
+        totals = {}
+        for date, total_in in self.conn.execute(
+            f"SELECT date, SUM({self.TAXED_CALORIES}) FROM food_entries "
+            "WHERE date BETWEEN ? AND ? GROUP BY date",
+            (start_date, end_date)
+        ):
+            totals[date] = (total_in or 0, 0)
+        
+        for date, total_out in self.conn.execute(
+            "SELECT date, SUM(calories_burnt) FROM exercise_entries "
+            "WHERE date BETWEEN ? AND ? GROUP BY date",
+            (start_date, end_date)
+        ):
+            totals[date] = (totals.get(date, (0, 0))[0], total_out or 0)
+        
+        return totals
+    
+    def food_category_totals(self) -> Dict[str, int]:
+        """Get total raw calories by food category."""
+        return {
+            category: total or 0 for category, total in self.conn.execute(
+                "SELECT COALESCE(category, 'Uncategorized'), SUM(calories) FROM food_entries "
+                "GROUP BY COALESCE(category, 'Uncategorized')"
+            )
+        }
+    
+    def stats_summary(self) -> Dict[str, Any]:
+        """Compute the statistics summary with aggregate queries."""
+        total_foods, total_calories = self.conn.execute(
+            f"SELECT COUNT(*), SUM({self.TAXED_CALORIES}) FROM food_entries"
+        ).fetchone()
+        total_exercises, total_burned = self.conn.execute(
+            "SELECT COUNT(*), SUM(calories_burnt) FROM exercise_entries"
+        ).fetchone()
+        weights = [row[0] for row in self.conn.execute(
+            "SELECT weight FROM days WHERE weight IS NOT NULL ORDER BY date"
+        )]
+        
+        total_calories = total_calories or 0
+        total_burned = total_burned or 0
+        return {
+            "total_days": self.count_days(),
+            "total_foods": total_foods,
+            "total_exercises": total_exercises,
+            "total_calories": total_calories,
+            "total_burned": total_burned,
+            "net_calories": total_calories - total_burned,
+            "weights": weights
+        }
+    
+    def weight_history(self) -> List[Tuple[str, float]]:
+        """Get all weight entries, newest first."""
+        return [
+            (date, weight) for date, weight in self.conn.execute(
+                "SELECT date, weight FROM days WHERE weight IS NOT NULL ORDER BY date DESC"
+            )
+        ]
+    
+    def unique_foods(self, category: Optional[str] = None) -> Set[str]:
+        """Names of all logged foods, optionally limited to one category."""
+        if category is None:
+            rows = self.conn.execute("SELECT DISTINCT food FROM food_entries")
+        else:
+            rows = self.conn.execute("SELECT DISTINCT food FROM food_entries WHERE category = ?", (category,))
+        return {row[0] for row in rows}
+    
+    def unique_exercises(self) -> Set[str]:
+        """Names of all logged exercises."""
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT exercise FROM exercise_entries")}
+    
+    def daily_net_calories(self) -> Dict[str, int]:
+        """Raw calories eaten minus calories burnt for every stored day, in date order."""
+        return {
+            date: net for date, net in self.conn.execute(
+                "SELECT date, "
+                "COALESCE((SELECT SUM(calories) FROM food_entries f WHERE f.date = days.date), 0) - "
+                "COALESCE((SELECT SUM(calories_burnt) FROM exercise_entries e WHERE e.date = days.date), 0) "
+                "FROM days ORDER BY date"
+            )
+        }
+    
+    @staticmethod
+    def _food_params(date: str, entry: FoodEntry) -> Tuple:
+        return (date, entry["food"], entry.get("amount"), entry.get("calories"),
+                entry.get("category"), 1 if entry.get("kyle_tax", False) else 0, entry.get("id"))
+    
+    @staticmethod
+    def _exercise_params(date: str, entry: ExerciseEntry) -> Tuple:
+        return (date, entry["exercise"], entry.get("duration"), entry.get("calories_burnt"), entry.get("id"))
+    
+    @staticmethod
+    def _day_from_row(row: Tuple) -> DayData:
+        weight, updated, deleted = row
+        day_data = {"food": [], "exercise": [], "weight": weight}
+        if updated is not None:
+            day_data["updated"] = updated
+        if deleted:
+            day_data["deleted"] = json.loads(deleted)
+        return day_data
+    
+    @staticmethod
+    def _food_from_row(row: Tuple) -> FoodEntry:
+        food, amount, calories, category, kyle_tax, entry_id = row
+        entry = FoodEntry(food=food, amount=amount, calories=calories, category=category, kyle_tax=bool(kyle_tax))
+        if entry_id is not None:
+            entry["id"] = entry_id
+        return entry
+    
+    @staticmethod
+    def _exercise_from_row(row: Tuple) -> ExerciseEntry:
+        exercise, duration, calories_burnt, entry_id = row
+        entry = ExerciseEntry(exercise=exercise, duration=duration, calories_burnt=calories_burnt)
+        if entry_id is not None:
+            entry["id"] = entry_id
+        return entry
+
+
+class SqliteHistory(MutableMapping):
+    """Lazy date -> day mapping over a SqliteHistoryStore; days are fetched on first access.
+    
+    Writes only update the cache; DataManager persists them through mutation records.
+    """
+    
+    def __init__(self, store: SqliteHistoryStore):
+        self.store = store
+        self._days = {}
+        self._complete = False
+    
+    def __getitem__(self, date: str) -> DayData:
+        if date not in self._days:
+            day_data = None if self._complete else self.store.load_day(date)
+            if day_data is None:
+                raise KeyError(date)
+            self._days[date] = day_data
+        return self._days[date]
+    
+    def __contains__(self, date) -> bool:
+        if date in self._days:
+            return True
+        return not self._complete and self.store.has_day(date)
+    
+    def __setitem__(self, date: str, day_data: DayData) -> None:
+        self._days[date] = day_data
+        self.store.ensure_day(date)
+    
+    def __delitem__(self, date: str) -> None:
+        self._load_all()
+        del self._days[date]
+    
+    def __iter__(self):
+        self._load_all()
+        return iter(list(self._days))
+    
+    def __len__(self) -> int:
+        if self._complete:
+            return len(self._days)
+        return self.store.count_days()
+    
+    def clear(self) -> None:
+        self._days = {}
+        self._complete = True
+    
+    def iter_days(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Tuple[str, DayData]]:
+        """Yield (date, day) in date order; uncached days are loaded one at a time and not kept."""
+        dates = set(self._days)
+        if not self._complete:
+            dates.update(self.store.dates())
+        for date in sorted(dates):
+            if (start is not None and date < start) or (end is not None and date > end):
+                continue
+            day_data = self._days.get(date)
+            if day_data is None:
+                day_data = self.store.load_day(date)
+            if day_data is not None:
+                yield date, day_data
+    
+    def _load_all(self) -> None:
+        """Pull every day into the cache, keeping already-cached (possibly newer) days."""
+        if not self._complete:
+            all_days = self.store.load_all()
+            all_days.update(self._days)
+            self._days = all_days
+            self._complete = True
+
+
+class ShardedHistoryStore:
+    """History split into one JSON file per month; only dirty months are rewritten on save."""
+    
+    indexed_queries = False
+    
+    def __init__(self, shard_dir: str, lock: Optional[threading.RLock] = None,
+                 codec: Union[JsonCodec, MsgpackCodec] = CODECS["json"]):
+        self.shard_dir = shard_dir
+        self.meta_file = os.path.join(shard_dir, "_meta.json")
+        self.codec = codec
+        self.record_count = 0
+        # Shared with DataManager so the autosave thread sees consistent days
+        self.lock = lock or threading.RLock()
+        self.history = None
+        self.dirty_months = set()
+        self.cleared = False
+        os.makedirs(shard_dir, exist_ok=True)
+    
+    def is_migrated(self) -> bool:
+        """Check whether the one-shot JSON split already ran."""
+        return os.path.exists(self.meta_file)
+    
+    def mark_migrated(self, source: str) -> None:
+        """Remember that the JSON history was split into shards."""
+        with open(self.meta_file, "w") as f:
+            json.dump({"migrated_from": source}, f, indent=4)
+    
+    def shard_file(self, month: str) -> str:
+        """Path of the shard holding a "YYYY-MM" month."""
+        return os.path.join(self.shard_dir, f"{month}.json")
+    
+    def months(self) -> List[str]:
+        """List the months that have a shard on disk."""
+        months = []
+        for name in os.listdir(self.shard_dir):
+            if name.endswith(".json") and not name.startswith("_"):
+                months.append(name[:-5])
+        return sorted(months)
+    
+    def load_shard(self, month: str) -> History:
+        """Read one month of history."""
+        try:
+            return read_data_file(self.shard_file(month))
+        except Exception as e:
+            print(f"Failed to load history shard {month}: {e}")
+            return {}
+    
+    def write_shard(self, month: str, days: History) -> None:
+        """Atomically replace one month's shard, removing it when the month is empty."""
+        shard_file = self.shard_file(month)
+        if not days:
+            if os.path.exists(shard_file):
+                os.remove(shard_file)
+            return
+        
+        write_data_file(shard_file, days, self.codec)
+    
+    def import_history(self, history: History) -> None:
+        """Split a full history dict into month shards."""
+        months = {}
+        for date, day_data in history.items():
+            months.setdefault(date[:7], {})[date] = day_data
+        for month, days in months.items():
+            self.write_shard(month, days)
+    
+    def open_history(self) -> "ShardedHistory":
+        """Return a lazy history mapping that loads shards on first touch."""
+        self.history = ShardedHistory(self)
+        return self.history
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        """Note which month a mutation touched; the shard is written on sync."""
+        if record["op"] == "delete_all":
+            self.cleared = True
+            self.dirty_months.clear()
+        else:
+            self.dirty_months.add(record["date"][:7])
+        self.record_count += 1
+    
+    def sync(self) -> None:
+        """Rewrite only the shards whose days changed since the last sync."""
+        # Copy the dirty months under the lock, write them without it
+        with self.lock:
+            cleared, self.cleared = self.cleared, False
+            dirty = {}
+            for month in self.dirty_months:
+                dirty[month] = {
+                    date: {
+                        **day_data,
+                        "food": list(day_data.get("food", [])),
+                        "exercise": list(day_data.get("exercise", [])),
+                        "weight": day_data.get("weight")
+                    }
+                    for date, day_data in self.history.month_days(month).items()
+                }
+            self.dirty_months = set()
+        
+        if cleared:
+            for month in self.months():
+                if month not in dirty:
+                    os.remove(self.shard_file(month))
+        
+        for month in sorted(dirty):
+            self.write_shard(month, dirty[month])
+    
+    def close(self) -> None:
+        """Write any pending shards."""
+        self.sync()
+
+
+class ShardedHistory(MutableMapping):
+    """Lazy date -> day mapping that loads a month shard the first time one of its dates is touched."""
+    
+    def __init__(self, store: ShardedHistoryStore):
+        self.store = store
+        self._months = {}
+        self._known_months = set(store.months())
+    
+    def month_days(self, month: str) -> History:
+        """Get (loading if needed) the days of a "YYYY-MM" month."""
+        if month not in self._months:
+            if month in self._known_months:
+                days = self.store.load_shard(month)
+                for day_data in days.values():
+                    as_entry_records(day_data)
+                self._months[month] = days
+            else:
+                self._months[month] = {}
+        return self._months[month]
+    
+    @property
+    def loaded_months(self) -> List[str]:
+        """Months currently held in memory."""
+        return sorted(self._months)
+    
+    def __getitem__(self, date: str) -> DayData:
+        return self.month_days(date[:7])[date]
+    
+    def __contains__(self, date) -> bool:
+        return isinstance(date, str) and date in self.month_days(date[:7])
+    
+    def __setitem__(self, date: str, day_data: DayData) -> None:
+        self.month_days(date[:7])[date] = day_data
+        self._known_months.add(date[:7])
+    
+    def __delitem__(self, date: str) -> None:
+        del self.month_days(date[:7])[date]
+    
+    def __iter__(self):
+        for month in sorted(self._known_months):
+            yield from list(self.month_days(month))
+    
+    def __len__(self) -> int:
+        return sum(len(self.month_days(month)) for month in self._known_months)
+    
+    def clear(self) -> None:
+        self._months = {}
+        self._known_months = set()
+    
+    def iter_days(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Tuple[str, DayData]]:
+        """Yield (date, day) in date order, reading shards that are not loaded without keeping them."""
+        for month in sorted(self._known_months):
+            if (start is not None and month < start[:7]) or (end is not None and month > end[:7]):
+                continue
+            days = self._months.get(month)
+            if days is None:
+                days = self.store.load_shard(month)
+            for date in sorted(days):
+                if (start is None or date >= start) and (end is None or date <= end):
+                    yield date, days[date]
+
+
+class HistoryColumns:
+    """Fixed-width history columns, backed by an mmapped file or by in-memory arrays.
+    
+    Dates are stored as day ordinals and strings as ids into one symbol table. Rows of
+    every table are sorted by date, so a day's rows are found with a binary search.
+    Entry ids are symbols too; "deleted" holds each day's tombstones.
+    """
+    
+    MAGIC = b"JBCOLS01"
+    TABLES = {
+        "days": (("date", "i"), ("weight", "d"), ("updated", "d")),
+        "food": (("date", "i"), ("food", "i"), ("amount", "d"), ("calories", "i"),
+                 ("category", "i"), ("kyle_tax", "B"), ("id", "i")),
+        "exercise": (("date", "i"), ("exercise", "i"), ("duration", "d"), ("calories_burnt", "i"), ("id", "i")),
+        "deleted": (("date", "i"), ("id", "i"))
+    }
+    
+    def __init__(self, symbols: List[str], tables: Dict[str, Dict[str, memoryview]],
+                 meta: Optional[Dict[str, Any]] = None, mapped: Optional[mmap.mmap] = None):
+        self.symbols = symbols
+        self.symbol_ids = {name: i for i, name in enumerate(symbols)}
+        self.tables = tables
+        self.meta = meta or {}
+        self._mmap = mapped
+    
+    @classmethod
+    def empty(cls) -> "HistoryColumns":
+        """Columns holding no days at all."""
+        return cls.from_arrays([], {
+            table: {name: array(code) for name, code in columns}
+            for table, columns in cls.TABLES.items()
+        })
+    
+    @classmethod
+    def from_arrays(cls, symbols: List[str], arrays: Dict[str, Dict[str, array]],
+                    meta: Optional[Dict[str, Any]] = None) -> "HistoryColumns":
+        """Wrap in-memory column arrays."""
+        tables = {
+            table: {name: memoryview(values) for name, values in columns.items()}
+            for table, columns in arrays.items()
+        }
+        return cls(symbols, tables, meta)
+    
+    def state(self) -> Dict[str, Any]:
+        """Plain-data copy for the startup cache (a mapped file is copied out)."""
+        return {
+            "byteorder": sys.byteorder,
+            "symbols": self.symbols,
+            "meta": self.meta,
+            "tables": {
+                table: {name: base64.b64encode(view.tobytes()).decode("ascii") for name, view in columns.items()}
+                for table, columns in self.tables.items()
+            }
+        }
+    
+    @classmethod
+    def restore(cls, state: Dict[str, Any]) -> "HistoryColumns":
+        """Columns saved by state()."""
+        if state["byteorder"] != sys.byteorder:
+            raise ValueError("columns were cached on a machine with another byte order")
+        arrays = {
+            table: {name: array(code, base64.b64decode(state["tables"][table][name])) for name, code in columns}
+            for table, columns in cls.TABLES.items()
+        }
+        return cls.from_arrays(state["symbols"], arrays, state["meta"])
+    
+    @classmethod
+    def load(cls, path: str) -> "HistoryColumns":
+        """Map a columns file; nothing is decoded until a column is read."""
+        with open(path, "rb") as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a history columns file")
+            header_size = struct.unpack("<I", f.read(4))[0]
+            header = json.loads(f.read(header_size))
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        data = memoryview(mapped)
+        tables = {}
+        missing = []
+        for table, columns in cls.TABLES.items():
+            rows = header["rows"].get(table, 0)
+            tables[table] = {}
+            for name, code in columns:
+                offset = header["offsets"].get(f"{table}.{name}")
+                if offset is None:
+                    # Written before the column existed
+                    missing.append((table, name, code, rows))
+                    continue
+                size = rows * array(code).itemsize
+                tables[table][name] = data[offset:offset + size].cast(code)
+        data.release()
+        
+        columns = cls(header["symbols"], tables, header.get("meta"), mapped)
+        if header["byteorder"] != sys.byteorder:
+            # Written on a machine with the other byte order; fall back to swapped copies
+            arrays = {}
+            for table, views in columns.tables.items():
+                arrays[table] = {}
+                for name, view in views.items():
+                    values = array(view.format, view.cast("B"))
+                    values.byteswap()
+                    arrays[table][name] = values
+            swapped = cls.from_arrays(columns.symbols, arrays, columns.meta)
+            columns.close()
+            columns = swapped
+        
+        for table, name, code, rows in missing:
+            columns.tables[table][name] = memoryview(array(code, [math.nan if code == "d" else -1]) * rows)
+        return columns
+    
+    def write(self, path: str) -> None:
+        """Atomically write the columns to a file, each one 8-byte aligned."""
+        offsets = {}
+        rows = {table: len(columns["date"]) for table, columns in self.tables.items()}
+        header = {"byteorder": sys.byteorder, "symbols": self.symbols, "rows": rows,
+                  "meta": self.meta, "offsets": offsets}
+        
+        # Offsets depend on the header size, so lay out with placeholders first
+        for table, columns in self.TABLES.items():
+            for name, code in columns:
+                offsets[f"{table}.{name}"] = 0
+        header_size = len(json.dumps(header).encode("utf-8")) + 16 * len(offsets) + 16
+        position = self._align(len(self.MAGIC) + 4 + header_size)
+        for table, columns in self.TABLES.items():
+            for name, code in columns:
+                offsets[f"{table}.{name}"] = position
+                position = self._align(position + self.tables[table][name].nbytes)
+        
+        encoded = json.dumps(header).encode("utf-8").ljust(header_size)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(self.MAGIC)
+            f.write(struct.pack("<I", header_size))
+            f.write(encoded)
+            for table, columns in self.TABLES.items():
+                for name, code in columns:
+                    f.write(b"\0" * (offsets[f"{table}.{name}"] - f.tell()))
+                    f.write(self.tables[table][name].cast("B"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    
+    def close(self) -> None:
+        """Release the column views and unmap the file."""
+        for columns in self.tables.values():
+            for view in columns.values():
+                view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+    
+    def day_rows(self, table: str, ordinal: int) -> Tuple[int, int]:
+        """Row range [lo, hi) of one day in a table."""
+        dates = self.tables[table]["date"]
+        return bisect.bisect_left(dates, ordinal), bisect.bisect_right(dates, ordinal)
+    
+    def has_day(self, ordinal: int) -> bool:
+        """Check whether a day row exists."""
+        lo, hi = self.day_rows("days", ordinal)
+        return hi > lo
+    
+    def load_day(self, ordinal: int) -> Optional[DayData]:
+        """Decode a single day, or None if it was never stored."""
+        lo, hi = self.day_rows("days", ordinal)
+        if hi == lo:
+            return None
+        
+        symbols = self.symbols
+        weight = self.tables["days"]["weight"][lo]
+        updated = self.tables["days"]["updated"][lo]
+        day_data = {"food": [], "exercise": [], "weight": None if math.isnan(weight) else weight}
+        if not math.isnan(updated):
+            day_data["updated"] = updated
+        
+        food = self.tables["food"]
+        for i in range(*self.day_rows("food", ordinal)):
+            amount = food["amount"][i]
+            category = food["category"][i]
+            entry = FoodEntry(
+                food=symbols[food["food"][i]],
+                amount=None if math.isnan(amount) else amount,
+                calories=food["calories"][i],
+                category=None if category < 0 else symbols[category],
+                kyle_tax=bool(food["kyle_tax"][i])
+            )
+            if food["id"][i] >= 0:
+                entry["id"] = symbols[food["id"][i]]
+            day_data["food"].append(entry)
+        
+        exercise = self.tables["exercise"]
+        for i in range(*self.day_rows("exercise", ordinal)):
+            duration = exercise["duration"][i]
+            entry = ExerciseEntry(
+                exercise=symbols[exercise["exercise"][i]],
+                duration=None if math.isnan(duration) else duration,
+                calories_burnt=exercise["calories_burnt"][i]
+            )
+            if exercise["id"][i] >= 0:
+                entry["id"] = symbols[exercise["id"][i]]
+            day_data["exercise"].append(entry)
+        
+        deleted = self.tables["deleted"]
+        lo, hi = self.day_rows("deleted", ordinal)
+        if hi > lo:
+            day_data["deleted"] = [symbols[i] for i in deleted["id"][lo:hi]]
+        
+        return day_data
+    
+    def rows(self, table: str) -> List[Tuple[int, int]]:
+        """The whole table as a single row range."""
+        return [(0, len(self.tables[table]["date"]))]
+    
+    def select(self, table: str, name: str, segments: List[Tuple[int, int]]):
+        """A column over row ranges: a NumPy array, or an iterator of values without NumPy."""
+        view = self.tables[table][name]
+        if np is None:
+            return itertools.chain.from_iterable(view[lo:hi] for lo, hi in segments)
+        values = np.frombuffer(view, dtype=view.format) if len(view) else np.zeros(0, view.format)
+        if len(segments) == 1:
+            lo, hi = segments[0]
+            return values[lo:hi]
+        return np.concatenate([values[lo:hi] for lo, hi in segments] or [values[:0]])
+    
+    def column_total(self, table: str, name: str, segments: List[Tuple[int, int]]) -> int:
+        """Sum of an integer column over row ranges."""
+        values = self.select(table, name, segments)
+        if np is None:
+            return sum(values)
+        return int(values.sum(dtype=np.int64))
+    
+    def taxed_calories(self, segments: List[Tuple[int, int]]) -> int:
+        """Sum of food calories over row ranges, with the Kyle Tax applied to flagged rows."""
+        if np is None:
+            food = self.tables["food"]
+            total = 0
+            for lo, hi in segments:
+                calories = food["calories"][lo:hi]
+                taxed = itertools.compress(calories, food["kyle_tax"][lo:hi])
+                total += sum(calories) - sum(c - int(c * 0.85) for c in taxed)
+            return total
+        
+        calories = self.select("food", "calories", segments).astype(np.int64)
+        taxed = self.select("food", "kyle_tax", segments).astype(bool)
+        calories[taxed] = (calories[taxed] * 0.85).astype(np.int64)
+        return int(calories.sum())
+    
+    def grouped_totals(self, table: str, key: str, value: str, segments: List[Tuple[int, int]]) -> Dict[int, int]:
+        """Sums of an integer column grouped by the symbol ids (or dates) of another."""
+        keys = self.select(table, key, segments)
+        values = self.select(table, value, segments)
+        if np is None:
+            totals = {}
+            for k, v in zip(keys, values):
+                totals[k] = totals.get(k, 0) + v
+            return totals
+        
+        if not len(keys):
+            return {}
+        # Ids and day ordinals are dense enough to count straight into bins
+        low = int(keys.min())
+        bins = keys.astype(np.int64) - low
+        sums = np.bincount(bins, weights=values)
+        present = np.flatnonzero(np.bincount(bins))
+        return dict(zip((present + low).tolist(), sums[present].astype(np.int64).tolist()))
+    
+    def distinct(self, table: str, name: str, segments: List[Tuple[int, int]],
+                 where: Optional[Tuple[str, int]] = None) -> Set[int]:
+        """Distinct values of a column over row ranges, optionally only rows where another column matches."""
+        values = self.select(table, name, segments)
+        if where is not None:
+            column, wanted = where
+            matches = self.select(table, column, segments)
+            if np is None:
+                return {v for v, m in zip(values, matches) if m == wanted}
+            values = values[matches == wanted]
+        if np is None:
+            return set(values)
+        return set(np.unique(values).tolist())
+    
+    def net_calories(self, segments: Optional[Dict[str, List[Tuple[int, int]]]] = None) -> Dict[int, int]:
+        """Raw calories eaten minus calories burnt per day ordinal, for every day row in range."""
+        if segments is None:
+            segments = {table: self.rows(table) for table in self.TABLES}
+        dates = self.select("days", "date", segments["days"])
+        net = dict.fromkeys(dates if np is None else dates.tolist(), 0)
+        for ordinal, total in self.grouped_totals("food", "date", "calories", segments["food"]).items():
+            net[ordinal] += total
+        for ordinal, total in self.grouped_totals("exercise", "date", "calories_burnt", segments["exercise"]).items():
+            net[ordinal] -= total
+        return net
+    
+    def merged(self, days: Dict[int, Optional[DayData]], cleared: bool = False,
+               keep_ids: bool = True) -> "HistoryColumns":
+        """Build new columns with the given days replaced (None removes a day).
+        
+        Untouched rows are copied as raw slices, so no other day is decoded. Without
+        keep_ids, entry ids and tombstones are left out (for columns that are only aggregated).
+        """
+        symbols = list(self.symbols)
+        symbol_ids = dict(self.symbol_ids)
+        
+        def symbol(name: Optional[str]) -> int:
+            if name is None:
+                return -1
+            if name not in symbol_ids:
+                symbol_ids[name] = len(symbols)
+                symbols.append(name)
+            return symbol_ids[name]
+        
+        arrays = {}
+        for table, columns in self.TABLES.items():
+            source = self.tables[table]
+            target = {name: array(code) for name, code in columns}
+            arrays[table] = target
+            total = 0 if cleared else len(source["date"])
+            
+            start = 0
+            for ordinal in sorted(days):
+                lo = bisect.bisect_left(source["date"], ordinal, 0, total)
+                hi = bisect.bisect_right(source["date"], ordinal, 0, total)
+                for name, values in target.items():
+                    values.frombytes(source[name][start:lo].cast("B"))
+                for row in self._day_rows(table, ordinal, days[ordinal], symbol, keep_ids):
+                    for (name, code), value in zip(columns, row):
+                        target[name].append(value)
+                start = hi
+            for name, values in target.items():
+                values.frombytes(source[name][start:total].cast("B"))
+        
+        return self.from_arrays(symbols, arrays, dict(self.meta))
+    
+    @staticmethod
+    def _day_rows(table: str, ordinal: int, day_data: Optional[DayData], symbol,
+                  keep_ids: bool = True) -> List[Tuple]:
+        """Encode one day as rows of a table, in TABLES column order."""
+        if day_data is None:
+            return []
+        
+        nan = float("nan")
+        if table == "days":
+            weight = day_data.get("weight")
+            updated = day_data.get("updated")
+            return [(ordinal, nan if weight is None else float(weight), nan if updated is None else float(updated))]
+        
+        if table == "deleted":
+            return [(ordinal, symbol(entry_id)) for entry_id in day_data.get("deleted", [])] if keep_ids else []
+        
+        def entry_id(entry) -> int:
+            return symbol(entry.get("id")) if keep_ids else -1
+        
+        if table == "food":
+            return [
+                (ordinal, symbol(entry["food"]),
+                 nan if entry.get("amount") is None else float(entry["amount"]),
+                 int(entry.get("calories") or 0), symbol(entry.get("category")),
+                 1 if entry.get("kyle_tax", False) else 0, entry_id(entry))
+                for entry in day_data.get("food", [])
+            ]
+        
+        return [
+            (ordinal, symbol(entry["exercise"]),
+             nan if entry.get("duration") is None else float(entry["duration"]),
+             int(entry.get("calories_burnt") or 0), entry_id(entry))
+            for entry in day_data.get("exercise", [])
+        ]
+    
+    @staticmethod
+    def _align(position: int) -> int:
+        return (position + 7) & ~7
+
+
+class ColumnarHistoryStore:
+    """History in a compact binary columnar file read through mmap.
+    
+    Opening the file only maps it. Aggregates read the columns directly; days changed
+    since the last sync are taken from the history mapping instead of their stale rows.
+    """
+    
+    indexed_queries = True
+    
+    def __init__(self, columns_file: str, lock: Optional[threading.RLock] = None):
+        self.columns_file = columns_file
+        self.record_count = 0
+        # Shared with DataManager so the autosave thread can swap columns safely
+        self.lock = lock or threading.RLock()
+        self.history = None
+        self.dirty_dates = set()
+        self._unwritten = False
+        
+        self.columns = HistoryColumns.empty()
+        if os.path.exists(columns_file):
+            try:
+                self.columns = HistoryColumns.load(columns_file)
+            except Exception as e:
+                print(f"Failed to load history columns: {e}")
+    
+    def is_migrated(self) -> bool:
+        """Check whether the one-shot JSON conversion already ran."""
+        return os.path.exists(self.columns_file)
+    
+    def mark_migrated(self, source: str) -> None:
+        """Remember that the JSON history was converted."""
+        with self.lock:
+            self.columns.meta["migrated_from"] = source
+            self.columns.write(self.columns_file)
+    
+    def import_history(self, history: History) -> None:
+        """Convert a full history dict into columns."""
+        with self.lock:
+            days = {self._ordinal(date): day_data for date, day_data in history.items()}
+            old, self.columns = self.columns, self.columns.merged(days, cleared=True)
+            old.close()
+            self.columns.write(self.columns_file)
+    
+    def open_history(self) -> "ColumnarHistory":
+        """Return a lazy history mapping that decodes days on first access."""
+        self.history = ColumnarHistory(self)
+        return self.history
+    
+    def has_day(self, date: str) -> bool:
+        """Check whether the columns hold a day."""
+        with self.lock:
+            return self.columns.has_day(self._ordinal(date))
+    
+    def load_day(self, date: str) -> Optional[DayData]:
+        """Decode a single day from the columns."""
+        with self.lock:
+            return self.columns.load_day(self._ordinal(date))
+    
+    def dates(self) -> List[str]:
+        """Every date stored in the columns."""
+        with self.lock:
+            return [self._date(ordinal) for ordinal in self.columns.tables["days"]["date"]]
+    
+    def mark_dirty(self, date: str) -> None:
+        """Take a day's column rows out of use until the next sync rewrites them."""
+        self.dirty_dates.add(self._ordinal(date))
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        """Note which day a mutation touched; the columns are rebuilt on sync."""
+        if record["op"] == "delete_all":
+            self.dirty_dates.clear()
+        else:
+            self.mark_dirty(record["date"])
+        self.record_count += 1
+    
+    def sync(self) -> None:
+        """Fold changed days into new columns and write them out."""
+        with self.lock:
+            if self.history is not None and (self.dirty_dates or self.history.cleared):
+                days = {}
+                for ordinal in self.dirty_dates:
+                    day_data = self.history.get(self._date(ordinal))
+                    days[ordinal] = None if day_data is None else {
+                        **day_data,
+                        "food": list(day_data.get("food", [])),
+                        "exercise": list(day_data.get("exercise", [])),
+                        "weight": day_data.get("weight")
+                    }
+                
+                # Readers switch to the in-memory columns right away
+                old, self.columns = self.columns, self.columns.merged(days, self.history.cleared)
+                old.close()
+                self.dirty_dates = set()
+                self.history.cleared = False
+                self._unwritten = True
+            
+            if not self._unwritten:
+                return
+            columns = self.columns
+        
+        columns.write(self.columns_file)
+        
+        with self.lock:
+            if self.columns is columns:
+                # Swap the arrays for a mapping of the file that was just written
+                self.columns = HistoryColumns.load(self.columns_file)
+                columns.close()
+                self._unwritten = False
+    
+    def close(self) -> None:
+        """Write pending days and unmap the file."""
+        self.sync()
+        with self.lock:
+            self.columns.close()
+    
+    def daily_calorie_totals(self, start_date: str, end_date: str) -> Dict[str, Tuple[int, int]]:
+        """Get (taxed calories in, calories burnt) per date in an inclusive date range."""
+        with self.lock:
+            totals = {}
+            for ordinal in range(self._ordinal(start_date), self._ordinal(end_date) + 1):
+                if self._is_stale(ordinal):
+                    day_data = self._current_day(ordinal) or {}
+                    total_in = sum(
+                        int(entry["calories"] * 0.85) if entry.get("kyle_tax", False) else entry["calories"]
+                        for entry in day_data.get("food", [])
+                    )
+                    total_out = sum(ex.get("calories_burnt", 0) for ex in day_data.get("exercise", []))
+                else:
+                    total_in = self.columns.taxed_calories([self.columns.day_rows("food", ordinal)])
+                    lo, hi = self.columns.day_rows("exercise", ordinal)
+                    total_out = sum(self.columns.tables["exercise"]["calories_burnt"][lo:hi])
+                if total_in or total_out:
+                    totals[self._date(ordinal)] = (total_in, total_out)
+            return totals
+    
+    def food_category_totals(self) -> Dict[str, int]:
+        """Get total raw calories by food category."""
+        with self.lock:
+            by_id = self.columns.grouped_totals("food", "category", "calories", self._segments("food"))
+            
+            totals = {}
+            for category, total in by_id.items():
+                name = "Uncategorized" if category < 0 else self.columns.symbols[category]
+                totals[name] = totals.get(name, 0) + total
+            for day_data in self._changed_days():
+                for entry in day_data.get("food", []):
+                    name = entry.get("category") or "Uncategorized"
+                    totals[name] = totals.get(name, 0) + entry["calories"]
+            return totals
+    
+    def stats_summary(self) -> Dict[str, Any]:
+        """Compute the statistics summary straight from the columns."""
+        with self.lock:
+            food, exercise = self._segments("food"), self._segments("exercise")
+            total_foods = sum(hi - lo for lo, hi in food)
+            total_exercises = sum(hi - lo for lo, hi in exercise)
+            total_calories = self.columns.taxed_calories(food)
+            total_burned = self.columns.column_total("exercise", "calories_burnt", exercise)
+            
+            for day_data in self._changed_days():
+                for entry in day_data.get("food", []):
+                    calories = entry["calories"]
+                    if entry.get("kyle_tax", False):
+                        calories = int(calories * 0.85)
+                    total_calories += calories
+                total_foods += len(day_data.get("food", []))
+                total_exercises += len(day_data.get("exercise", []))
+                total_burned += sum(ex.get("calories_burnt", 0) for ex in day_data.get("exercise", []))
+            
+            weights = [weight for date, weight in reversed(self.weight_history())]
+            return {
+                "total_days": sum(hi - lo for lo, hi in self._segments("days")) + len(self._changed_days()),
+                "total_foods": total_foods,
+                "total_exercises": total_exercises,
+                "total_calories": total_calories,
+                "total_burned": total_burned,
+                "net_calories": total_calories - total_burned,
+                "weights": weights
+            }
+    
+    def weight_history(self) -> List[Tuple[str, float]]:
+        """Get all weight entries, newest first."""
+        with self.lock:
+            days = self.columns.tables["days"]
+            weights = []
+            for lo, hi in self._segments("days"):
+                for ordinal, weight in zip(days["date"][lo:hi], days["weight"][lo:hi]):
+                    if not math.isnan(weight):
+                        weights.append((ordinal, weight))
+            for ordinal in self.dirty_dates:
+                day_data = self._current_day(ordinal)
+                if day_data is not None and day_data.get("weight") is not None:
+                    weights.append((ordinal, day_data["weight"]))
+            
+            weights.sort(reverse=True)
+            return [(self._date(ordinal), weight) for ordinal, weight in weights]
+    
+    def unique_foods(self, category: Optional[str] = None) -> Set[str]:
+        """Names of all logged foods, optionally limited to one category."""
+        with self.lock:
+            category_id = self.columns.symbol_ids.get(category)
+            ids = set()
+            if category is None:
+                ids = self.columns.distinct("food", "food", self._segments("food"))
+            elif category_id is not None:
+                ids = self.columns.distinct("food", "food", self._segments("food"), ("category", category_id))
+            
+            names = {self.columns.symbols[i] for i in ids}
+            for day_data in self._changed_days():
+                names.update(entry["food"] for entry in day_data.get("food", [])
+                             if category is None or entry.get("category") == category)
+            return names
+    
+    def unique_exercises(self) -> Set[str]:
+        """Names of all logged exercises."""
+        with self.lock:
+            ids = self.columns.distinct("exercise", "exercise", self._segments("exercise"))
+            
+            names = {self.columns.symbols[i] for i in ids}
+            for day_data in self._changed_days():
+                names.update(entry["exercise"] for entry in day_data.get("exercise", []))
+            return names
+    
+    def daily_net_calories(self) -> Dict[str, int]:
+        """Raw calories eaten minus calories burnt for every stored day, in date order."""
+        with self.lock:
+            net = self.columns.net_calories({table: self._segments(table) for table in HistoryColumns.TABLES})
+            for ordinal in self.dirty_dates:
+                day_data = self._current_day(ordinal)
+                if day_data is not None:
+                    net[ordinal] = (sum(food.get("calories", 0) for food in day_data.get("food", []))
+                                    - sum(ex.get("calories_burnt", 0) for ex in day_data.get("exercise", [])))
+            return {self._date(ordinal): net[ordinal] for ordinal in sorted(net)}
+    
+    def _is_stale(self, ordinal: int) -> bool:
+        """Whether a day's column rows may be out of date."""
+        return ordinal in self.dirty_dates or (self.history is not None and self.history.cleared)
+    
+    def _current_day(self, ordinal: int) -> Optional[DayData]:
+        """The up-to-date version of a changed day."""
+        if self.history is None:
+            return None
+        return self.history.get(self._date(ordinal))
+    
+    def _changed_days(self) -> List[DayData]:
+        """Current contents of every day whose column rows are stale."""
+        if self.history is not None and self.history.cleared:
+            return list(self.history.cached_days())
+        return [day_data for day_data in map(self._current_day, self.dirty_dates) if day_data is not None]
+    
+    def _segments(self, table: str) -> List[Tuple[int, int]]:
+        """Row ranges of a table that are still current (stale days cut out)."""
+        if self.history is not None and self.history.cleared:
+            return []
+        
+        segments = []
+        start = 0
+        for ordinal in sorted(self.dirty_dates):
+            lo, hi = self.columns.day_rows(table, ordinal)
+            if lo > start:
+                segments.append((start, lo))
+            start = max(start, hi)
+        total = len(self.columns.tables[table]["date"])
+        if total > start:
+            segments.append((start, total))
+        return segments
+    
+    @staticmethod
+    def _ordinal(date: str) -> int:
+        return DAYS.ordinal(date)
+    
+    @staticmethod
+    def _date(ordinal: int) -> str:
+        return DAYS.date(ordinal)
+
+
+class ColumnarHistory(MutableMapping):
+    """Lazy date -> day mapping over a ColumnarHistoryStore; days are decoded on first access.
+    
+    Writes only update the cache; DataManager persists them through mutation records.
+    """
+    
+    def __init__(self, store: ColumnarHistoryStore):
+        self.store = store
+        self.cleared = False
+        self._days = {}
+    
+    def cached_days(self) -> Iterator[DayData]:
+        """Days currently held in memory."""
+        return (day_data for day_data in self._days.values() if day_data is not None)
+    
+    def __getitem__(self, date: str) -> DayData:
+        if date not in self._days:
+            day_data = None if self.cleared else self.store.load_day(date)
+            if day_data is None:
+                raise KeyError(date)
+            self._days[date] = day_data
+        
+        day_data = self._days[date]
+        if day_data is None:
+            raise KeyError(date)
+        return day_data
+    
+    def __contains__(self, date) -> bool:
+        if date in self._days:
+            return self._days[date] is not None
+        return isinstance(date, str) and not self.cleared and self.store.has_day(date)
+    
+    def __setitem__(self, date: str, day_data: DayData) -> None:
+        self._days[date] = day_data
+        self.store.mark_dirty(date)
+    
+    def __delitem__(self, date: str) -> None:
+        if date not in self:
+            raise KeyError(date)
+        self._days[date] = None
+        self.store.mark_dirty(date)
+    
+    def __iter__(self):
+        return iter(self._dates())
+    
+    def __len__(self) -> int:
+        return len(self._dates())
+    
+    def clear(self) -> None:
+        self._days = {}
+        self.cleared = True
+    
+    def iter_days(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Tuple[str, DayData]]:
+        """Yield (date, day) in date order; uncached days are decoded without caching them."""
+        for date in self._dates():
+            if (start is not None and date < start) or (end is not None and date > end):
+                continue
+            day_data = self._days[date] if date in self._days else self.store.load_day(date)
+            if day_data is not None:
+                yield date, day_data
+    
+    def _dates(self) -> List[str]:
+        """Sorted dates of stored days, including unsaved changes."""
+        dates = set() if self.cleared else set(self.store.dates())
+        for date, day_data in self._days.items():
+            if day_data is None:
+                dates.discard(date)
+            else:
+                dates.add(date)
+        return sorted(dates)
+
+
+class AutosaveWriter:
+    """Background thread that coalesces bursts of save requests into one write."""
+    
+    def __init__(self, write_func, debounce: float = 0.5, max_delay: float = 2.0):
+        self.write_func = write_func
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.write_count = 0
+        self.last_error = None
+        self._cond = threading.Condition()
+        self._first_request = None
+        self._last_request = None
+        self._urgent = False
+        self._writing = False
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="history-autosave", daemon=True)
+        self._thread.start()
+    
+    def request(self) -> None:
+        """Schedule a write; requests arriving within the debounce window share it."""
+        with self._cond:
+            now = time.monotonic()
+            if self._first_request is None:
+                self._first_request = now
+            self._last_request = now
+            self._cond.notify()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write any pending request now and wait for it; False if it timed out."""
+        with self._cond:
+            if self._first_request is not None:
+                self._urgent = True
+                self._cond.notify()
+            return self._cond.wait_for(
+                lambda: self._first_request is None and not self._writing, timeout
+            )
+    
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Flush pending work and shut the thread down."""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout)
+    
+    def _run(self) -> None:
+        """Wait out the debounce window (capped at max_delay), then write once."""
+        while True:
+            with self._cond:
+                while True:
+                    if self._first_request is None:
+                        if self._stopping:
+                            return
+                        self._cond.wait()
+                        continue
+                    
+                    now = time.monotonic()
+                    due = min(self._last_request + self.debounce, self._first_request + self.max_delay)
+                    if self._urgent or self._stopping or now >= due:
+                        break
+                    self._cond.wait(due - now)
+                
+                self._first_request = None
+                self._last_request = None
+                self._urgent = False
+                self._writing = True
+            
+            try:
+                self.write_func()
+                self.last_error = None
+            except Exception as e:
+                print(f"Failed to save history: {e}")
+                self.last_error = e
+            
+            with self._cond:
+                self._writing = False
+                self.write_count += 1
+                self._cond.notify_all()
+
+
+class CustomCatalog:
+    """User-defined foods or exercises, kept in memory and written back in one batch.
+    
+    Changes only mark names dirty; flush() rewrites the file once for all of them,
+    so bulk imports cost a single write.
+    """
+    
+    def __init__(self, path: str, codec: Union[JsonCodec, MsgpackCodec] = CODECS["json"],
+                 file_lock: Optional[FileLock] = None):
+        self.path = path
+        self.codec = codec
+        self.file_lock = file_lock or FileLock(path + ".lock")
+        self.entries = {}
+        self.dirty = set()
+        self.write_count = 0
+        self._signature = None
+        self._lock = threading.RLock()
+    
+    def load(self) -> Dict[str, Any]:
+        """Read the file once; later lookups are served from memory."""
+        with self._lock:
+            self.entries = self._read()
+            self.dirty.clear()
+            return dict(self.entries)
+    
+    def restore(self, entries: Dict[str, Any]) -> Dict[str, Any]:
+        """Take over entries known to match the file on disk instead of reading it."""
+        with self._lock:
+            self.entries = entries
+            self.dirty.clear()
+            self._signature = self._stat_signature()
+            return dict(self.entries)
+    
+    def changed_on_disk(self) -> bool:
+        """Whether another process rewrote the file since it was last read or written."""
+        return self._stat_signature() != self._signature
+    
+    def add(self, name: str, value: Any) -> None:
+        self.add_many({name: value})
+    
+    def add_many(self, items: Dict[str, Any]) -> None:
+        """Add or replace several items; nothing is written until flush()."""
+        with self._lock:
+            self.entries.update(items)
+            self.dirty.update(items)
+    
+    def remove(self, name: str) -> bool:
+        """Drop an item; False if it was not in the catalog."""
+        with self._lock:
+            if name not in self.entries:
+                return False
+            del self.entries[name]
+            self.dirty.add(name)
+            return True
+    
+    def flush(self) -> None:
+        """Write the catalog if anything changed since the last flush.
+        
+        Items another process saved in the meantime are merged in rather than overwritten.
+        """
+        with self.file_lock, self._lock:
+            if not self.dirty:
+                return
+            if self.changed_on_disk():
+                entries = self._read()
+                for name in self.dirty:
+                    if name in self.entries:
+                        entries[name] = self.entries[name]
+                    else:
+                        entries.pop(name, None)
+                self.entries = entries
+            write_data_file(self.path, self.entries, self.codec)
+            self._signature = self._stat_signature()
+            self.dirty.clear()
+            self.write_count += 1
+    
+    def __contains__(self, name) -> bool:
+        return name in self.entries
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def _read(self) -> Dict[str, Any]:
+        self._signature = self._stat_signature()
+        if self._signature is None:
+            return {}
+        return read_data_file(self.path)
+    
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+
+class HistorySnapshots:
+    """Bounded ring of point-in-time history snapshots, stored beside the data file.
+    
+    Each day is stored once under the hash of its content, and a snapshot is a small
+    manifest mapping dates to those hashes. Snapshots share every day that did not
+    change between them, so taking one only writes the days that did.
+    """
+    
+    def __init__(self, snapshot_dir: str, codec: Union[JsonCodec, MsgpackCodec] = CODECS["json"],
+                 ring_size: int = 10, pinned_size: int = 5):
+        self.snapshot_dir = snapshot_dir
+        self.days_dir = os.path.join(snapshot_dir, "days")
+        self.codec = codec
+        self.ring_size = ring_size
+        # Pinned snapshots (before deleting everything or restoring) get their own ring,
+        # so routine snapshots can never push them out
+        self.pinned_size = pinned_size
+    
+    # Sync bookkeeping that a restore itself changes, so it is left out of the hash
+    UNHASHED_KEYS = ("updated", "deleted")
+    
+    @classmethod
+    def digest(cls, day_data: DayData) -> str:
+        """Content hash of a day, independent of key order."""
+        content = {key: value for key, value in day_data.items() if key not in cls.UNHASHED_KEYS}
+        return hashlib.sha1(
+            json.dumps(content, sort_keys=True, separators=(",", ":"), default=encode_entry).encode("utf-8")
+        ).hexdigest()
+    
+    def ids(self) -> List[int]:
+        """Ids of the stored snapshots, oldest first."""
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        return sorted(
+            int(name[len("snapshot-"):-len(".manifest")])
+            for name in os.listdir(self.snapshot_dir)
+            if name.startswith("snapshot-") and name.endswith(".manifest")
+        )
+    
+    def load(self, snapshot_id: int) -> Dict[str, Any]:
+        """Manifest of a snapshot: id, created, label, seq and days ({date: hash})."""
+        try:
+            return read_data_file(self._manifest_file(snapshot_id))
+        except FileNotFoundError:
+            raise ValueError(f"No history snapshot {snapshot_id}") from None
+    
+    def latest(self) -> Optional[Dict[str, Any]]:
+        ids = self.ids()
+        return self.load(ids[-1]) if ids else None
+    
+    def get_day(self, digest: str) -> DayData:
+        return read_data_file(os.path.join(self.days_dir, digest))
+    
+    def take(self, days: Iterable[Tuple[str, Union[str, DayData]]], label: str, seq: int,
+             keep: Iterable[int] = (), pinned: bool = False) -> Dict[str, Any]:
+        """Store a snapshot and trim the rings, never dropping the snapshots in keep.
+        
+        days yields (date, day) for days that may have changed and (date, hash) for
+        days known to match a stored one; only days not stored yet are written.
+        """
+        os.makedirs(self.days_dir, exist_ok=True)
+        manifest_days = {}
+        for date, day_data in days:
+            if isinstance(day_data, str):
+                manifest_days[date] = day_data
+                continue
+            digest = self.digest(day_data)
+            path = os.path.join(self.days_dir, digest)
+            if not os.path.exists(path):
+                write_data_file(path, day_data, self.codec)
+            manifest_days[date] = digest
+        
+        ids = self.ids()
+        manifest = {
+            "id": ids[-1] + 1 if ids else 1,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "label": label,
+            "seq": seq,
+            "pinned": pinned,
+            "days": manifest_days
+        }
+        write_data_file(self._manifest_file(manifest["id"]), manifest, self.codec)
+        self._trim(set(keep))
+        return manifest
+    
+    def _trim(self, keep: Set[int]) -> None:
+        """Drop the oldest snapshots past each ring's size, then the days no snapshot uses any more."""
+        routine, pinned = [], []
+        for snapshot_id in self.ids():
+            (pinned if self.load(snapshot_id).get("pinned") else routine).append(snapshot_id)
+        dropped = []
+        for ring, size in ((routine, self.ring_size), (pinned, self.pinned_size)):
+            dropped += [snapshot_id for snapshot_id in ring if snapshot_id not in keep][:max(len(ring) - size, 0)]
+        if not dropped:
+            return
+        for snapshot_id in dropped:
+            os.remove(self._manifest_file(snapshot_id))
+        
+        used = set()
+        for snapshot_id in self.ids():
+            used.update(self.load(snapshot_id)["days"].values())
+        for name in os.listdir(self.days_dir):
+            if name not in used:
+                os.remove(os.path.join(self.days_dir, name))
+    
+    def _manifest_file(self, snapshot_id: int) -> str:
+        return os.path.join(self.snapshot_dir, f"snapshot-{snapshot_id:06d}.manifest")
+
+
+class StateCache:
+    """Copy of the state parsed at startup, so a warm start skips the parsing.
+    
+    Each section is stamped with the (inode, size, mtime) of the files it was built
+    from and only used while they all still match; otherwise that state is parsed
+    from the files as usual. The whole cache is read, and written, in one go, as
+    plain data through the file codecs (never pickle), so a cache from a shared
+    directory cannot run code.
+    """
+    
+    VERSION = 3
+    
+    def __init__(self, path: str):
+        self.path = path
+        # Fastest to decode first; orjson parses this mostly-map data quicker than msgpack
+        self.codec = next(CODECS[name] for name in ("orjson", "msgpack", "compact") if CODECS[name].available)
+        self.hits = 0
+        self.misses = 0
+        self._sections = {}
+        try:
+            cache = read_data_file(path)
+            if isinstance(cache, dict) and cache.get("version") == self.VERSION:
+                self._sections = cache["sections"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring unreadable state cache: {e}")
+    
+    def get(self, name: str, sources: List[str]) -> Any:
+        """The cached value of a section, or None if it is missing or its sources changed."""
+        section = self._sections.get(name)
+        if isinstance(section, dict) and section.get("sources") == self._signatures(sources):
+            self.hits += 1
+            return section["value"]
+        self.misses += 1
+        return None
+    
+    def put(self, name: str, sources: List[str], value: Any) -> None:
+        """Store a section as of now; call it only when value matches the sources on disk."""
+        self._sections[name] = {"sources": self._signatures(sources), "value": value}
+    
+    def discard(self, name: str) -> None:
+        self._sections.pop(name, None)
+    
+    def save(self) -> None:
+        """Write every section back."""
+        write_data_file(self.path, {"version": self.VERSION, "sections": self._sections}, self.codec)
+    
+    @staticmethod
+    def _signatures(sources: List[str]) -> List[Optional[List[int]]]:
+        # Lists, not tuples, so they compare equal to the decoded ones
+        signatures = []
+        for path in sources:
+            try:
+                stat = os.stat(path)
+                signatures.append([stat.st_ino, stat.st_size, stat.st_mtime_ns])
+            except FileNotFoundError:
+                signatures.append(None)
+        return signatures
+
+
 class DataManager:
     """Class to handle all data operations including loading, saving, and manipulating data."""
     
-    def __init__(self):
-        self.data_file = "burger_tracker_data.json"
-        self.custom_food_file = "custom_foods.json"
-        self.custom_exercise_file = "custom_exercises.json"
+    # Version of the history data file layout. To change the layout, bump this and
+    # add a step to _history_migrations(); existing files are upgraded once on load.
+    HISTORY_SCHEMA_VERSION = 2
+    
+    # Journal operations that can remove entries from a day, so removed ids become tombstones
+    REMOVING_OPS = {"clear_day", "clear_food", "clear_exercise", "delete_food", "delete_exercise", "put_day",
+                    "delete_day"}
+    
+    # Memory budget (bytes of stored day data) read-only mode uses when none is given
+    READONLY_MEMORY_BUDGET = 4 * 1024 * 1024
+    
+    def __init__(self, storage_engine: str = "json", codec: str = "json",
+                 archive_after_days: Optional[int] = 365, data_dir: str = ".", readonly: bool = False,
+                 memory_budget: Optional[int] = None):
+        if readonly and storage_engine != "json":
+            raise ValueError("read-only mode needs the json storage engine")
+        if memory_budget is not None and storage_engine != "json":
+            raise ValueError("a memory budget needs the json storage engine")
+        self.storage_engine = storage_engine
+        # Serializer for newly written files; existing files are read whatever they use
+        self.codec = get_codec(codec)
+        
+        # Read-only mode maps the data file and refuses every change, so nothing is written
+        self.readonly = readonly
+        
+        # Bytes of stored history kept decoded; the least recently used months past it are
+        # evicted and read again on access. None keeps every day read in memory.
+        if memory_budget is None and readonly:
+            memory_budget = self.READONLY_MEMORY_BUDGET
+        self.memory_budget = memory_budget
+        
+        # Every file lives in the data directory (one per profile)
+        self.data_dir = data_dir
+        if not readonly:
+            os.makedirs(data_dir, exist_ok=True)
+        self.data_file = os.path.join(data_dir, "burger_tracker_data.json")
+        self.journal_file = os.path.join(data_dir, "burger_tracker_data.journal")
+        self.index_file = os.path.join(data_dir, "burger_tracker_data.idx")
+        self.totals_file = os.path.join(data_dir, "burger_tracker_data.totals")
+        self.database_file = os.path.join(data_dir, "burger_tracker_data.db")
+        self.shard_dir = os.path.join(data_dir, "burger_tracker_shards")
+        self.columns_file = os.path.join(data_dir, "burger_tracker_data.cols")
+        self.archive_dir = os.path.join(data_dir, "burger_tracker_archive")
+        self.lock_file = os.path.join(data_dir, "burger_tracker_data.lock")
+        self.custom_food_file = os.path.join(data_dir, "custom_foods.json")
+        self.custom_exercise_file = os.path.join(data_dir, "custom_exercises.json")
+        self.snapshot_dir = os.path.join(data_dir, "burger_tracker_snapshots")
+        self.state_cache_file = os.path.join(data_dir, "burger_tracker_state.cache")
+        
+        # Journal compaction settings (records, seconds)
+        self.compaction_threshold = 500
+        self.compaction_interval = 30.0
+        
+        # Cold storage: compaction moves days older than this many days into compressed
+        # segments grouped by "month" or "year"; None or 0 keeps everything in the data file
+        self.archive_after_days = archive_after_days
+        self.archive_group = "month"
+        self.archive_compression = "gzip"
+        
+        # Autosave settings (seconds): quiet period before a write, and the longest
+        # a change can wait while mutations keep arriving
+        self.autosave_debounce = 0.5
+        self.autosave_max_delay = 2.0
+        
+        # Serializes writes with other processes sharing this directory; always taken before _lock
+        self.file_lock = FileLock(self.lock_file, shared=readonly)
+        
+        # Guards history against the background compaction and autosave threads
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._journal_seq = 0
+        self.journal = HistoryJournal(self.journal_file)
+        
+        # (date, entry ids, tombstones) from before the change _mutation is guarding
+        self._removing_from = None
+        
+        # Point-in-time snapshots, taken before destructive changes and on request
+        self.snapshots = HistorySnapshots(self.snapshot_dir, self.codec, ring_size=10)
+        self._last_snapshot_id = None
+        
+        # Food, category and exercise names of entries, interned as small ids (shared process-wide)
+        self.symbols = SYMBOLS
+        
+        # Date strings <-> day ordinals for range arithmetic (shared process-wide)
+        self.days = DAYS
+        
+        # DaySummary per date, dropped by _note_version when a mutation touches the day and
+        # by _forget_summaries when the memory budget evicts it
+        self._day_summaries = {}
+        
+        # Every entry as in-memory columns for whole-history aggregates (engines without
+        # indexed queries); built on first use, then patched with the days changed since
+        self._entry_columns = None
+        self._entry_columns_seq = 0
+        
+        # State parsed by the last run, reused on a warm start while its source files are unchanged
+        self.state_cache = StateCache(self.state_cache_file)
+        
+        # Custom foods and exercises, batched so bulk additions are written once
+        self.custom_foods = CustomCatalog(self.custom_food_file, self.codec, self.file_lock)
+        self.custom_exercises = CustomCatalog(self.custom_exercise_file, self.codec, self.file_lock)
+        
+        # Alternative persistence engine; None means JSON snapshot + journal
+        self.store = None
+        if storage_engine == "sqlite":
+            self.store = SqliteHistoryStore(self.database_file, self._lock)
+        elif storage_engine == "sharded":
+            self.store = ShardedHistoryStore(self.shard_dir, self._lock, self.codec)
+        elif storage_engine == "columnar":
+            self.store = ColumnarHistoryStore(self.columns_file, self._lock)
         
         # Initialize databases
         self.food_database = self._initialize_food_database()
@@ -786,14 +3902,32 @@ class DataManager:
         # Load custom databases
         self.load_custom_databases()
         
+        # Per-day totals sidecar of the JSON data file, set up by load_history
+        self.day_totals_index = None
+        
         # Load history
-        self.history = self.load_history()
+        self.day_versions = {}
+        with self.file_lock:
+            self.history = self.load_history()
+        if self.store is None:
+            self.history.on_evict = self._forget_summaries
         
         # Today's date string
         self.current_date = datetime.datetime.now().strftime("%Y-%m-%d")
         
         # Today's entries
         self.today_entries = self.get_day_data(self.current_date)
+        
+        # Disk writes happen here so the UI thread never waits on them
+        self.writer = AutosaveWriter(self._write_pending, self.autosave_debounce, self.autosave_max_delay)
+        
+        # Periodically fold the journal back into the snapshot
+        self._compaction_stop = threading.Event()
+        if self.store is None and not readonly:
+            self._compaction_thread = threading.Thread(
+                target=self._compaction_worker, name="history-compaction", daemon=True
+            )
+            self._compaction_thread.start()
     
     def _initialize_food_database(self) -> Dict[str, Dict[str, Any]]:
         """Initialize the default food database."""
@@ -854,57 +3988,742 @@ class DataManager:
         """Load custom foods and exercises from files."""
         # Load custom foods
         try:
-            if os.path.exists(self.custom_food_file):
-                with open(self.custom_food_file, "r") as f:
-                    custom_foods = json.load(f)
-                    # Add custom foods to the main database
-                    self.food_database.update(custom_foods)
+            # Add custom foods to the main database
+            self.food_database.update(self._load_catalog(self.custom_foods, "custom_foods"))
         except Exception as e:
             print(f"Error loading custom foods: {e}")
         
         # Load custom exercises
         try:
-            if os.path.exists(self.custom_exercise_file):
-                with open(self.custom_exercise_file, "r") as f:
-                    custom_exercises = json.load(f)
-                    # Add custom exercises to the main database
-                    self.exercise_database.update(custom_exercises)
+            # Add custom exercises to the main database
+            self.exercise_database.update(self._load_catalog(self.custom_exercises, "custom_exercises"))
         except Exception as e:
             print(f"Error loading custom exercises: {e}")
     
+    def _load_catalog(self, catalog: CustomCatalog, section: str) -> Dict[str, Any]:
+        """Entries of a catalog, from the state cache when the file is unchanged."""
+        entries = self.state_cache.get(section, [catalog.path])
+        if entries is not None:
+            return catalog.restore(entries)
+        return catalog.load()
+    
+    def read_data_file(self, path: str) -> Any:
+        """Read a persisted file, detecting the codec it was written with."""
+        return read_data_file(path)
+    
+    def write_data_file(self, path: str, obj: Any) -> None:
+        """Write a persisted file with the configured codec."""
+        write_data_file(path, obj, self.codec)
+    
     def load_history(self) -> History:
-        """Load history from file with error handling and format conversion."""
-        if os.path.exists(self.data_file):
+        """Load the history snapshot, convert old formats and replay the journal on top."""
+        if self.store is not None:
+            # Days are fetched lazily, so opening a large history is instant
+            if not self.store.is_migrated():
+                self.migrate_json_to_store()
+            return self.store.open_history()
+        
+        # A warm start takes the index, sidecar and replayed journal over from the last run
+        history = self._load_cached_history()
+        if history is not None:
+            return history
+        
+        # Only the offset index is read here; days are decoded the first time they are accessed
+        # Archived days stay readable even when archiving new ones is turned off
+        archive = HistoryArchive(self.archive_dir, self.archive_group, self.archive_compression, self.codec)
+        history = IndexedHistoryFile(self.data_file, self.index_file, self.codec, self._lock, archive, self.readonly,
+                                     self.memory_budget)
+        
+        # Files written before the schema stamp are version 1
+        schema_version = history.meta.get("schema_version", 1)
+        if schema_version < self.HISTORY_SCHEMA_VERSION and self.readonly:
+            history.upgrade = lambda day_data: self._upgrade_day(day_data, schema_version)
+        elif schema_version < self.HISTORY_SCHEMA_VERSION and len(history) > 0:
             try:
-                with open(self.data_file, "r") as f:
-                    history = json.load(f)
-                    
-                    # Convert old format to new format if needed
-                    for date, entries in history.items():
-                        if isinstance(entries, list):  # Old format
-                            history[date] = {"food": entries, "exercise": [], "weight": None}
-                        elif "weight" not in entries:  # Add weight field if missing
-                            history[date]["weight"] = None
-                    
-                    return history
+                self.migrate_history_file(history, schema_version)
             except Exception as e:
-                print(f"Failed to load history: {e}")
-                return {}
-        return {}
+                print(f"Failed to migrate history: {e}")
+        
+        # Summaries are served from the sidecar for days not changed since the last compaction
+        self.day_totals_index = DayTotalsIndex(self.totals_file, self.data_file, archive.index_file, self.codec)
+        self.day_totals_index.load()
+        
+        # Sequence number of the last journal record folded into the snapshot
+        journal_seq = history.meta.get("journal_seq", 0)
+        
+        # Journal sequence number of the last change to each day, used to find what to sync
+        self.day_versions = dict(history.meta.get("day_versions", {}))
+        
+        # Replay mutations logged after the snapshot was written
+        try:
+            for record in self.journal.read(journal_seq):
+                self._replay(history, record)
+                journal_seq = record["seq"]
+        except Exception as e:
+            print(f"Failed to replay history journal: {e}")
+        
+        self._journal_seq = journal_seq
+        return history
+    
+    def _history_sources(self) -> List[str]:
+        """Files the cached history state is built from."""
+        return [self.data_file, os.path.join(self.archive_dir, "index.json"), self.totals_file, self.journal_file]
+    
+    def _load_cached_history(self) -> Optional[IndexedHistoryFile]:
+        """Rebuild the JSON history from the state cache, or None if its files changed since."""
+        cached = self.state_cache.get("history", self._history_sources())
+        if cached is None:
+            return None
+        cached_columns = self.state_cache.get("entry_columns", self._history_sources())
+        
+        # Everything is decoded before any of it is used, so a damaged cache changes nothing
+        try:
+            archive = HistoryArchive(self.archive_dir, self.archive_group, self.archive_compression, self.codec,
+                                     segments=cached["archive"])
+            history = IndexedHistoryFile(self.data_file, self.index_file, self.codec, self._lock, archive,
+                                         self.readonly, self.memory_budget, state=cached["history"])
+            day_totals_index = DayTotalsIndex(self.totals_file, self.data_file, archive.index_file, self.codec)
+            day_totals_index.restore(cached["totals"])
+            day_versions = dict(cached["day_versions"])
+            journal_seq = int(cached["journal_seq"])
+            position, identity, record_count = cached["journal"]
+            identity = tuple(identity) if identity is not None else None
+            columns = None
+            if cached_columns is not None:
+                columns = (HistoryColumns.restore(cached_columns["columns"]), cached_columns["journal_seq"])
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable state cache: {e}")
+            return None
+        
+        self.day_totals_index = day_totals_index
+        self.day_versions = day_versions
+        self._journal_seq = journal_seq
+        self.journal.position, self.journal.identity, self.journal.record_count = position, identity, record_count
+        if columns is not None:
+            self._entry_columns, self._entry_columns_seq = columns
+        return history
+    
+    def _history_state(self) -> Optional[Dict[str, Any]]:
+        """What load_history would rebuild from the files right now, or None if that is not known.
+        
+        Only days the journal changed since the snapshot are kept; the rest are decoded
+        lazily as on a cold start. Must hold file_lock and _lock, after _catch_up().
+        """
+        history = self.history
+        if history.changed_on_disk() or history.meta.get("schema_version", 1) < self.HISTORY_SCHEMA_VERSION:
+            return None
+        try:
+            journal_size = os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            journal_size = 0
+        if journal_size != self.journal.position:
+            return None
+        
+        snapshot_seq = history.meta.get("journal_seq", 0)
+        changed = [date for date, seq in self.day_versions.items() if seq > snapshot_seq]
+        index = self.day_totals_index
+        return {
+            "history": history.state(changed),
+            "archive": history.archive.state(),
+            "totals": index.days if index.valid else None,
+            "day_versions": self.day_versions,
+            "journal_seq": self._journal_seq,
+            "journal": [self.journal.position, self.journal.identity, self.journal.record_count]
+        }
+    
+    def save_state_cache(self) -> None:
+        """Store the parsed state for the next start; done on close, after everything is flushed."""
+        if self.readonly:
+            return
+        with self.file_lock, self._lock:
+            for catalog, section in ((self.custom_foods, "custom_foods"),
+                                     (self.custom_exercises, "custom_exercises")):
+                if catalog.dirty or catalog.changed_on_disk():
+                    self.state_cache.discard(section)
+                else:
+                    self.state_cache.put(section, [catalog.path], catalog.entries)
+            
+            if self.store is None:
+                self.journal.sync()
+                self._catch_up()
+                state = self._history_state()
+                if state is None:
+                    self.state_cache.discard("history")
+                else:
+                    self.state_cache.put("history", self._history_sources(), state)
+                
+                if state is None or self._entry_columns is None:
+                    self.state_cache.discard("entry_columns")
+                else:
+                    self.state_cache.put("entry_columns", self._history_sources(),
+                                         {"journal_seq": self._journal_seq, "columns": self.entry_columns().state()})
+            
+            self.state_cache.save()
     
     def save_history(self) -> bool:
-        """Save history to file with error handling."""
-        # Save current entries to today's date
-        self.history[self.current_date] = self.today_entries
+        """Schedule pending changes to be made durable by the autosave thread.
+        
+        Returns straight away; False means the previous background write failed.
+        """
+        if self.readonly:
+            return True
+        
+        with self._lock:
+            # Save current entries to today's date
+            self.history[self.current_date] = self.today_entries
+        
+        self.writer.request()
+        return self.writer.last_error is None
+    
+    def flush_history(self, timeout: Optional[float] = None) -> bool:
+        """Block until every scheduled write has reached the disk."""
+        return self.writer.flush(timeout) and self.writer.last_error is None
+    
+    def migrate_json_to_store(self) -> bool:
+        """One-shot import of the JSON snapshot and journal into the alternative store."""
+        if self.store is None:
+            return False
         
-        # Save history to file
         try:
-            with open(self.data_file, "w") as f:
-                json.dump(self.history, f, indent=4)
+            if os.path.exists(self.data_file) or os.path.exists(self.journal_file):
+                store, self.store = self.store, None
+                try:
+                    history = self.load_history()
+                finally:
+                    self.store = store
+                self.store.import_history(history)
+                history.close()
+            self.store.mark_migrated(self.data_file)
             return True
         except Exception as e:
-            print(f"Failed to save history: {e}")
+            print(f"Failed to migrate history to {self.storage_engine}: {e}")
+            return False
+    
+    def migrate_history_file(self, history: IndexedHistoryFile, from_version: int) -> None:
+        """Upgrade every day of the data file to the current schema and write it back once."""
+        for date in list(history):
+            history[date] = self._upgrade_day(history[date], from_version)
+        
+        meta = dict(history.meta, schema_version=self.HISTORY_SCHEMA_VERSION)
+        history.write_snapshot(history.snapshot(), meta, history.generation)
+        history.release_days()
+    
+    def _upgrade_day(self, day_data: Union[DayData, List[FoodEntry]], from_version: int) -> DayData:
+        """Run one day through every upgrade step from from_version to the current schema."""
+        steps = self._history_migrations()
+        for version in range(from_version, self.HISTORY_SCHEMA_VERSION):
+            day_data = steps[version](day_data)
+        return day_data
+    
+    def _history_migrations(self) -> Dict[int, Any]:
+        """Per-day upgrade steps, keyed by the schema version they upgrade from."""
+        return {
+            1: self._migrate_day_v1
+        }
+    
+    @staticmethod
+    def _migrate_day_v1(entries: Union[DayData, List[FoodEntry]]) -> DayData:
+        """v1 -> v2: food-only list days become full days and every day gets a weight."""
+        if isinstance(entries, list):  # Old format
+            return {"food": entries, "exercise": [], "weight": None}
+        if "weight" not in entries:  # Add weight field if missing
+            entries["weight"] = None
+        return entries
+    
+    def compact_history(self) -> bool:
+        """Fold the journal into a fresh snapshot of the data file.
+        
+        Days that were never decoded are copied over as raw bytes, and days past
+        archive_after_days move to the compressed archive.
+        """
+        self._check_writable()
+        with self._compaction_lock:
+            with self.file_lock, self._lock:
+                # Other processes may have logged records this snapshot must include
+                self._catch_up()
+                snapshot = self._snapshot_history()
+                snapshot_seq = self._journal_seq
+                generation = self.history.generation
+                day_versions = dict(self.day_versions)
+            
+            # The new file is written without the file lock, so mutations (which take it
+            # first) are not held up; records they append survive truncate_through()
+            prepared = None
+            try:
+                meta = {"journal_seq": snapshot_seq, "schema_version": self.HISTORY_SCHEMA_VERSION,
+                        "day_versions": day_versions}
+                totals = self._snapshot_totals(snapshot)
+                prepared = self.history.prepare_snapshot(snapshot, meta, self._archive_cutoff())
+                
+                with self.file_lock:
+                    if not self.history.commit_snapshot(prepared, generation):
+                        return False
+                    self.day_totals_index.write(totals)
+                    with self._lock:
+                        self.journal.truncate_through(snapshot_seq)
+                        # Days now stored as they are in memory can be evicted again
+                        self.history.unpin([date for date, seq in self.day_versions.items() if seq <= snapshot_seq])
+                return True
+            except Exception as e:
+                if prepared is not None and os.path.exists(prepared["tmp_file"]):
+                    os.remove(prepared["tmp_file"])
+                print(f"Failed to compact history: {e}")
+                return False
+    
+    def close(self) -> None:
+        """Flush pending saves, stop background work and release the journal or database."""
+        self.writer.stop()
+        self._compaction_stop.set()
+        for catalog in (self.custom_foods, self.custom_exercises):
+            try:
+                catalog.flush()
+            except Exception as e:
+                print(f"Error saving {catalog.path}: {e}")
+        try:
+            self.save_state_cache()
+        except Exception as e:
+            print(f"Failed to save state cache: {e}")
+        with self._lock:
+            if self.store is not None:
+                self.store.close()
+            else:
+                self.journal.sync()
+                self.journal.close()
+                self.history.close()
+        self.file_lock.close()
+    
+    def memory_stats(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters of the in-memory history (empty for other engines)."""
+        if self.store is not None:
+            return {}
+        stats = self.history.memory_stats()
+        if self.history.archive is not None:
+            stats["archive_hits"] = self.history.archive.cache_hits
+            stats["archive_misses"] = self.history.archive.cache_misses
+        return stats
+    
+    def refresh_from_disk(self) -> bool:
+        """Merge in changes other processes made to the data files; True if anything changed."""
+        with self.file_lock, self._lock:
+            changed = self._catch_up()
+            for catalog, database in ((self.custom_foods, self.food_database),
+                                      (self.custom_exercises, self.exercise_database)):
+                if catalog.changed_on_disk() and not catalog.dirty:
+                    try:
+                        database.update(catalog.load())
+                        changed = True
+                    except Exception as e:
+                        print(f"Error loading {catalog.path}: {e}")
+            return changed
+    
+    def _check_writable(self) -> None:
+        if self.readonly:
+            raise PermissionError(f"History in '{self.data_dir}' is open read-only")
+    
+    @contextmanager
+    def _mutation(self, date: Optional[str] = None):
+        """Hold the directory lock and bring history up to date before changing it.
+        
+        Pass the date when the change can remove entries: they get ids first, and ids of
+        the ones removed are kept as tombstones so a sync does not bring them back.
+        
+        This stays on the caller's thread: records number and order changes (deletes
+        address entries by index), so another process must see this one in the journal
+        before it takes the lock. It costs a flock, two stats and a write to the page
+        cache; fsync is left to the autosave thread.
+        """
+        self._check_writable()
+        with self.file_lock, self._lock:
+            self._catch_up()
+            if date is None:
+                yield
+                return
+            ids, tombstones = self._entry_ids(date, self.get_day_data(date))
+            previous, self._removing_from = self._removing_from, (date, ids, tombstones)
+            try:
+                yield
+            finally:
+                self._removing_from = previous
+    
+    def _catch_up(self) -> bool:
+        """Apply journal records other processes appended, or reload after they compacted.
+        
+        Only the days those records touch are decoded. Must hold file_lock and _lock.
+        """
+        if self.store is not None:
+            return False
+        
+        try:
+            if self.history.changed_on_disk():
+                self._reload_history()
+                return True
+            
+            records = [record for record in self.journal.read_new() if record["seq"] > self._journal_seq]
+            for record in records:
+                self._replay(self.history, record)
+                self._journal_seq = record["seq"]
+        except Exception as e:
+            print(f"Failed to merge history changes from disk: {e}")
             return False
+        
+        if records:
+            self._sync_today()
+        return bool(records)
+    
+    def _reload_history(self) -> None:
+        """Re-index a data file another process compacted and replay the journal after it.
+        
+        Everything this process logged is already on disk, so the cached days can be dropped.
+        """
+        self.history.reload()
+        self.day_totals_index.load()
+        journal_seq = self.history.meta.get("journal_seq", 0)
+        self.day_versions = dict(self.history.meta.get("day_versions", {}))
+        for record in self.journal.read(journal_seq):
+            self._replay(self.history, record)
+            journal_seq = record["seq"]
+        self._journal_seq = max(self._journal_seq, journal_seq)
+        self.journal.close()
+        self._day_summaries.clear()
+        self._entry_columns = None
+        self._sync_today()
+    
+    def _sync_today(self) -> None:
+        """Point today_entries at the stored day after history was changed underneath it."""
+        if self.current_date in self.history:
+            self.today_entries = self.history[self.current_date]
+        else:
+            self.today_entries = {"food": [], "exercise": [], "weight": None}
+    
+    def _snapshot_history(self) -> Dict[str, Union[DayData, Tuple[int, int]]]:
+        """Copy the loaded days of the history so it can be written without the lock."""
+        snapshot = self.history.snapshot()
+        snapshot[self.current_date] = {
+            **self.today_entries,
+            "food": list(self.today_entries.get("food", [])),
+            "exercise": list(self.today_entries.get("exercise", [])),
+            "weight": self.today_entries.get("weight")
+        }
+        return snapshot
+    
+    def _snapshot_totals(self, snapshot: Dict[str, Union[DayData, Tuple[int, int]]]) -> Dict[str, Dict[str, Any]]:
+        """Totals of every day a compaction keeps, reusing the sidecar for days it did not decode."""
+        index = self.day_totals_index
+        totals = {}
+        for date, day_data in snapshot.items():
+            if not isinstance(day_data, tuple):
+                totals[date] = DayTotalsIndex.day_totals(day_data)
+            elif index.valid and date in index.days:
+                totals[date] = index.days[date]
+            else:
+                totals[date] = DayTotalsIndex.day_totals(self.history.read_span(day_data))
+        
+        # Archived days that were not touched stay in the archive
+        archive = self.history.archive
+        for date in archive.dates():
+            if date not in totals and date in self.history:
+                if index.valid and date in index.days:
+                    totals[date] = index.days[date]
+                else:
+                    totals[date] = DayTotalsIndex.day_totals(archive.get_day(date))
+        return dict(sorted(totals.items()))
+    
+    def daily_totals(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Per-day totals (see DayTotalsIndex.day_totals) between start and end, in date order.
+        
+        With the JSON engine, days not changed since the last compaction come from the
+        sidecar without being parsed; otherwise days are read one at a time.
+        """
+        def in_range(date):
+            return (start is None or date >= start) and (end is None or date <= end)
+        
+        index = self.day_totals_index
+        if self.store is not None or index is None or not index.valid:
+            # Streamed without the lock, so summaries are reused here but not cached
+            summaries = self._day_summaries
+            return {date: (summaries.get(date) or DaySummary(day_data)).totals()
+                    for date, day_data in self.iter_days(start, end)}
+        
+        with self._lock:
+            loaded = self.history.loaded_days()
+            totals = {}
+            if not self.history.cleared:
+                totals = {date: day_totals for date, day_totals in index.days.items()
+                          if in_range(date) and date not in loaded}
+            for date, day_data in loaded.items():
+                if day_data is not None and in_range(date):
+                    totals[date] = self._cached_summary(date, day_data).totals()
+        return dict(sorted(totals.items()))
+    
+    def day_summary(self, date: str) -> DaySummary:
+        """Totals of one day, cached until a mutation touches the day."""
+        summary = self._day_summaries.get(date)
+        if summary is None:
+            with self._lock:
+                summary = self._cached_summary(date, self.get_day_data(date))
+        return summary
+    
+    def _forget_summaries(self, dates: List[str]) -> None:
+        """Drop the summaries of days the history evicted, so they are bounded by the same budget."""
+        for date in dates:
+            self._day_summaries.pop(date, None)
+    
+    def _cached_summary(self, date: str, day_data: DayData) -> DaySummary:
+        """Summary of a day from the cache, or computed from day_data and cached. Must hold _lock."""
+        summary = self._day_summaries.get(date)
+        if summary is None:
+            summary = self._day_summaries[date] = DaySummary(day_data)
+        return summary
+    
+    def entry_columns(self) -> HistoryColumns:
+        """Every stored entry as columns, brought up to date with the days changed since last time.
+        
+        The first call decodes each day once; later calls re-encode only the days whose
+        journal version is newer than the columns. Superseded columns are never closed,
+        so callers can aggregate over the returned ones without holding the lock.
+        """
+        with self._lock:
+            columns = self._entry_columns
+            if columns is None:
+                days = {self.days.ordinal(date): day_data for date, day_data in self.iter_days()}
+                columns = HistoryColumns.empty().merged(days, cleared=True, keep_ids=False)
+            else:
+                changed = [date for date, seq in self.day_versions.items() if seq > self._entry_columns_seq]
+                # save_history() can store an empty today without logging a mutation
+                if self.current_date in self.history and not columns.has_day(self.days.ordinal(self.current_date)):
+                    changed.append(self.current_date)
+                if changed:
+                    columns = columns.merged({self.days.ordinal(date): self.history.get(date) for date in changed},
+                                             keep_ids=False)
+            self._entry_columns = columns
+            self._entry_columns_seq = self._journal_seq
+            return columns
+    
+    def _summary_columns(self) -> Optional[HistoryColumns]:
+        """Entry columns for a summary, or None to read the totals sidecar instead.
+        
+        A valid sidecar answers without decoding any day, so the columns are not built
+        just for a summary while it can.
+        """
+        index = self.day_totals_index
+        if self._entry_columns is None and self.store is None and index is not None and index.valid:
+            return None
+        return self.entry_columns()
+    
+    def _archive_cutoff(self) -> Optional[str]:
+        """Date before which days belong in the archive, or None when archiving is off."""
+        if not self.archive_after_days:
+            return None
+        cutoff = datetime.date.today() - datetime.timedelta(days=self.archive_after_days)
+        return cutoff.isoformat()
+    
+    def _write_pending(self) -> None:
+        """Autosave callback: one sync covers every mutation since the last one."""
+        if self.store is not None:
+            self.store.sync()
+            return
+        
+        # Only the buffer flush needs the lock; fsync runs on a duplicate descriptor
+        with self._lock:
+            fd = self.journal.dup_fd()
+        if fd is None:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def _compaction_worker(self) -> None:
+        """Background loop that compacts the journal once it grows past the threshold.
+        
+        Also compacts when the data file holds days that are due for the archive, or
+        when the totals sidecar is missing or out of date.
+        """
+        while not self._compaction_stop.wait(self.compaction_interval):
+            cutoff = self._archive_cutoff()
+            with self._lock:
+                stale = cutoff is not None and any(date < cutoff for date in self.history.offsets)
+                stale = stale or not self.day_totals_index.valid
+            if stale or self.journal.record_count >= self.compaction_threshold:
+                self.compact_history()
+    
+    def _record_mutation(self, op: str, date: Optional[str] = None, **fields) -> None:
+        """Log a change already made in memory as one journal record."""
+        # Keep today's container in history so background writers see it
+        if date == self.current_date:
+            self.history[self.current_date] = self.today_entries
+        
+        # Tombstones go on the day before it is logged, so stores write them with it
+        if self._removing_from is not None and self._removing_from[0] == date:
+            self._bury_removed(date, self.get_day_data(date), *self._removing_from[1:])
+        
+        record = self._new_record(op, date, **fields)
+        self._note_change(record)
+        self._log_records([record])
+        self.writer.request()
+    
+    def _new_record(self, op: str, date: Optional[str] = None, **fields) -> Dict[str, Any]:
+        """Number and timestamp the next mutation record."""
+        self._journal_seq += 1
+        record = {"seq": self._journal_seq, "op": op, "updated": round(time.time(), 3)}
+        if date is not None:
+            record["date"] = date
+        record.update(fields)
+        return record
+    
+    def _note_change(self, record: Dict[str, Any]) -> None:
+        """Bookkeeping once a record's change is in memory: stamp and pin its day, note its version."""
+        date = record.get("date")
+        if date is not None and date in self.history:
+            self.history[date]["updated"] = record["updated"]
+            # Changed in place, so a memory budget must not evict it before compaction
+            if self.store is None:
+                self.history.pin(date)
+        self._note_version(record)
+    
+    def _log_records(self, records: List[Dict[str, Any]]) -> None:
+        """Write records to the journal (or the store) in one go."""
+        try:
+            if self.store is not None:
+                for record in records:
+                    self.store.append(record)
+            else:
+                self.journal.append_many(records)
+        except Exception as e:
+            print(f"Failed to write history journal: {e}")
+    
+    @staticmethod
+    def _apply_mutation(history: History, record: Dict[str, Any]) -> None:
+        """Apply a journal record to a history dict during replay."""
+        op = record["op"]
+        date = record.get("date")
+        
+        if op == "delete_all":
+            history.clear()
+            return
+        
+        if op not in DataManager.REMOVING_OPS:
+            DataManager._apply_day_mutation(history, record)
+        else:
+            ids, tombstones = DataManager._entry_ids(date, history.get(date))
+            DataManager._apply_day_mutation(history, record)
+            if date in history:
+                DataManager._bury_removed(date, history[date], ids, tombstones)
+        
+        if "updated" in record and date in history:
+            history[date]["updated"] = record["updated"]
+    
+    @staticmethod
+    def _apply_day_mutation(history: History, record: Dict[str, Any]) -> None:
+        """Apply a record that changes a single day."""
+        op = record["op"]
+        date = record["date"]
+        
+        if op == "clear_day":
+            history[date] = {"food": [], "exercise": [], "weight": None}
+            return
+        
+        if op == "delete_day":
+            history.pop(date, None)
+            return
+        
+        if op == "put_day":
+            day_data = record["day"]
+            history[date] = as_entry_records({
+                **day_data,
+                "food": list(day_data.get("food", [])),
+                "exercise": list(day_data.get("exercise", [])),
+                "weight": day_data.get("weight")
+            })
+            return
+        
+        if op in ("clear_food", "clear_exercise"):
+            if date in history:
+                history[date]["food" if op == "clear_food" else "exercise"] = []
+            return
+        
+        day_data = history.setdefault(date, {"food": [], "exercise": [], "weight": None})
+        
+        if op == "add_food":
+            day_data.setdefault("food", []).append(FoodEntry.from_dict(record["entry"]))
+        elif op == "add_exercise":
+            day_data.setdefault("exercise", []).append(ExerciseEntry.from_dict(record["entry"]))
+        elif op == "set_weight":
+            day_data["weight"] = record["weight"]
+        elif op in ("delete_food", "delete_exercise"):
+            key = "food" if op == "delete_food" else "exercise"
+            indices = set(record["indices"])
+            day_data[key] = [entry for i, entry in enumerate(day_data.get(key, [])) if i not in indices]
+    
+    @staticmethod
+    def new_entry_id() -> str:
+        """Random id for a new food or exercise entry."""
+        return uuid.uuid4().hex[:16]
+    
+    @staticmethod
+    def _entry_ids(date: str, day_data: Optional[DayData]) -> Tuple[Set[str], List[str]]:
+        """Give every entry of a day an id and return (entry ids, tombstones).
+        
+        Entries logged before ids existed get one derived from their position and content,
+        so both copies of an unchanged old day derive the same ids.
+        """
+        if day_data is None:
+            return set(), []
+        ids = set()
+        for kind in ("food", "exercise"):
+            entries = day_data.get(kind, [])
+            if any("id" not in entry for entry in entries):
+                entry_class = FoodEntry if kind == "food" else ExerciseEntry
+                entries = [
+                    entry if "id" in entry else entry_class(entry, id=hashlib.sha1(
+                        f"{date}|{kind}|{i}|{json.dumps(entry, sort_keys=True, default=encode_entry)}".encode("utf-8")
+                    ).hexdigest()[:16])
+                    for i, entry in enumerate(entries)
+                ]
+                day_data[kind] = entries
+            ids.update(entry["id"] for entry in entries)
+        return ids, day_data.get("deleted", [])
+    
+    @staticmethod
+    def _bury_removed(date: str, day_data: DayData, ids_before: Set[str], tombstones_before: List[str]) -> None:
+        """Keep the ids of entries a change removed as tombstones on the day."""
+        ids_after, tombstones = DataManager._entry_ids(date, day_data)
+        deleted = set(tombstones_before) | set(tombstones) | (ids_before - ids_after)
+        if len(deleted) != len(tombstones):
+            day_data["deleted"] = sorted(deleted)
+    
+    def _replay(self, history: History, record: Dict[str, Any]) -> None:
+        """Apply a journal record read from disk."""
+        self._apply_mutation(history, record)
+        self._note_version(record)
+        if "date" in record:
+            history.pin(record["date"])
+    
+    def _note_version(self, record: Dict[str, Any]) -> None:
+        """Remember which journal record last changed a day."""
+        if record["op"] == "delete_all":
+            self.day_versions.clear()
+            self._day_summaries.clear()
+            self._entry_columns = None
+        elif "date" in record:
+            self.day_versions[record["date"]] = record["seq"]
+            self._day_summaries.pop(record["date"], None)
+    
+    def put_day(self, date: str, day_data: DayData) -> None:
+        """Replace a whole day, keeping its last-updated time (used by sync)."""
+        with self._mutation(date):
+            day_data = {
+                **day_data,
+                "food": list(day_data.get("food", [])),
+                "exercise": list(day_data.get("exercise", [])),
+                "weight": day_data.get("weight")
+            }
+            self.history[date] = day_data
+            if date == self.current_date:
+                self.today_entries = day_data
+            
+            fields = {"updated": day_data["updated"]} if "updated" in day_data else {}
+            self._record_mutation("put_day", date, day=day_data, **fields)
     
     def get_day_data(self, date_str: str) -> DayData:
         """Get food and exercise data for a specific day."""
@@ -920,179 +4739,360 @@ class DataManager:
     
     def save_custom_food(self, name: str, calories: int, category: str) -> bool:
         """Save a custom food to the database."""
+        return self.save_custom_foods({name: {"calories": calories, "category": category}})
+    
+    def save_custom_foods(self, foods: Dict[str, Dict[str, Any]]) -> bool:
+        """Save many custom foods ({name: {"calories", "category"}}) with a single write."""
+        self._check_writable()
         # Add to the main database
-        self.food_database[name] = {"calories": calories, "category": category}
-        
-        # Load existing custom foods or create empty dict
-        custom_foods = {}
-        if os.path.exists(self.custom_food_file):
-            try:
-                with open(self.custom_food_file, "r") as f:
-                    custom_foods = json.load(f)
-            except:
-                pass
-        
-        # Add the new food
-        custom_foods[name] = {"calories": calories, "category": category}
+        self.food_database.update(foods)
+        self.custom_foods.add_many(foods)
         
         # Save back to file
         try:
-            with open(self.custom_food_file, "w") as f:
-                json.dump(custom_foods, f, indent=4)
+            self.custom_foods.flush()
+            # Pick up items another process saved in the meantime
+            self.food_database.update(self.custom_foods.entries)
             return True
         except Exception as e:
             print(f"Error saving custom food: {e}")
             return False
     
+    def update_custom_food(self, old_name: str, name: str, calories: int, category: str) -> bool:
+        """Replace a custom food, renaming it if the name changed."""
+        self._check_writable()
+        if old_name != name and self.custom_foods.remove(old_name):
+            self.food_database.pop(old_name, None)
+        return self.save_custom_food(name, calories, category)
+    
+    def delete_custom_food(self, name: str) -> bool:
+        """Remove a custom food from the catalog and the main database."""
+        self._check_writable()
+        if not self.custom_foods.remove(name):
+            return False
+        self.food_database.pop(name, None)
+        self.custom_foods.flush()
+        return True
+    
     def save_custom_exercise(self, name: str, calories_per_min: float) -> bool:
         """Save a custom exercise to the database."""
+        return self.save_custom_exercises({name: calories_per_min})
+    
+    def save_custom_exercises(self, exercises: Dict[str, float]) -> bool:
+        """Save many custom exercises ({name: calories_per_min}) with a single write."""
+        self._check_writable()
         # Add to the main database
-        self.exercise_database[name] = calories_per_min
-        
-        # Load existing custom exercises or create empty dict
-        custom_exercises = {}
-        if os.path.exists(self.custom_exercise_file):
-            try:
-                with open(self.custom_exercise_file, "r") as f:
-                    custom_exercises = json.load(f)
-            except:
-                pass
-        
-        # Add the new exercise
-        custom_exercises[name] = calories_per_min
+        self.exercise_database.update(exercises)
+        self.custom_exercises.add_many(exercises)
         
         # Save back to file
         try:
-            with open(self.custom_exercise_file, "w") as f:
-                json.dump(custom_exercises, f, indent=4)
+            self.custom_exercises.flush()
+            # Pick up items another process saved in the meantime
+            self.exercise_database.update(self.custom_exercises.entries)
             return True
         except Exception as e:
             print(f"Error saving custom exercise: {e}")
             return False
     
+    def update_custom_exercise(self, old_name: str, name: str, calories_per_min: float) -> bool:
+        """Replace a custom exercise, renaming it if the name changed."""
+        self._check_writable()
+        if old_name != name and self.custom_exercises.remove(old_name):
+            self.exercise_database.pop(old_name, None)
+        return self.save_custom_exercise(name, calories_per_min)
+    
+    def delete_custom_exercise(self, name: str) -> bool:
+        """Remove a custom exercise from the catalog and the main database."""
+        self._check_writable()
+        if not self.custom_exercises.remove(name):
+            return False
+        self.exercise_database.pop(name, None)
+        self.custom_exercises.flush()
+        return True
+    
     def add_food_entry(self, date: str, food: str, amount: float, calories: int, 
                       category: str, kyle_tax: bool) -> None:
         """Add a food entry to the specified date."""
-        entry = {
-            "food": food,
-            "amount": amount,
-            "calories": calories,
-            "category": category,
-            "kyle_tax": kyle_tax
-        }
+        entry = FoodEntry(
+            food=food,
+            amount=amount,
+            calories=calories,
+            category=category,
+            kyle_tax=kyle_tax,
+            id=self.new_entry_id()
+        )
         
-        if date == self.current_date:
-            if "food" not in self.today_entries:
-                self.today_entries["food"] = []
-            self.today_entries["food"].append(entry)
-        else:
-            if date not in self.history:
-                self.history[date] = {"food": [], "exercise": [], "weight": None}
-            
-            if "food" not in self.history[date]:
-                self.history[date]["food"] = []
+        with self._mutation():
+            if date == self.current_date:
+                if "food" not in self.today_entries:
+                    self.today_entries["food"] = []
+                self.today_entries["food"].append(entry)
+            else:
+                if date not in self.history:
+                    self.history[date] = {"food": [], "exercise": [], "weight": None}
                 
-            self.history[date]["food"].append(entry)
+                if "food" not in self.history[date]:
+                    self.history[date]["food"] = []
+                
+                self.history[date]["food"].append(entry)
+            
+            self._record_mutation("add_food", date, entry=entry)
     
     def add_exercise_entry(self, date: str, exercise: str, duration: float, 
                           calories_burnt: int) -> None:
         """Add an exercise entry to the specified date."""
-        entry = {
-            "exercise": exercise,
-            "duration": duration,
-            "calories_burnt": calories_burnt
-        }
+        entry = ExerciseEntry(
+            exercise=exercise,
+            duration=duration,
+            calories_burnt=calories_burnt,
+            id=self.new_entry_id()
+        )
         
-        if date == self.current_date:
-            if "exercise" not in self.today_entries:
-                self.today_entries["exercise"] = []
+        with self._mutation():
+            if date == self.current_date:
+                if "exercise" not in self.today_entries:
+                    self.today_entries["exercise"] = []
+                
+                self.today_entries["exercise"].append(entry)
+            else:
+                if date not in self.history:
+                    self.history[date] = {"food": [], "exercise": [], "weight": None}
+                
+                if "exercise" not in self.history[date]:
+                    self.history[date]["exercise"] = []
                 
-            self.today_entries["exercise"].append(entry)
-        else:
-            if date not in self.history:
-                self.history[date] = {"food": [], "exercise": [], "weight": None}
+                self.history[date]["exercise"].append(entry)
             
-            if "exercise" not in self.history[date]:
-                self.history[date]["exercise"] = []
-                
-            self.history[date]["exercise"].append(entry)
+            self._record_mutation("add_exercise", date, entry=entry)
     
     def update_weight(self, date: str, weight: Optional[float]) -> None:
         """Update weight for a specific date."""
-        day_data = self.get_day_data(date)
-        day_data["weight"] = weight
-        
-        # If it's today, update today_entries
-        if date == self.current_date:
-            self.today_entries["weight"] = weight
-        
-        # Update history
-        self.history[date] = day_data
+        with self._mutation():
+            day_data = self.get_day_data(date)
+            day_data["weight"] = weight
+            
+            # If it's today, update today_entries
+            if date == self.current_date:
+                self.today_entries["weight"] = weight
+            
+            # Update history
+            self.history[date] = day_data
+            
+            self._record_mutation("set_weight", date, weight=weight)
     
     def delete_food_entries(self, date: str, indices: List[int]) -> None:
         """Delete food entries at specified indices for a date."""
-        day_data = self.get_day_data(date)
-        food_entries = day_data.get("food", [])
-        
-        # Build new list without deleted items
-        new_entries = [entry for i, entry in enumerate(food_entries) if i not in indices]
-        
-        # Update entries
-        if date == self.current_date and date not in self.history:
-            self.today_entries["food"] = new_entries
-        else:
-            if date not in self.history:
-                self.history[date] = {"food": [], "exercise": [], "weight": None}
-            self.history[date]["food"] = new_entries
+        with self._mutation(date):
+            day_data = self.get_day_data(date)
+            food_entries = day_data.get("food", [])
+            
+            # Build new list without deleted items
+            new_entries = [entry for i, entry in enumerate(food_entries) if i not in indices]
+            
+            # Update entries
+            if date == self.current_date and date not in self.history:
+                self.today_entries["food"] = new_entries
+            else:
+                if date not in self.history:
+                    self.history[date] = {"food": [], "exercise": [], "weight": None}
+                self.history[date]["food"] = new_entries
+            
+            self._record_mutation("delete_food", date, indices=sorted(indices))
     
     def delete_exercise_entries(self, date: str, indices: List[int]) -> None:
         """Delete exercise entries at specified indices for a date."""
-        day_data = self.get_day_data(date)
-        exercise_entries = day_data.get("exercise", [])
-        
-        # Build new list without deleted items
-        new_entries = [entry for i, entry in enumerate(exercise_entries) if i not in indices]
-        
-        # Update entries
-        if date == self.current_date and date not in self.history:
-            self.today_entries["exercise"] = new_entries
-        else:
-            if date not in self.history:
-                self.history[date] = {"food": [], "exercise": [], "weight": None}
-            self.history[date]["exercise"] = new_entries
+        with self._mutation(date):
+            day_data = self.get_day_data(date)
+            exercise_entries = day_data.get("exercise", [])
+            
+            # Build new list without deleted items
+            new_entries = [entry for i, entry in enumerate(exercise_entries) if i not in indices]
+            
+            # Update entries
+            if date == self.current_date and date not in self.history:
+                self.today_entries["exercise"] = new_entries
+            else:
+                if date not in self.history:
+                    self.history[date] = {"food": [], "exercise": [], "weight": None}
+                self.history[date]["exercise"] = new_entries
+            
+            self._record_mutation("delete_exercise", date, indices=sorted(indices))
     
     def clear_food_entries(self, date: str) -> None:
         """Clear all food entries for a specific date."""
-        if date == self.current_date and date not in self.history:
-            self.today_entries["food"] = []
-        else:
-            if date in self.history:
-                self.history[date]["food"] = []
+        with self._mutation(date):
+            if date == self.current_date and date not in self.history:
+                self.today_entries["food"] = []
+            else:
+                if date in self.history:
+                    self.history[date]["food"] = []
+            
+            self._record_mutation("clear_food", date)
     
     def clear_exercise_entries(self, date: str) -> None:
         """Clear all exercise entries for a specific date."""
-        if date == self.current_date and date not in self.history:
-            self.today_entries["exercise"] = []
-        else:
-            if date in self.history:
-                self.history[date]["exercise"] = []
+        with self._mutation(date):
+            if date == self.current_date and date not in self.history:
+                self.today_entries["exercise"] = []
+            else:
+                if date in self.history:
+                    self.history[date]["exercise"] = []
+            
+            self._record_mutation("clear_exercise", date)
     
     def clear_today(self) -> None:
         """Clear all entries for today."""
-        self.today_entries = {"food": [], "exercise": [], "weight": None}
+        with self._mutation(self.current_date):
+            # Clearing an empty day destroys nothing, so it needs no snapshot
+            today = self.today_entries
+            if today["food"] or today["exercise"] or today["weight"] is not None:
+                self._auto_snapshot("before clearing today")
+            self.today_entries = {"food": [], "exercise": [], "weight": None}
+            
+            # Keep history pointing at the same day so readers don't see stale entries
+            if self.current_date in self.history:
+                self.history[self.current_date] = self.today_entries
+            
+            self._record_mutation("clear_day", self.current_date)
     
     def delete_all_history(self) -> None:
         """Delete all history data."""
-        self.history = {}
-        self.today_entries = {"food": [], "exercise": [], "weight": None}
+        with self._mutation():
+            self._auto_snapshot("before deleting all history", pinned=True)
+            self.history.clear()
+            self.today_entries = {"food": [], "exercise": [], "weight": None}
+            
+            self._record_mutation("delete_all")
+    
+    def snapshot_history(self, label: str = "manual") -> Dict[str, Any]:
+        """Take a point-in-time snapshot of the history; returns its manifest."""
+        with self._mutation():
+            return self._take_snapshot(label)
+    
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """Stored snapshots, oldest first, each as {"id", "created", "label", "days"}."""
+        snapshots = []
+        for snapshot_id in self.snapshots.ids():
+            manifest = self.snapshots.load(snapshot_id)
+            snapshots.append({**manifest, "days": len(manifest["days"])})
+        return snapshots
+    
+    def restore_snapshot(self, snapshot_id: int) -> int:
+        """Bring the history back to a snapshot; returns how many days changed.
+        
+        The current state is snapshotted first, so a restore can itself be undone.
+        """
+        with self._mutation():
+            target = self.snapshots.load(snapshot_id)["days"]
+            current = self._take_snapshot(f"before restoring snapshot {snapshot_id}", keep=(snapshot_id,),
+                                          pinned=True)["days"]
+            
+            changed = 0
+            for date, digest in target.items():
+                if current.get(date) != digest:
+                    self.put_day(date, self.snapshots.get_day(digest))
+                    changed += 1
+            for date in current:
+                if date not in target:
+                    self._delete_day(date)
+                    changed += 1
+            return changed
+    
+    def _auto_snapshot(self, label: str, pinned: bool = False) -> None:
+        """Snapshot before a destructive change; a failure is reported but does not block it.
+        
+        Skipped when nothing changed since the latest snapshot, unless that one is routine
+        and this one should be pinned.
+        """
+        try:
+            previous = self.snapshots.latest()
+            # Store engines restart their sequence numbers, so only trust one this instance took
+            if (previous is not None and previous["seq"] == self._journal_seq
+                    and (self.store is None or previous["id"] == self._last_snapshot_id)
+                    and (previous.get("pinned") or not pinned)):
+                return
+            self._take_snapshot(label, pinned=pinned)
+        except Exception as e:
+            print(f"Failed to snapshot history: {e}")
+    
+    def _take_snapshot(self, label: str, keep: Iterable[int] = (), pinned: bool = False) -> Dict[str, Any]:
+        """Snapshot the history; must hold file_lock and _lock.
+        
+        With the JSON engine, days whose last change is older than the previous snapshot
+        reuse its hashes without being read, so only changed days are decoded.
+        """
+        previous = self.snapshots.latest()
+        if self.store is None and previous is not None and previous["seq"] <= self._journal_seq:
+            def days():
+                for date in list(self.history):
+                    digest = previous["days"].get(date)
+                    if digest is not None and self.day_versions.get(date, 0) <= previous["seq"]:
+                        yield date, digest
+                    else:
+                        yield date, self.history[date]
+        else:
+            days = self.iter_days
+        manifest = self.snapshots.take(days(), label, self._journal_seq, keep, pinned)
+        self._last_snapshot_id = manifest["id"]
+        return manifest
+    
+    def _delete_day(self, date: str) -> None:
+        """Remove a whole day (used when restoring a snapshot that did not have it)."""
+        with self._mutation(date):
+            self.history.pop(date, None)
+            if date == self.current_date:
+                self.today_entries = {"food": [], "exercise": [], "weight": None}
+            self._record_mutation("delete_day", date)
+    
+    def add_entries(self, entries: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """Add many entries at once, each an ("add_food" | "add_exercise", date, entry) tuple.
+        
+        Takes the locks once and logs the whole batch with one journal write.
+        """
+        with self._mutation():
+            records = []
+            for op, date, entry in entries:
+                # Keep today's container in history so the entry lands in today_entries
+                if date == self.current_date and date not in self.history:
+                    self.history[date] = self.today_entries
+                
+                entry = (FoodEntry if op == "add_food" else ExerciseEntry).from_dict(entry)
+                entry.setdefault("id", self.new_entry_id())
+                record = self._new_record(op, date, entry=entry)
+                self._apply_mutation(self.history, record)
+                self._note_change(record)
+                records.append(record)
+            
+            self._log_records(records)
+        
+        self.writer.request()
+        return len(records)
+    
+    def import_log(self, path: str, fmt: Optional[str] = None) -> Dict[str, int]:
+        """Stream a CSV or JSONL food/exercise log into history and save it once at the end."""
+        counts = LogImporter(self).import_file(path, fmt)
+        self.save_history()
+        self.flush_history()
+        return counts
+    
+    def iter_days(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Tuple[str, DayData]]:
+        """Yield (date, day) in date order between start and end (inclusive) without caching days."""
+        return self.history.iter_days(start, end)
+    
+    def export_history(self, path: str, fmt: Optional[str] = None, **options) -> int:
+        """Stream the history to a CSV, JSONL or .npz file; see HistoryExporter for the options."""
+        return HistoryExporter(self, **options).export(path, fmt)
     
     def get_weight_history(self) -> List[Tuple[str, float]]:
         """Get all weight entries sorted by date."""
+        if self.store is not None and self.store.indexed_queries:
+            return self.store.weight_history()
+        
         weights = []
-        for date, data in self.history.items():
-            weight = data.get("weight")
-            if weight is not None:
-                weights.append((date, weight))
+        for date, day_totals in self.daily_totals().items():
+            if day_totals["weight"] is not None:
+                weights.append((date, day_totals["weight"]))
         
         # Sort by date (newest first)
         weights.sort(reverse=True)
@@ -1100,54 +5100,44 @@ class DataManager:
     
     def get_weekly_data(self, end_date_str: str) -> Tuple[List[str], List[int], List[int]]:
         """Get data for the last 7 days ending on the specified date."""
-        end_date = datetime.datetime.strptime(end_date_str, "%Y-%m-%d")
-        start_date = end_date - datetime.timedelta(days=6)
-        
-        dates = []
-        calories_in = []
-        calories_out = []
-        
-        # Collect data for each day
-        current = start_date
-        while current <= end_date:
-            date_str = current.strftime("%Y-%m-%d")
-            dates.append(current.strftime("%a"))  # Abbreviated day name
-            
-            # Get data for the day
-            day_data = self.get_day_data(date_str)
-            food_entries = day_data.get("food", [])
-            exercise_entries = day_data.get("exercise", [])
-            
-            # Calculate total calories in
-            total_in = 0
-            for entry in food_entries:
-                cal = entry["calories"]
-                if entry.get("kyle_tax", False):
-                    cal = int(cal * 0.85)
-                total_in += cal
-            
-            # Calculate total calories out
-            total_out = sum(ex.get("calories_burnt", 0) for ex in exercise_entries)
-            
-            calories_in.append(total_in)
-            calories_out.append(total_out)
-            
-            current += datetime.timedelta(days=1)
-        
+        end = self.days.ordinal(end_date_str)
+        ordinals = range(end - 6, end + 1)
+        dates = [self.days.weekday_name(ordinal) for ordinal in ordinals]  # Abbreviated day names
+        
+        # One indexed range query instead of seven day lookups
+        if self.store is not None and self.store.indexed_queries:
+            totals = self.store.daily_calorie_totals(self.days.date(end - 6), end_date_str)
+            calories_in = [totals.get(self.days.date(ordinal), (0, 0))[0] for ordinal in ordinals]
+            calories_out = [totals.get(self.days.date(ordinal), (0, 0))[1] for ordinal in ordinals]
+            return dates, calories_in, calories_out
+        
+        # Collect data for each day from the cached day summaries
+        summaries = [self.day_summary(self.days.date(ordinal)) for ordinal in ordinals]
+        calories_in = [summary.calories_in for summary in summaries]
+        calories_out = [summary.calories_burnt for summary in summaries]
         return dates, calories_in, calories_out
     
     def get_food_categories_data(self) -> Dict[str, int]:
         """Get total calories by food category across all dates."""
+        if self.store is not None and self.store.indexed_queries:
+            return self.store.food_category_totals()
+        
         food_categories = {}
         
-        for date, day_data in self.history.items():
-            food_entries = day_data.get("food", [])
-            for entry in food_entries:
-                category = entry.get("category", "Uncategorized")
-                if category not in food_categories:
-                    food_categories[category] = 0
-                
-                food_categories[category] += entry["calories"]
+        columns = self._summary_columns()
+        if columns is not None:
+            # One bincount over the category column
+            by_id = columns.grouped_totals("food", "category", "calories", columns.rows("food"))
+            for category, calories in by_id.items():
+                name = "Uncategorized" if category < 0 else columns.symbols[category]
+                food_categories[name] = food_categories.get(name, 0) + calories
+        else:
+            for day_totals in self.daily_totals().values():
+                for category, calories in day_totals["categories"].items():
+                    if category not in food_categories:
+                        food_categories[category] = 0
+                    
+                    food_categories[category] += calories
         
         # Also add today's entries if not in history
         if self.current_date not in self.history:
@@ -1160,33 +5150,66 @@ class DataManager:
         
         return food_categories
     
+    def get_unique_foods(self, category: Optional[str] = None) -> Set[str]:
+        """Get the names of all logged foods, optionally limited to one category."""
+        if self.store is not None and self.store.indexed_queries:
+            return self.store.unique_foods(category)
+        
+        # Distinct ids from the entry columns; only those are turned back into names
+        columns = self.entry_columns()
+        where = None
+        if category is not None:
+            if category not in columns.symbol_ids:
+                return set()
+            where = ("category", columns.symbol_ids[category])
+        return {columns.symbols[food] for food in columns.distinct("food", "food", columns.rows("food"), where)}
+    
+    def get_unique_exercises(self) -> Set[str]:
+        """Get the names of all logged exercises."""
+        if self.store is not None and self.store.indexed_queries:
+            return self.store.unique_exercises()
+        
+        columns = self.entry_columns()
+        return {columns.symbols[exercise] for exercise in columns.distinct("exercise", "exercise", columns.rows("exercise"))}
+    
+    def daily_net_calories(self) -> Dict[str, int]:
+        """Raw calories eaten minus calories burnt for every stored day, in date order."""
+        if self.store is not None and self.store.indexed_queries:
+            return self.store.daily_net_calories()
+        
+        net = self.entry_columns().net_calories()
+        return {self.days.date(ordinal): net[ordinal] for ordinal in sorted(net)}
+    
     def get_stats_summary(self) -> Dict[str, Any]:
         """Get summary statistics for all data."""
-        total_days = len(self.history)
-        total_foods = sum(len(day_data.get("food", [])) for day_data in self.history.values())
-        total_exercises = sum(len(day_data.get("exercise", [])) for day_data in self.history.values())
-        
-        # Calculate total calories consumed and burned
-        total_calories = 0
-        total_burned = 0
-        for day_data in self.history.values():
-            # Calculate consumed calories with Kyle Tax
-            for entry in day_data.get("food", []):
-                calories = entry["calories"]
-                if entry.get("kyle_tax", False):
-                    calories = int(calories * 0.85)
-                total_calories += calories
-            
-            # Calculate burned calories
-            for exercise in day_data.get("exercise", []):
-                total_burned += exercise.get("calories_burnt", 0)
+        if self.store is not None and self.store.indexed_queries:
+            return self.store.stats_summary()
+        
+        columns = self._summary_columns()
+        if columns is not None:
+            total_calories = columns.taxed_calories(columns.rows("food"))
+            total_burned = columns.column_total("exercise", "calories_burnt", columns.rows("exercise"))
+            return {
+                "total_days": len(columns.tables["days"]["date"]),
+                "total_foods": len(columns.tables["food"]["date"]),
+                "total_exercises": len(columns.tables["exercise"]["date"]),
+                "total_calories": total_calories,
+                "total_burned": total_burned,
+                "net_calories": total_calories - total_burned,
+                "weights": [weight for weight in columns.tables["days"]["weight"] if not math.isnan(weight)]
+            }
+        
+        totals = self.daily_totals()
+        total_days = len(totals)
+        total_foods = sum(day_totals["foods"] for day_totals in totals.values())
+        total_exercises = sum(day_totals["exercises"] for day_totals in totals.values())
+        
+        # Calories consumed (with Kyle Tax) and burned
+        total_calories = sum(day_totals["in"] for day_totals in totals.values())
+        total_burned = sum(day_totals["out"] for day_totals in totals.values())
         
         # Get weight data
-        weights = []
-        for day_data in self.history.values():
-            weight = day_data.get("weight")
-            if weight is not None:
-                weights.append(weight)
+        weights = [day_totals["weight"] for day_totals in totals.values() if day_totals["weight"] is not None]
         
         stats = {
             "total_days": total_days,
@@ -1201,6 +5224,551 @@ class DataManager:
         return stats
 
 
+class ProfileManager:
+    """Named profiles, each with its own data directory, listed in a small index file.
+    
+    Only the active profile is loaded. Profiles switched away from stay open in a
+    bounded LRU cache so switching back is instant; when the cache is full the least
+    recently used one is saved and closed. The "default" profile uses the working
+    directory, so data from before profiles existed stays where it is. With
+    readonly=True profiles are opened read-only and the index is never written.
+    """
+    
+    def __init__(self, index_file: str = "burger_tracker_profiles.json",
+                 profiles_dir: str = "burger_tracker_profiles", cache_size: int = 3, **data_manager_options):
+        self.index_file = index_file
+        self.profiles_dir = profiles_dir
+        self.cache_size = cache_size
+        self.data_manager_options = data_manager_options
+        self.readonly = data_manager_options.get("readonly", False)
+        self._cache = OrderedDict()
+        self.index = self._load_index()
+    
+    @property
+    def active(self) -> str:
+        return self.index["active"]
+    
+    def names(self) -> List[str]:
+        """Profile names, default first."""
+        return sorted(self.index["profiles"], key=lambda name: (name != "default", name.lower()))
+    
+    def data_dir(self, name: str) -> str:
+        return self.index["profiles"][name]["dir"]
+    
+    def create(self, name: str) -> None:
+        """Add a profile with a fresh data directory."""
+        name = name.strip()
+        if self.readonly:
+            raise ValueError("Profiles cannot be created in read-only mode")
+        if not name:
+            raise ValueError("Profile name cannot be empty")
+        if name in self.index["profiles"]:
+            raise ValueError(f"Profile '{name}' already exists")
+        
+        slug = re.sub(r"[^a-z0-9_-]+", "_", name.lower()).strip("_") or "profile"
+        data_dir = os.path.join(self.profiles_dir, slug)
+        suffix = 2
+        while any(profile["dir"] == data_dir for profile in self.index["profiles"].values()):
+            data_dir = os.path.join(self.profiles_dir, f"{slug}_{suffix}")
+            suffix += 1
+        
+        self.index["profiles"][name] = {"dir": data_dir, "created": datetime.date.today().isoformat()}
+        self._write_index()
+    
+    def remove(self, name: str) -> None:
+        """Drop a profile from the index; its data directory is left on disk."""
+        if name == self.active:
+            raise ValueError("The active profile cannot be removed")
+        self._close_cached(name)
+        del self.index["profiles"][name]
+        self._write_index()
+    
+    def open(self, name: str) -> Tuple["DataManager", GamificationManager]:
+        """Data and gamification managers of a profile, loading it if it is not cached."""
+        if name in self._cache:
+            self._cache.move_to_end(name)
+            return self._cache[name]
+        
+        data_manager = DataManager(data_dir=self.data_dir(name), **self.data_manager_options)
+        self._cache[name] = (data_manager, GamificationManager(data_manager))
+        while len(self._cache) > self.cache_size:
+            self._close_cached(next(iter(self._cache)))
+        return self._cache[name]
+    
+    def switch(self, name: str) -> Tuple["DataManager", GamificationManager]:
+        """Make a profile the active one and return its managers."""
+        managers = self.open(name)
+        if name != self.active:
+            self.index["active"] = name
+            self._write_index()
+        return managers
+    
+    def close(self) -> None:
+        """Save and close every loaded profile."""
+        for name in list(self._cache):
+            self._close_cached(name)
+    
+    def _close_cached(self, name: str) -> None:
+        managers = self._cache.pop(name, None)
+        if managers is not None:
+            data_manager, gamification_manager = managers
+            gamification_manager.save_gamification_data()
+            data_manager.close()
+    
+    def _load_index(self) -> Dict[str, Any]:
+        if os.path.exists(self.index_file):
+            try:
+                return read_data_file(self.index_file)
+            except Exception as e:
+                print(f"Failed to load profiles: {e}")
+        return {"active": "default", "profiles": {"default": {"dir": "."}}}
+    
+    def _write_index(self) -> None:
+        if self.readonly:
+            return
+        try:
+            write_data_file(self.index_file, self.index, CODECS["json"])
+        except OSError as e:
+            print(f"Failed to save profiles: {e}")
+
+
+class LogImporter:
+    """Streams food and exercise rows from CSV or JSONL logs into a DataManager.
+    
+    Rows are read one at a time and handed over in batches, so memory use does not
+    grow with the size of the file. Names are matched case-insensitively against the
+    food and exercise databases to fill in missing calories and categories.
+    
+    Recognized columns: date, type ("food", "exercise" or "weight"), food/exercise
+    (or name), amount (or quantity), calories, category, kyle_tax, duration (or minutes),
+    calories_burnt and weight. Calories are totals for the row, as stored in the history.
+    """
+    
+    TRUE_VALUES = {"1", "true", "yes", "y", "t"}
+    
+    def __init__(self, data_manager: "DataManager", batch_size: int = 1000):
+        self.data_manager = data_manager
+        self.batch_size = batch_size
+        self.food_index = {name.casefold(): name for name in data_manager.food_database}
+        self.exercise_index = {name.casefold(): name for name in data_manager.exercise_database}
+    
+    def import_file(self, path: str, fmt: Optional[str] = None) -> Dict[str, int]:
+        """Import one file ("csv" or "jsonl", guessed from the extension); returns row counts."""
+        counts = {"food": 0, "exercise": 0, "weight": 0, "skipped": 0}
+        batch = []
+        for row in self.rows(path, fmt):
+            entry = self.convert(row)
+            if entry is None:
+                counts["skipped"] += 1
+                continue
+            if entry[0] == "set_weight":
+                # At most one per day, so these are not worth batching
+                self.data_manager.update_weight(entry[1], entry[2]["weight"])
+                counts["weight"] += 1
+                continue
+            batch.append(entry)
+            counts["food" if entry[0] == "add_food" else "exercise"] += 1
+            if len(batch) >= self.batch_size:
+                self.data_manager.add_entries(batch)
+                batch = []
+        if batch:
+            self.data_manager.add_entries(batch)
+        return counts
+    
+    def rows(self, path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the rows of a CSV or JSONL file one at a time."""
+        if fmt is None:
+            fmt = "jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson") else "csv"
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            if fmt == "csv":
+                for row in csv.DictReader(f):
+                    yield {key.strip().lower(): value for key, value in row.items() if key is not None}
+            else:
+                for line in f:
+                    if line.strip():
+                        yield {key.lower(): value for key, value in json.loads(line).items()}
+    
+    def convert(self, row: Dict[str, Any]) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Map a row to an (op, date, entry) mutation, or None if it cannot be used."""
+        try:
+            date = datetime.date.fromisoformat(str(row["date"]).strip()[:10]).isoformat()
+            kind = str(row.get("type") or "").strip().lower()
+            if not kind:
+                kind = "exercise" if row.get("exercise") else "food"
+            if kind == "food":
+                return self._food_entry(date, row)
+            if kind == "exercise":
+                return self._exercise_entry(date, row)
+            if kind == "weight" and row.get("weight") not in (None, ""):
+                return "set_weight", date, {"weight": float(row["weight"])}
+        except (KeyError, ValueError, TypeError):
+            pass
+        return None
+    
+    def _food_entry(self, date: str, row: Dict[str, Any]) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        name = str(row.get("food") or row.get("name") or "").strip()
+        if not name:
+            return None
+        name = self.food_index.get(name.casefold(), name)
+        known = self.data_manager.food_database.get(name, {})
+        amount = float(row.get("amount") or row.get("quantity") or 1)
+        
+        if row.get("calories") not in (None, ""):
+            calories = int(float(row["calories"]))
+        elif known:
+            calories = int(known["calories"] * amount)
+        else:
+            return None
+        
+        entry = {
+            "food": name,
+            "amount": amount,
+            "calories": calories,
+            "category": row.get("category") or known.get("category", "Other"),
+            "kyle_tax": str(row.get("kyle_tax", "")).strip().lower() in self.TRUE_VALUES
+        }
+        return "add_food", date, entry
+    
+    def _exercise_entry(self, date: str, row: Dict[str, Any]) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        name = str(row.get("exercise") or row.get("name") or "").strip()
+        if not name:
+            return None
+        name = self.exercise_index.get(name.casefold(), name)
+        duration = float(row.get("duration") or row.get("minutes") or 0)
+        
+        if row.get("calories_burnt") not in (None, ""):
+            calories_burnt = int(float(row["calories_burnt"]))
+        elif name in self.data_manager.exercise_database:
+            calories_burnt = int(self.data_manager.exercise_database[name] * duration)
+        else:
+            return None
+        
+        entry = {
+            "exercise": name,
+            "duration": duration,
+            "calories_burnt": calories_burnt
+        }
+        return "add_exercise", date, entry
+
+
+class HistoryExporter:
+    """Streams the history to CSV, JSONL or a columnar .npz, one day at a time in date order.
+    
+    Days are read without being cached and rows are written as they are produced, so
+    memory use does not grow with the length of the history. The .npz columns are
+    spooled to temporary files and copied into the archive at the end; it is written
+    directly in the NumPy format, so NumPy is only needed to read it.
+    """
+    
+    FIELDS = ["date", "type", "name", "category", "amount", "calories", "calories_taxed", "kyle_tax",
+              "duration", "calories_burnt", "weight"]
+    
+    TYPES = {"food": 0, "exercise": 1, "weight": 2}
+    
+    # .npz column name -> (array typecode, NumPy dtype without byte order)
+    NPZ_COLUMNS = {
+        "date": ("q", "M8[D]"),
+        "type": ("B", "u1"),
+        "name": ("i", "i4"),
+        "category": ("i", "i4"),
+        "amount": ("d", "f8"),
+        "calories": ("q", "i8"),
+        "calories_taxed": ("q", "i8"),
+        "kyle_tax": ("B", "b1"),
+        "duration": ("d", "f8"),
+        "calories_burnt": ("q", "i8"),
+        "weight": ("d", "f8")
+    }
+    
+    EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+    
+    def __init__(self, data_manager: "DataManager", start: Optional[str] = None, end: Optional[str] = None,
+                 categories: Optional[Iterable[str]] = None, include_exercise: bool = True,
+                 tax_all: bool = False, progress=None):
+        self.data_manager = data_manager
+        self.start = start
+        self.end = end
+        self.categories = set(categories) if categories else None
+        self.include_exercise = include_exercise
+        self.tax_all = tax_all
+        self.progress = progress
+        self.progress_every = 100
+    
+    def export(self, path: str, fmt: Optional[str] = None) -> int:
+        """Write every matching entry to path ("csv", "jsonl" or "npz", guessed from the extension)."""
+        if fmt is None:
+            fmt = os.path.splitext(path)[1].lower().lstrip(".")
+        if fmt == "csv":
+            return self._write_csv(path)
+        if fmt in ("jsonl", "ndjson"):
+            return self._write_jsonl(path)
+        if fmt == "npz":
+            return self._write_npz(path)
+        raise ValueError(f"Unsupported export format: {fmt}")
+    
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Yield one flat row per food or exercise entry and per recorded weight.
+        
+        calories and kyle_tax are stored as entered, so a re-import gives the same entries;
+        calories_taxed has the Kyle Tax applied (to every food row with tax_all).
+        """
+        days_done = 0
+        rows_done = 0
+        for date, day_data in self.data_manager.iter_days(self.start, self.end):
+            for entry in day_data.get("food", []):
+                category = entry.get("category") or "Other"
+                if self.categories is not None and category not in self.categories:
+                    continue
+                kyle_tax = entry.get("kyle_tax", False)
+                rows_done += 1
+                yield {
+                    "date": date,
+                    "type": "food",
+                    "name": entry["food"],
+                    "category": category,
+                    "amount": entry["amount"],
+                    "calories": entry["calories"],
+                    "calories_taxed": int(entry["calories"] * 0.85) if self.tax_all or kyle_tax else entry["calories"],
+                    "kyle_tax": kyle_tax,
+                    "duration": None,
+                    "calories_burnt": None,
+                    "weight": None
+                }
+            
+            if self.include_exercise:
+                for entry in day_data.get("exercise", []):
+                    rows_done += 1
+                    yield {
+                        "date": date,
+                        "type": "exercise",
+                        "name": entry["exercise"],
+                        "category": None,
+                        "amount": None,
+                        "calories": None,
+                        "calories_taxed": None,
+                        "kyle_tax": False,
+                        "duration": entry["duration"],
+                        "calories_burnt": entry["calories_burnt"],
+                        "weight": None
+                    }
+            
+            if day_data.get("weight") is not None:
+                rows_done += 1
+                yield {
+                    "date": date,
+                    "type": "weight",
+                    "name": None,
+                    "category": None,
+                    "amount": None,
+                    "calories": None,
+                    "calories_taxed": None,
+                    "kyle_tax": False,
+                    "duration": None,
+                    "calories_burnt": None,
+                    "weight": day_data["weight"]
+                }
+            
+            days_done += 1
+            if self.progress is not None and days_done % self.progress_every == 0:
+                self.progress(days_done, rows_done)
+        
+        if self.progress is not None:
+            self.progress(days_done, rows_done)
+    
+    def _write_csv(self, path: str) -> int:
+        count = 0
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            writer.writeheader()
+            for row in self.rows():
+                writer.writerow(row)
+                count += 1
+        return count
+    
+    def _write_jsonl(self, path: str) -> int:
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for row in self.rows():
+                f.write(json.dumps(row, separators=(",", ":")) + "\n")
+                count += 1
+        return count
+    
+    def _write_npz(self, path: str, chunk_rows: int = 65536) -> int:
+        """Spool each column to a temporary file, then wrap them as .npy members of a zip."""
+        spools = {column: tempfile.TemporaryFile() for column in self.NPZ_COLUMNS}
+        buffers = {column: array(typecode) for column, (typecode, _) in self.NPZ_COLUMNS.items()}
+        symbols = {"name": {}, "category": {}}
+        count = 0
+        
+        def spill():
+            for column, values in buffers.items():
+                values.tofile(spools[column])
+                del values[:]
+        
+        try:
+            for row in self.rows():
+                is_food = row["type"] == "food"
+                is_exercise = row["type"] == "exercise"
+                buffers["date"].append(datetime.date.fromisoformat(row["date"]).toordinal() - self.EPOCH_ORDINAL)
+                buffers["type"].append(self.TYPES[row["type"]])
+                buffers["name"].append(
+                    symbols["name"].setdefault(row["name"], len(symbols["name"])) if row["name"] is not None else -1
+                )
+                buffers["category"].append(
+                    symbols["category"].setdefault(row["category"], len(symbols["category"])) if is_food else -1
+                )
+                buffers["amount"].append(row["amount"] if is_food else math.nan)
+                buffers["calories"].append(row["calories"] if is_food else 0)
+                buffers["calories_taxed"].append(row["calories_taxed"] if is_food else 0)
+                buffers["kyle_tax"].append(1 if row["kyle_tax"] else 0)
+                buffers["duration"].append(row["duration"] if is_exercise else math.nan)
+                buffers["calories_burnt"].append(row["calories_burnt"] if is_exercise else 0)
+                buffers["weight"].append(math.nan if row["weight"] is None else row["weight"])
+                count += 1
+                if count % chunk_rows == 0:
+                    spill()
+            spill()
+            
+            order = "<" if sys.byteorder == "little" else ">"
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+                for column, (_, dtype) in self.NPZ_COLUMNS.items():
+                    descr = "|" + dtype if dtype in ("u1", "b1") else order + dtype
+                    with archive.open(column + ".npy", "w", force_zip64=True) as member:
+                        member.write(self._npy_header(descr, count))
+                        spools[column].seek(0)
+                        shutil.copyfileobj(spools[column], member)
+                
+                # Lookup tables for the name and category codes, and the type codes
+                for column, table in (("names", symbols["name"]), ("categories", symbols["category"]),
+                                      ("types", self.TYPES)):
+                    width = max((len(value) for value in table), default=1)
+                    with archive.open(column + ".npy", "w") as member:
+                        member.write(self._npy_header(f"<U{width}", len(table)))
+                        for value in table:
+                            member.write(value.ljust(width, "\0").encode("utf-32-le"))
+        finally:
+            for spool in spools.values():
+                spool.close()
+        return count
+    
+    @staticmethod
+    def _npy_header(descr: str, length: int) -> bytes:
+        """NumPy format 1.0 header for a 1-D array, padded so the data starts 64-byte aligned."""
+        header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, length)
+        header += " " * (-(10 + len(header) + 1) % 64) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class HistorySync:
+    """Two-way sync between the histories of two data directories that exchanges only changed days.
+    
+    Each directory keeps its own replica id and, per peer, the journal versions of both
+    sides at the last sync. Days changed on only one side since then are copied over;
+    days changed on both sides are merged entry by entry, the same way in either direction.
+    """
+    
+    SYNC_FILE = "burger_tracker_sync.json"
+    
+    def __init__(self, local: "DataManager", remote: "DataManager"):
+        for data_manager in (local, remote):
+            if data_manager.storage_engine != "json":
+                raise ValueError("history sync needs the json storage engine on both sides")
+            data_manager._check_writable()
+        self.local = local
+        self.remote = remote
+    
+    def run(self) -> Dict[str, int]:
+        """Sync both directories; returns how many days were sent, received and merged."""
+        first, second = sorted((self.local, self.remote), key=lambda dm: os.path.abspath(dm.data_dir))
+        with first.file_lock, second.file_lock, first._lock, second._lock:
+            for data_manager in (first, second):
+                data_manager._catch_up()
+            
+            local_state = self._load_state(self.local)
+            remote_state = self._load_state(self.remote)
+            point = local_state["peers"].get(remote_state["replica_id"], {})
+            local_changed = self._changed_days(self.local, point.get("local_version", 0))
+            remote_changed = self._changed_days(self.remote, point.get("peer_version", 0))
+            
+            counts = {"sent": 0, "received": 0, "merged": 0}
+            for date in sorted(local_changed | remote_changed):
+                local_day = self.local.history.get(date)
+                remote_day = self.remote.history.get(date)
+                if date in local_changed and date in remote_changed and local_day and remote_day:
+                    merged = self.merge_days(date, local_day, remote_day)
+                    if self._differs(merged, local_day):
+                        self.local.put_day(date, merged)
+                    if self._differs(merged, remote_day):
+                        self.remote.put_day(date, merged)
+                    counts["merged"] += 1
+                elif date in local_changed:
+                    if local_day is not None:
+                        self.remote.put_day(date, local_day)
+                        counts["sent"] += 1
+                elif remote_day is not None:
+                    self.local.put_day(date, remote_day)
+                    counts["received"] += 1
+            
+            self._save_point(self.local, local_state, remote_state["replica_id"],
+                             self.local._journal_seq, self.remote._journal_seq)
+            self._save_point(self.remote, remote_state, local_state["replica_id"],
+                             self.remote._journal_seq, self.local._journal_seq)
+        return counts
+    
+    @staticmethod
+    def merge_days(date: str, first: DayData, second: DayData) -> DayData:
+        """Merge two versions of a day; the result does not depend on the argument order.
+        
+        Deletions from either side win. Otherwise entries are the union by id, in the order
+        of the more recently updated side, and its weight is kept.
+        """
+        for day_data in (first, second):
+            DataManager._entry_ids(date, day_data)
+        newer, older = sorted(
+            (first, second),
+            key=lambda day_data: (day_data.get("updated", 0), json.dumps(day_data, sort_keys=True, default=encode_entry)),
+            reverse=True
+        )
+        deleted = set(newer.get("deleted", [])) | set(older.get("deleted", []))
+        
+        merged = {**older, **newer}
+        for kind in ("food", "exercise"):
+            entries = {}
+            for entry in newer.get(kind, []) + older.get(kind, []):
+                if entry["id"] not in deleted:
+                    entries.setdefault(entry["id"], entry)
+            merged[kind] = list(entries.values())
+        if deleted:
+            merged["deleted"] = sorted(deleted)
+        return merged
+    
+    @staticmethod
+    def _differs(first: DayData, second: DayData) -> bool:
+        return (json.dumps(first, sort_keys=True, default=encode_entry)
+                != json.dumps(second, sort_keys=True, default=encode_entry))
+    
+    @staticmethod
+    def _changed_days(data_manager: "DataManager", since: int) -> Set[str]:
+        return {date for date, version in data_manager.day_versions.items() if version > since}
+    
+    def _load_state(self, data_manager: "DataManager") -> Dict[str, Any]:
+        """Read a directory's replica id and sync points, creating them on first use."""
+        path = os.path.join(data_manager.data_dir, self.SYNC_FILE)
+        try:
+            return read_data_file(path)
+        except FileNotFoundError:
+            return {"replica_id": uuid.uuid4().hex, "peers": {}}
+    
+    def _save_point(self, data_manager: "DataManager", state: Dict[str, Any], peer_id: str,
+                    local_version: int, peer_version: int) -> None:
+        state["peers"][peer_id] = {
+            "local_version": local_version,
+            "peer_version": peer_version,
+            "synced": datetime.datetime.now().isoformat(timespec="seconds")
+        }
+        write_data_file(os.path.join(data_manager.data_dir, self.SYNC_FILE), state, data_manager.codec)
+
+
 class ChartManager:
     """Class to handle chart creation and visualization."""
     
@@ -1248,13 +5816,11 @@ class ChartManager:
     
     def create_distribution_chart(self, ax: plt.Axes, date_str: str) -> None:
         """Create a pie chart showing calorie distribution for a specific date."""
-        day_data = self.data_manager.get_day_data(date_str)
-        food_entries = day_data.get("food", [])
-        
-        if not food_entries:
+        if not self.data_manager.day_summary(date_str).foods:
             ax.text(0.5, 0.5, "No food data for selected date", 
                    horizontalalignment='center', verticalalignment='center')
             return
+        food_entries = self.data_manager.get_day_data(date_str).get("food", [])
         
         # Extract food names and calorie values
         foods = []
@@ -1338,8 +5904,8 @@ class ChartManager:
         
         dates, weights = zip(*weight_history)
         
-        # Format dates for display
-        formatted_dates = [datetime.datetime.strptime(date, "%Y-%m-%d").strftime("%b %d") for date in dates]
+        # Format dates for display ("%b %d", sliced out of the date strings instead of parsing them)
+        formatted_dates = [f"{calendar.month_abbr[int(date[5:7])]} {date[8:10]}" for date in dates]
         
         # Create the weight tracking line chart
         ax.plot(formatted_dates, weights, marker='o', linestyle='-', linewidth=2, markersize=8, color='#5cb85c')
@@ -1377,10 +5943,10 @@ class ChartManager:
 class CalendarDialog:
     """Class to handle the calendar dialog for date selection."""
     
-    def __init__(self, parent, current_date_var, history, on_date_selected):
+    def __init__(self, parent, current_date_var, data_manager, on_date_selected):
         self.parent = parent
         self.current_date_var = current_date_var
-        self.history = history
+        self.data_manager = data_manager
         self.on_date_selected = on_date_selected
         
         # Parse current date
@@ -1527,10 +6093,14 @@ class CalendarDialog:
         # Adjust for Sunday as first day of week (calendar.monthrange returns 0 for Monday)
         first_day = (first_day + 1) % 7
         
+        # Day markers come from the per-day totals, so entries are not parsed
+        totals = self.data_manager.daily_totals(f"{year}-{month:02d}-01", f"{year}-{month:02d}-{num_days:02d}")
+        
         # Create day buttons
         btn_style = ttk.Style()
         btn_style.configure("Cal.TButton", font=("Roboto", 9))
         
+        today = datetime.date.today()
         day = 1
         for row in range(6):  # 6 weeks max
             if day > num_days:
@@ -1552,7 +6122,6 @@ class CalendarDialog:
                     )
                     
                     # Highlight today
-                    today = datetime.datetime.now()
                     if day == today.day and month == today.month and year == today.year:
                         btn.configure(style="Accent.TButton")
                     
@@ -1562,15 +6131,15 @@ class CalendarDialog:
                     
                     # Check if there's data for this date
                     date_str = f"{year}-{month:02d}-{day:02d}"
-                    if date_str in self.history:
+                    if date_str in totals:
                         has_data = False
                         has_weight = False
-                        day_data = self.history[date_str]
+                        day_totals = totals[date_str]
                         
-                        if day_data.get("food") or day_data.get("exercise"):
+                        if day_totals["foods"] or day_totals["exercises"]:
                             has_data = True
                             
-                        if day_data.get("weight") is not None:
+                        if day_totals["weight"] is not None:
                             has_weight = True
                         
                         if has_data and has_weight:
@@ -1622,10 +6191,29 @@ class CalendarDialog:
 class BurgerTracker:
     """Main application class for the Jacob Burger Tracker."""
     
-    def __init__(self, root):
+    def __init__(self, root, storage_engine="json", codec="json", archive_after_days=365, profile=None,
+                 readonly=False, memory_budget=None):
         self.root = root
         self.root.title("Jacob Burger Tracker")
         
+        # Persistence engine used by the data manager ("json", "sqlite", "sharded" or "columnar")
+        self.storage_engine = storage_engine
+        
+        # Serializer for saved files (see CODECS)
+        self.codec = codec
+        
+        # Age in days after which history moves to the compressed archive (JSON engine)
+        self.archive_after_days = archive_after_days
+        
+        # Viewer mode: history is memory-mapped and everything that changes data is disabled
+        self.readonly = readonly
+        
+        # Bytes of stored history kept decoded at most (JSON engine); None keeps everything read
+        self.memory_budget = memory_budget
+        
+        # Profile to open at startup (created if missing); None reopens the last one used
+        self.profile = profile
+        
         # Set initial geometry
         self.root.geometry("900x700")
         
@@ -1805,15 +6393,26 @@ class BurgerTracker:
            |_|   |_|     \__,_|  \___| |_|\_\  \___| |_|                       
 """
         
-        # Initialize data manager
-        self.data_manager = DataManager()
+        # Profiles, each with its own data directory; only the active one is loaded
+        self.profiles = ProfileManager(storage_engine=self.storage_engine, codec=self.codec,
+                                       archive_after_days=self.archive_after_days, readonly=self.readonly,
+                                       memory_budget=self.memory_budget)
+        if self.profile is not None and self.profile not in self.profiles.index["profiles"]:
+            self.profiles.create(self.profile)
         
-        # Initialize gamification manager
-        self.gamification_manager = GamificationManager(self.data_manager)
+        # Initialize data and gamification managers for the active profile
+        self.data_manager, self.gamification_manager = self.profiles.switch(self.profile or self.profiles.active)
+        self.update_title()
         
         # Initialize chart manager
         self.chart_manager = ChartManager(self.data_manager)
         
+        # Flush pending autosaves however the window is closed
+        self.root.protocol("WM_DELETE_WINDOW", self.on_exit)
+        
+        # Pick up changes saved by other instances sharing the data directory
+        self.root.bind("<FocusIn>", self.on_focus_in)
+        
         # Kyle Tax enabled flag
         self.kyle_tax_enabled = tk.BooleanVar(value=False)
         
@@ -1857,6 +6456,20 @@ class BurgerTracker:
         
         # Status bar
         self.create_status_bar()
+        if self.readonly:
+            self.status_var.set("Read-only view: changes are disabled")
+    
+    def update_title(self):
+        """Show the active profile, and read-only mode, in the window title."""
+        title = f"Jacob Burger Tracker - {self.profiles.active}"
+        self.root.title(f"{title} (read-only)" if self.readonly else title)
+    
+    def edit_button(self, parent, **options):
+        """Button for an action that changes data; disabled in read-only mode."""
+        button = ttk.Button(parent, **options)
+        if self.readonly:
+            button.state(["disabled"])
+        return button
     
     def create_header(self):
         """Create the application header with logo and title."""
@@ -2036,28 +6649,28 @@ class BurgerTracker:
         button_frame.pack(fill="x", padx=10, pady=10)
         
         # Add buttons with improved styling
-        ttk.Button(
+        self.edit_button(
             button_frame, 
             text="Add Food Item", 
             style="Success.TButton",
             command=self.add_food
         ).pack(side="left", padx=5)
         
-        ttk.Button(
+        self.edit_button(
             button_frame, 
             text="Delete Selected", 
             style="Danger.TButton",
             command=self.delete_food
         ).pack(side="left", padx=5)
         
-        ttk.Button(
+        self.edit_button(
             button_frame, 
             text="Clear All", 
             style="Warning.TButton",
             command=self.clear_all
         ).pack(side="left", padx=5)
         
-        ttk.Button(
+        self.edit_button(
             button_frame, 
             text="Save Data", 
             style="Info.TButton",
@@ -2204,21 +6817,21 @@ class BurgerTracker:
         button_frame = ttk.Frame(exercise_frame)
         button_frame.pack(fill="x", padx=5, pady=10)
         
-        ttk.Button(
+        self.edit_button(
             button_frame, 
             text="Add Exercise", 
             style="Success.TButton",
             command=self.add_exercise
         ).pack(side="left", padx=5)
         
-        ttk.Button(
+        self.edit_button(
             button_frame, 
             text="Delete Selected", 
             style="Danger.TButton",
             command=self.delete_exercise
         ).pack(side="left", padx=5)
         
-        ttk.Button(
+        self.edit_button(
             button_frame, 
             text="Clear All", 
             style="Warning.TButton",
@@ -2315,7 +6928,7 @@ class BurgerTracker:
         weight_entry = ttk.Entry(weight_entry_frame, textvariable=self.weight_var, width=10)
         weight_entry.pack(side=tk.LEFT, padx=5)
         
-        ttk.Button(
+        self.edit_button(
             weight_entry_frame,
             text="Save Weight",
             style="Success.TButton",
@@ -2348,14 +6961,14 @@ class BurgerTracker:
         weight_button_frame = ttk.Frame(weight_frame)
         weight_button_frame.pack(fill=tk.X, padx=10, pady=10)
         
-        ttk.Button(
+        self.edit_button(
             weight_button_frame,
             text="Delete Selected",
             style="Danger.TButton",
             command=self.delete_weight
         ).pack(side=tk.LEFT, padx=5)
         
-        ttk.Button(
+        self.edit_button(
             weight_button_frame,
             text="Edit Selected",
             style="Info.TButton",
@@ -2893,14 +7506,16 @@ class BurgerTracker:
         menu_bar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Save Data", command=self.save_history)
         file_menu.add_command(label="Export Report", command=self.export_report)
+        file_menu.add_command(label="Export History...", command=self.export_history)
         file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.root.quit)
+        file_menu.add_command(label="Exit", command=self.on_exit)
         
         # Create Tools menu
         tools_menu = tk.Menu(menu_bar, tearoff=0)
         menu_bar.add_cascade(label="Tools", menu=tools_menu)
         tools_menu.add_command(label="Clear Today's Log", command=self.clear_today)
         tools_menu.add_command(label="Delete All History", command=self.delete_history)
+        tools_menu.add_command(label="Restore Snapshot...", command=self.restore_snapshot)
         tools_menu.add_separator()
         tools_menu.add_command(label="Food Statistics", command=self.show_stats)
         tools_menu.add_command(label="Weight Tracker", command=self.show_weight_tracker)
@@ -2908,6 +7523,18 @@ class BurgerTracker:
         tools_menu.add_separator()
         tools_menu.add_command(label="Manage Custom Database", command=self.manage_custom_database)
         
+        # Create Profile menu
+        self.profile_menu = tk.Menu(menu_bar, tearoff=0)
+        menu_bar.add_cascade(label="Profile", menu=self.profile_menu)
+        self.profile_var = tk.StringVar(value=self.profiles.active)
+        self.populate_profile_menu()
+        
+        # Nothing that changes data is reachable in read-only mode
+        if self.readonly:
+            file_menu.entryconfig("Save Data", state=tk.DISABLED)
+            for label in ("Clear Today's Log", "Delete All History", "Restore Snapshot...", "Manage Custom Database"):
+                tools_menu.entryconfig(label, state=tk.DISABLED)
+        
         # Create View menu
         view_menu = tk.Menu(menu_bar, tearoff=0)
         menu_bar.add_cascade(label="View", menu=view_menu)
@@ -2989,6 +7616,54 @@ class BurgerTracker:
         # Reload data for the current tab
         self.on_tab_changed(None)
     
+    def populate_profile_menu(self):
+        """Fill the Profile menu with one entry per profile."""
+        self.profile_menu.delete(0, tk.END)
+        for name in self.profiles.names():
+            self.profile_menu.add_radiobutton(
+                label=name,
+                variable=self.profile_var,
+                value=name,
+                command=lambda name=name: self.switch_profile(name)
+            )
+        self.profile_menu.add_separator()
+        self.profile_menu.add_command(label="New Profile...", command=self.create_profile,
+                                      state=tk.DISABLED if self.readonly else tk.NORMAL)
+    
+    def create_profile(self):
+        """Ask for a name, create the profile and switch to it."""
+        name = simpledialog.askstring("New Profile", "Profile name:", parent=self.root)
+        if not name:
+            return
+        try:
+            self.profiles.create(name)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.populate_profile_menu()
+        self.switch_profile(name.strip())
+    
+    def switch_profile(self, name):
+        """Make another profile active and reload every view from its data."""
+        self.profile_var.set(name)
+        if name == self.profiles.active:
+            return
+        
+        # Leave the current profile saved; it stays cached for a quick switch back
+        self.data_manager.save_history()
+        self.gamification_manager.save_gamification_data()
+        
+        self.data_manager, self.gamification_manager = self.profiles.switch(name)
+        self.chart_manager.data_manager = self.data_manager
+        self.update_title()
+        
+        self.date_var.set(self.data_manager.current_date)
+        self.on_date_selected(self.data_manager.current_date)
+        self.load_weight_history()
+        self.refresh_achievements()
+        self.on_tab_changed(None)
+        self.status_var.set(f"Switched to profile '{name}'")
+    
     def export_report(self):
         """Export a report of the current day's data."""
         filename = f"burger_report_{self.date_var.get()}.txt"
@@ -3010,23 +7685,24 @@ class BurgerTracker:
                 food_entries = day_data.get("food", [])
                 exercise_entries = day_data.get("exercise", [])
                 
-                total_calories = 0
                 for entry in food_entries:
                     calories = entry["calories"]
                     if entry.get("kyle_tax", False):
                         calories = int(calories * 0.85)
                     
                     f.write(f"{entry['food']} ({entry.get('category', 'Food')}) x {entry['amount']}: {calories} calories\n")
-                    total_calories += calories
                 
                 f.write("\nEXERCISE ACTIVITY:\n")
                 f.write("------------------\n")
                 
-                total_burnt = 0
                 for exercise in exercise_entries:
                     burnt = exercise["calories_burnt"]
                     f.write(f"{exercise['exercise']} for {exercise['duration']} minutes: {burnt} calories burnt\n")
-                    total_burnt += burnt
+                
+                # Totals come from the cached day summary
+                summary = self.data_manager.day_summary(selected_date)
+                total_calories = summary.calories_in
+                total_burnt = summary.calories_burnt
                 
                 f.write("\nSUMMARY:\n")
                 f.write("--------\n")
@@ -3047,6 +7723,31 @@ class BurgerTracker:
         except Exception as e:
             messagebox.showerror("Export Failed", f"Failed to export report: {e}")
     
+    def export_history(self):
+        """Export every logged entry to a CSV, JSONL or NumPy .npz file."""
+        filename = filedialog.asksaveasfilename(
+            parent=self.root,
+            title="Export History",
+            defaultextension=".csv",
+            initialfile="burger_history.csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("NumPy columns", "*.npz")]
+        )
+        if not filename:
+            return
+        
+        def progress(days, rows):
+            self.status_var.set(f"Exporting... {days} days, {rows} entries")
+            self.root.update_idletasks()
+        
+        try:
+            count = self.data_manager.export_history(
+                filename, tax_all=self.kyle_tax_enabled.get(), progress=progress
+            )
+            self.status_var.set(f"Exported {count} entries")
+            messagebox.showinfo("Export Successful", f"History exported to {filename}")
+        except Exception as e:
+            messagebox.showerror("Export Failed", f"Failed to export history: {e}")
+    
     def show_guide(self):
         """Show the user guide dialog."""
         guide_window = tk.Toplevel(self.root)
@@ -3342,9 +8043,8 @@ class BurgerTracker:
         """Change the selected date by the specified number of days."""
         # Change the selected date
         try:
-            date = datetime.datetime.strptime(self.date_var.get(), "%Y-%m-%d")
-            new_date = date + datetime.timedelta(days=days)
-            self.date_var.set(new_date.strftime("%Y-%m-%d"))
+            date = self.data_manager.days.ordinal(self.date_var.get())
+            self.date_var.set(self.data_manager.days.date(date + days))
             self.load_entries()
             self.load_exercises()
             
@@ -3460,21 +8160,13 @@ class BurgerTracker:
     
     def update_totals(self):
         """Update the calorie totals display."""
-        # Get food entries
-        day_data = self.data_manager.get_day_data(self.date_var.get())
-        food_entries = day_data.get("food", [])
-        exercise_entries = day_data.get("exercise", [])
+        summary = self.data_manager.day_summary(self.date_var.get())
         
-        # Calculate total calories with Kyle Tax if enabled
-        total_in = 0
-        for entry in food_entries:
-            calories = entry["calories"]
-            if entry.get("kyle_tax", False) or self.kyle_tax_enabled.get():
-                calories = int(calories * 0.85)
-            total_in += calories
+        # Total calories, with Kyle Tax on every entry if enabled
+        total_in = summary.calories_in_all_taxed if self.kyle_tax_enabled.get() else summary.calories_in
         
-        # Calculate total calories burnt
-        total_burnt = sum(ex.get("calories_burnt", 0) for ex in exercise_entries)
+        # Total calories burnt
+        total_burnt = summary.calories_burnt
         
         # Calculate net calories
         net_calories = total_in - total_burnt
@@ -4157,7 +8849,8 @@ class BurgerTracker:
     def delete_history(self):
         """Delete all history data."""
         # Delete all history
-        if not messagebox.askyesno("Confirm", "Delete ALL history data? This cannot be undone!"):
+        if not messagebox.askyesno("Confirm", "Delete ALL history data?\n\n"
+                                   "A snapshot is kept; use Tools > Restore Snapshot to undo."):
             return
         
         self.data_manager.delete_all_history()
@@ -4174,6 +8867,68 @@ class BurgerTracker:
         
         self.status_var.set("All history has been deleted")
     
+    def restore_snapshot(self):
+        """Open a window listing history snapshots, to restore one or take a new one."""
+        snapshot_window = tk.Toplevel(self.root)
+        snapshot_window.title("History Snapshots")
+        snapshot_window.geometry("560x360")
+        snapshot_window.transient(self.root)
+        snapshot_window.grab_set()
+        
+        tree_frame = ttk.Frame(snapshot_window)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        columns = ("id", "created", "label", "days")
+        snapshot_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", selectmode="browse")
+        for column, heading, width in zip(columns, ("#", "Taken", "Reason", "Days"), (40, 150, 260, 60)):
+            snapshot_tree.heading(column, text=heading)
+            snapshot_tree.column(column, width=width)
+        snapshot_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=snapshot_tree.yview)
+        snapshot_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        def populate_snapshots():
+            snapshot_tree.delete(*snapshot_tree.get_children())
+            for snapshot in reversed(self.data_manager.list_snapshots()):
+                snapshot_tree.insert("", tk.END, values=(
+                    snapshot["id"], snapshot["created"].replace("T", " "), snapshot["label"], snapshot["days"]
+                ))
+        
+        def take_snapshot():
+            manifest = self.data_manager.snapshot_history()
+            populate_snapshots()
+            self.status_var.set(f"Snapshot {manifest['id']} taken")
+        
+        def restore_selected():
+            selected = snapshot_tree.selection()
+            if not selected:
+                messagebox.showinfo("Info", "Please select a snapshot to restore", parent=snapshot_window)
+                return
+            snapshot_id = int(snapshot_tree.item(selected[0], "values")[0])
+            if not messagebox.askyesno("Confirm", f"Restore the history to snapshot {snapshot_id}?\n\n"
+                                       "The current history is snapshotted first.", parent=snapshot_window):
+                return
+            
+            changed = self.data_manager.restore_snapshot(snapshot_id)
+            snapshot_window.destroy()
+            
+            # Reload every view from the restored history
+            self.on_date_selected(self.date_var.get())
+            self.load_weight_history()
+            self.on_tab_changed(None)
+            self.status_var.set(f"Restored snapshot {snapshot_id} ({changed} days changed)")
+        
+        button_frame = ttk.Frame(snapshot_window)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(button_frame, text="Restore Selected", style="Warning.TButton",
+                   command=restore_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Take Snapshot", command=take_snapshot).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Close", command=snapshot_window.destroy).pack(side=tk.RIGHT, padx=5)
+        
+        populate_snapshots()
+    
     def show_stats(self):
         """Show the statistics tab."""
         # Show statistics - now we show the stats tab
@@ -4317,18 +9072,9 @@ class BurgerTracker:
             for item in food_tree.get_children():
                 food_tree.delete(item)
             
-            # Load custom foods
-            custom_foods = {}
-            if os.path.exists(self.data_manager.custom_food_file):
-                try:
-                    with open(self.data_manager.custom_food_file, "r") as f:
-                        custom_foods = json.load(f)
-                except Exception as e:
-                    print(f"Error loading custom foods: {e}")
-            
             # Add to tree with filter
             category_filter = food_filter_var.get()
-            for name, data in custom_foods.items():
+            for name, data in self.data_manager.custom_foods.entries.items():
                 if category_filter == "All Categories" or data.get("category", "Other") == category_filter:
                     food_tree.insert("", "end", values=(
                         name,
@@ -4349,27 +9095,10 @@ class BurgerTracker:
             if not messagebox.askyesno("Confirm", f"Delete custom food '{food_name}'?"):
                 return
             
-            # Load custom foods
-            custom_foods = {}
-            if os.path.exists(self.data_manager.custom_food_file):
-                try:
-                    with open(self.data_manager.custom_food_file, "r") as f:
-                        custom_foods = json.load(f)
-                except Exception as e:
-                    print(f"Error loading custom foods: {e}")
-            
             # Remove the food
-            if food_name in custom_foods:
-                del custom_foods[food_name]
-                
-                # Save back to file
+            if food_name in self.data_manager.custom_foods:
                 try:
-                    with open(self.data_manager.custom_food_file, "w") as f:
-                        json.dump(custom_foods, f, indent=4)
-                    
-                    # Also remove from main database
-                    if food_name in self.data_manager.food_database:
-                        del self.data_manager.food_database[food_name]
+                    self.data_manager.delete_custom_food(food_name)
                     
                     # Update tree
                     food_tree.delete(selected[0])
@@ -4434,36 +9163,10 @@ class BurgerTracker:
                         messagebox.showerror("Error", "Please enter valid values")
                         return
                     
-                    # Load custom foods
-                    custom_foods = {}
-                    if os.path.exists(self.data_manager.custom_food_file):
-                        try:
-                            with open(self.data_manager.custom_food_file, "r") as f:
-                                custom_foods = json.load(f)
-                        except Exception as e:
-                            print(f"Error loading custom foods: {e}")
-                    
-                    # Remove old entry and add new
-                    if food_name in custom_foods:
-                        del custom_foods[food_name]
-                    
-                    custom_foods[new_name] = {
-                        "calories": new_calories,
-                        "category": new_category
-                    }
-                    
-                    # Save back to file
-                    with open(self.data_manager.custom_food_file, "w") as f:
-                        json.dump(custom_foods, f, indent=4)
-                    
-                    # Update main database
-                    if food_name in self.data_manager.food_database:
-                        del self.data_manager.food_database[food_name]
-                    
-                    self.data_manager.food_database[new_name] = {
-                        "calories": new_calories,
-                        "category": new_category
-                    }
+                    # Replace the old entry in the catalog and the main database
+                    if not self.data_manager.update_custom_food(food_name, new_name, new_calories, new_category):
+                        messagebox.showerror("Error", "Failed to save food")
+                        return
                     
                     # Update tree
                     food_tree.item(item_id, values=(new_name, new_calories, new_category))
@@ -4537,17 +9240,8 @@ class BurgerTracker:
             for item in exercise_tree.get_children():
                 exercise_tree.delete(item)
             
-            # Load custom exercises
-            custom_exercises = {}
-            if os.path.exists(self.data_manager.custom_exercise_file):
-                try:
-                    with open(self.data_manager.custom_exercise_file, "r") as f:
-                        custom_exercises = json.load(f)
-                except Exception as e:
-                    print(f"Error loading custom exercises: {e}")
-            
             # Add to tree
-            for name, cal_per_min in custom_exercises.items():
+            for name, cal_per_min in self.data_manager.custom_exercises.entries.items():
                 exercise_tree.insert("", "end", values=(
                     name,
                     cal_per_min
@@ -4566,27 +9260,10 @@ class BurgerTracker:
             if not messagebox.askyesno("Confirm", f"Delete custom exercise '{exercise_name}'?"):
                 return
             
-            # Load custom exercises
-            custom_exercises = {}
-            if os.path.exists(self.data_manager.custom_exercise_file):
-                try:
-                    with open(self.data_manager.custom_exercise_file, "r") as f:
-                        custom_exercises = json.load(f)
-                except Exception as e:
-                    print(f"Error loading custom exercises: {e}")
-            
             # Remove the exercise
-            if exercise_name in custom_exercises:
-                del custom_exercises[exercise_name]
-                
-                # Save back to file
+            if exercise_name in self.data_manager.custom_exercises:
                 try:
-                    with open(self.data_manager.custom_exercise_file, "w") as f:
-                        json.dump(custom_exercises, f, indent=4)
-                    
-                    # Also remove from main database
-                    if exercise_name in self.data_manager.exercise_database:
-                        del self.data_manager.exercise_database[exercise_name]
+                    self.data_manager.delete_custom_exercise(exercise_name)
                     
                     # Update tree
                     exercise_tree.delete(selected[0])
@@ -4636,30 +9313,10 @@ class BurgerTracker:
                         messagebox.showerror("Error", "Please enter valid values")
                         return
                     
-                    # Load custom exercises
-                    custom_exercises = {}
-                    if os.path.exists(self.data_manager.custom_exercise_file):
-                        try:
-                            with open(self.data_manager.custom_exercise_file, "r") as f:
-                                custom_exercises = json.load(f)
-                        except Exception as e:
-                            print(f"Error loading custom exercises: {e}")
-                    
-                    # Remove old entry and add new
-                    if exercise_name in custom_exercises:
-                        del custom_exercises[exercise_name]
-                    
-                    custom_exercises[new_name] = new_cal
-                    
-                    # Save back to file
-                    with open(self.data_manager.custom_exercise_file, "w") as f:
-                        json.dump(custom_exercises, f, indent=4)
-                    
-                    # Update main database
-                    if exercise_name in self.data_manager.exercise_database:
-                        del self.data_manager.exercise_database[exercise_name]
-                    
-                    self.data_manager.exercise_database[new_name] = new_cal
+                    # Replace the old entry in the catalog and the main database
+                    if not self.data_manager.update_custom_exercise(exercise_name, new_name, new_cal):
+                        messagebox.showerror("Error", "Failed to save exercise")
+                        return
                     
                     # Update tree
                     exercise_tree.item(item_id, values=(new_name, new_cal))
@@ -4712,7 +9369,7 @@ class BurgerTracker:
         calendar_dialog = CalendarDialog(
             self.root,
             self.date_var,
-            self.data_manager.history,
+            self.data_manager,
             self.on_date_selected
         )
     
@@ -4749,6 +9406,15 @@ class BurgerTracker:
         elif current_tab == 4:  # Achievements
             self.refresh_achievements()
     
+    def on_focus_in(self, event):
+        """Merge changes other instances saved while this window was in the background."""
+        # Bindings on the root also fire for focus moving between its child widgets
+        if event.widget is not self.root:
+            return
+        if self.data_manager.refresh_from_disk():
+            self.on_tab_changed(event)
+            self.status_var.set("Loaded changes saved by another instance")
+    
     def on_window_resize(self, event):
         """Handle window resize event."""
         # This method is called when the window is resized
@@ -4828,14 +9494,311 @@ class BurgerTracker:
             self.status_var.set("Data saved successfully!")
         else:
             messagebox.showerror("Error", "Failed to save history")
+    
+    def on_exit(self):
+        """Write out pending data, then close the window."""
+        self.data_manager.save_history()
+        self.gamification_manager.save_gamification_data()
+        self.profiles.close()
+        self.root.destroy()
+
+
+def benchmark_codecs(day_counts: Tuple[int, ...] = (365, 3650), entries_per_day: int = 20) -> None:
+    """Print encode/decode time and encoded size of every available codec on synthetic histories."""
+    rng = random.Random(42)
+    foods = ["Single Patty Burger", "Double Patty Burger", "Fries", "Onion Rings", "Milkshake", "Coleslaw"]
+    categories = ["Burgers", "Sides", "Drinks", "Desserts"]
+    start = datetime.date(2015, 1, 1)
+    
+    for day_count in day_counts:
+        history = {}
+        for offset in range(day_count):
+            date = (start + datetime.timedelta(days=offset)).isoformat()
+            history[date] = {
+                "food": [
+                    {"food": rng.choice(foods), "amount": rng.choice([0.5, 1, 1.5, 2]),
+                     "calories": rng.randint(100, 1500), "category": rng.choice(categories),
+                     "kyle_tax": rng.random() < 0.2}
+                    for _ in range(entries_per_day)
+                ],
+                "exercise": [{"exercise": "Walking", "duration": 30, "calories_burnt": 150}],
+                "weight": round(rng.uniform(170, 210), 1)
+            }
+        
+        print(f"{day_count} days x {entries_per_day} food entries")
+        print(f"  {'codec':<10}{'encode ms':>12}{'decode ms':>12}{'size KB':>12}")
+        for name, codec in CODECS.items():
+            if not codec.available:
+                print(f"  {name:<10}{'not installed':>36}")
+                continue
+            began = time.perf_counter()
+            data = codec.dumps(history)
+            encoded = time.perf_counter()
+            codec.loads(data)
+            decoded = time.perf_counter()
+            print(f"  {name:<10}{(encoded - began) * 1000:>12.1f}{(decoded - encoded) * 1000:>12.1f}"
+                  f"{len(data) / 1024:>12.1f}")
+
+
+def benchmark_startup(day_count: int = 3650, entries_per_day: int = 20, journal_records: int = 300,
+                      custom_foods: int = 3000, runs: int = 5) -> None:
+    """Print how long opening a synthetic data directory takes with and without the state cache."""
+    start = datetime.date(2015, 1, 1)
+    entry = {"food": "Single Patty Burger", "amount": 1, "calories": 500, "category": "Burgers", "kyle_tax": False}
+    batch = [("add_food", (start + datetime.timedelta(days=i // entries_per_day)).isoformat(), dict(entry))
+             for i in range(day_count * entries_per_day)]
+    
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_manager = DataManager(data_dir=data_dir)
+        data_manager.add_entries(batch)
+        data_manager.compact_history()
+        data_manager.save_custom_foods({f"Custom Food {i}": {"calories": i, "category": "Other"}
+                                        for i in range(custom_foods)})
+        # Left in the journal, so every start has records to replay
+        data_manager.add_entries(batch[-journal_records:])
+        GamificationManager(data_manager).save_gamification_data()
+        data_manager.close()
+        
+        def open_once(cold: bool) -> float:
+            if cold and os.path.exists(data_manager.state_cache_file):
+                os.remove(data_manager.state_cache_file)
+            began = time.perf_counter()
+            opened = DataManager(data_dir=data_dir)
+            GamificationManager(opened)
+            elapsed = time.perf_counter() - began
+            opened.close()
+            return elapsed
+        
+        print(f"{day_count} days x {entries_per_day} food entries, {journal_records} journal records, "
+              f"{custom_foods} custom foods")
+        for label, cold in (("cold", True), ("warm", False)):
+            open_once(cold)
+            best = min(open_once(cold) for _ in range(runs))
+            print(f"  {label} start: {best * 1000:.1f} ms")
+
+
+def benchmark_entry_memory(count: int = 1_000_000) -> None:
+    """Print the bytes per logged food decoded from JSON, as plain dicts and as FoodEntry records."""
+    rng = random.Random(42)
+    foods = ["Single Patty Burger", "Double Patty Burger", "Double Patty Cheeseburger", "Beef Tallow Fries",
+             "Onion Rings", "Milkshake", "Coleslaw"]
+    categories = ["Burgers", "Sides", "Drinks", "Desserts"]
+    encoded = json.dumps([
+        {"food": rng.choice(foods), "amount": rng.choice([0.5, 1, 1.5, 2]), "calories": rng.randint(100, 1500),
+         "category": rng.choice(categories), "kyle_tax": rng.random() < 0.2, "id": f"{i:016x}"}
+        for i in range(count)
+    ])
+    
+    print(f"{count} food entries decoded from JSON")
+    for label, convert in (("dict", None), ("FoodEntry", FoodEntry.from_dict)):
+        tracemalloc.start()
+        entries = json.loads(encoded)
+        if convert is not None:
+            entries = [convert(entry) for entry in entries]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {label:<10}{size / count:>8.1f} bytes/entry")
+        del entries
 
 
 # Run the application
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jacob Burger Tracker")
+    parser.add_argument(
+        "--storage",
+        choices=["json", "sqlite", "sharded", "columnar"],
+        default="json",
+        help="history storage engine (sqlite, sharded and columnar migrate burger_tracker_data.json on first run)"
+    )
+    parser.add_argument(
+        "--codec",
+        choices=sorted(CODECS),
+        default="json",
+        help="serializer for saved files (orjson and msgpack need the package installed)"
+    )
+    parser.add_argument(
+        "--archive-after",
+        type=int,
+        default=365,
+        metavar="DAYS",
+        help="move history days older than DAYS into compressed archives on compaction (0 disables; json storage only)"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="NAME",
+        help="profile to open (created if it does not exist); defaults to the last one used"
+    )
+    parser.add_argument(
+        "--readonly",
+        action="store_true",
+        help="open the history read-only: the data file is memory-mapped and editing is disabled (json storage only)"
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        help="keep at most about MB megabytes of stored history decoded, evicting the least recently used "
+             "months (json storage only)"
+    )
+    parser.add_argument(
+        "--import-log",
+        nargs="+",
+        metavar="FILE",
+        help="import food/exercise rows from CSV or JSONL files into the history, then exit"
+    )
+    parser.add_argument(
+        "--export",
+        metavar="FILE",
+        help="export the history to a .csv, .jsonl or .npz file, then exit"
+    )
+    parser.add_argument("--export-from", metavar="YYYY-MM-DD", help="first date to export")
+    parser.add_argument("--export-to", metavar="YYYY-MM-DD", help="last date to export")
+    parser.add_argument(
+        "--export-category",
+        action="append",
+        metavar="CATEGORY",
+        help="only export foods in this category (repeatable); exercises are left out"
+    )
+    parser.add_argument(
+        "--sync-with",
+        metavar="DIR",
+        help="exchange changed history days with the data directory DIR (json storage only), then exit"
+    )
+    parser.add_argument(
+        "--snapshot",
+        nargs="?",
+        const="manual",
+        metavar="LABEL",
+        help="take a point-in-time snapshot of the history, then exit"
+    )
+    parser.add_argument("--list-snapshots", action="store_true", help="list the stored history snapshots, then exit")
+    parser.add_argument(
+        "--restore-snapshot",
+        type=int,
+        metavar="ID",
+        help="restore the history to a snapshot (the current history is snapshotted first), then exit"
+    )
+    parser.add_argument(
+        "--benchmark-codecs",
+        action="store_true",
+        help="print encode/decode time and size of each codec on synthetic histories, then exit"
+    )
+    parser.add_argument(
+        "--benchmark-memory",
+        action="store_true",
+        help="print the memory per logged entry as a dict and as an entry record, then exit"
+    )
+    parser.add_argument(
+        "--benchmark-startup",
+        action="store_true",
+        help="print how long opening a synthetic history takes with and without the state cache, then exit"
+    )
+    args = parser.parse_args()
+    if args.readonly and args.storage != "json":
+        parser.error("--readonly needs --storage json")
+    if args.memory_budget is not None and args.storage != "json":
+        parser.error("--memory-budget needs --storage json")
+    if args.readonly:
+        for option, used in (("--import-log", args.import_log), ("--snapshot", args.snapshot),
+                             ("--restore-snapshot", args.restore_snapshot is not None),
+                             ("--sync-with", args.sync_with)):
+            if used:
+                parser.error(f"{option} changes the history, so it cannot be used with --readonly")
+    memory_budget = None if args.memory_budget is None else int(args.memory_budget * 1024 * 1024)
+    
+    if args.benchmark_codecs:
+        benchmark_codecs()
+        sys.exit(0)
+    if args.benchmark_startup:
+        benchmark_startup()
+        sys.exit(0)
+    if args.benchmark_memory:
+        benchmark_entry_memory()
+        sys.exit(0)
+    
+    # Data directory of the requested profile, for the commands that run without the window
+    profiles = ProfileManager()
+    if args.profile is not None and args.profile not in profiles.index["profiles"]:
+        if args.readonly:
+            parser.error(f"profile '{args.profile}' does not exist")
+        profiles.create(args.profile)
+    data_dir = profiles.data_dir(args.profile or profiles.active)
+    
+    if args.import_log:
+        data_manager = DataManager(storage_engine=args.storage, codec=args.codec,
+                                   archive_after_days=args.archive_after, data_dir=data_dir)
+        for path in args.import_log:
+            try:
+                began = time.perf_counter()
+                counts = data_manager.import_log(path)
+                print(f"{path}: imported {counts['food']} food and {counts['exercise']} exercise entries "
+                      f"and {counts['weight']} weights, skipped {counts['skipped']} rows "
+                      f"in {time.perf_counter() - began:.1f}s")
+            except Exception as e:
+                print(f"Failed to import {path}: {e}")
+        data_manager.close()
+        sys.exit(0)
+    
+    if args.export:
+        data_manager = DataManager(storage_engine=args.storage, codec=args.codec,
+                                   archive_after_days=args.archive_after, data_dir=data_dir,
+                                   readonly=args.readonly, memory_budget=memory_budget)
+        try:
+            count = data_manager.export_history(
+                args.export,
+                start=args.export_from,
+                end=args.export_to,
+                categories=args.export_category,
+                include_exercise=not args.export_category,
+                progress=lambda days, rows: print(f"\r{days} days, {rows} entries", end="", flush=True)
+            )
+            print(f"\nExported {count} entries to {args.export}")
+        except Exception as e:
+            print(f"Failed to export history: {e}")
+        data_manager.close()
+        sys.exit(0)
+    
+    if args.snapshot or args.list_snapshots or args.restore_snapshot is not None:
+        # Only --list-snapshots gets this far with --readonly
+        data_manager = DataManager(storage_engine=args.storage, codec=args.codec,
+                                   archive_after_days=args.archive_after, data_dir=data_dir,
+                                   readonly=args.readonly, memory_budget=memory_budget)
+        try:
+            if args.snapshot:
+                manifest = data_manager.snapshot_history(args.snapshot)
+                print(f"Took snapshot {manifest['id']} of {len(manifest['days'])} days")
+            if args.restore_snapshot is not None:
+                changed = data_manager.restore_snapshot(args.restore_snapshot)
+                print(f"Restored snapshot {args.restore_snapshot}: {changed} days changed")
+            if args.list_snapshots:
+                for snapshot in data_manager.list_snapshots():
+                    print(f"{snapshot['id']:>4}  {snapshot['created']}  {snapshot['days']:>6} days  {snapshot['label']}")
+        except Exception as e:
+            print(f"Snapshot command failed: {e}")
+        data_manager.close()
+        sys.exit(0)
+    
+    if args.sync_with:
+        data_manager = DataManager(storage_engine=args.storage, codec=args.codec,
+                                   archive_after_days=args.archive_after, data_dir=data_dir)
+        peer = DataManager(storage_engine=args.storage, codec=args.codec,
+                           archive_after_days=args.archive_after, data_dir=args.sync_with)
+        try:
+            counts = HistorySync(data_manager, peer).run()
+            print(f"Synced with {args.sync_with}: sent {counts['sent']}, received {counts['received']}, "
+                  f"merged {counts['merged']} days")
+        except Exception as e:
+            print(f"Failed to sync history: {e}")
+        peer.close()
+        data_manager.close()
+        sys.exit(0)
+    
     try:
         print("Starting Jacob Burger Tracker...")
         root = tk.Tk()
-        app = BurgerTracker(root)
+        app = BurgerTracker(root, storage_engine=args.storage, codec=args.codec,
+                            archive_after_days=args.archive_after, profile=args.profile, readonly=args.readonly,
+                            memory_budget=memory_budget)
         print("Application initialized. Starting main loop...")
         root.mainloop()
         print("Application closed normally.")
@@ -0,0 +1,65 @@
+import csv
+import datetime
+
+import pytest
+
+# jacoobburger exits on import when the GUI packages are missing
+for module in ("tkinter", "ttkthemes", "ttkbootstrap", "matplotlib", "customtkinter"):
+    pytest.importorskip(module)
+
+import jacoobburger  # noqa: E402
+
+
+def make_dates(count):
+    start = datetime.date(2023, 1, 1)
+    return [(start + datetime.timedelta(days=i)).isoformat() for i in range(count)]
+
+
+def test_import_into_existing_days_under_memory_budget(tmp_path):
+    dates = make_dates(324)
+    data_manager = jacoobburger.DataManager(data_dir=str(tmp_path), archive_after_days=None)
+    data_manager.add_entries([
+        ("add_food", date, {"food": "Burger", "amount": 1, "calories": 500, "category": "Burgers", "kyle_tax": False})
+        for date in dates for _ in range(5)
+    ])
+    data_manager.compact_history()
+    data_manager.close()
+
+    log_file = tmp_path / "log.csv"
+    with open(log_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "food", "calories"])
+        for date in dates:
+            writer.writerow([date, "Imported", 123])
+
+    # Small enough that most months are evicted while the log is imported
+    data_manager = jacoobburger.DataManager(data_dir=str(tmp_path), archive_after_days=None, memory_budget=20000)
+    data_manager.import_log(str(log_file))
+    data_manager.close()
+
+    data_manager = jacoobburger.DataManager(data_dir=str(tmp_path), archive_after_days=None)
+    missing = [date for date in dates
+               if not any(entry["food"] == "Imported" for entry in data_manager.history[date]["food"])]
+    data_manager.close()
+    assert missing == []
+    assert all(len(data_manager.history[date]["food"]) == 6 for date in dates)
+
+
+def test_day_summaries_evicted_with_their_days(tmp_path):
+    dates = make_dates(324)
+    data_manager = jacoobburger.DataManager(data_dir=str(tmp_path), archive_after_days=None)
+    data_manager.add_entries([
+        ("add_food", date, {"food": "Burger", "amount": 1, "calories": 500, "category": "Burgers", "kyle_tax": False})
+        for date in dates
+    ])
+    data_manager.compact_history()
+    data_manager.close()
+
+    data_manager = jacoobburger.DataManager(data_dir=str(tmp_path), archive_after_days=None, memory_budget=20000)
+    for date in dates:
+        assert data_manager.day_summary(date).totals()
+    summarized = set(data_manager._day_summaries)
+    resident = set(data_manager.history.loaded_days())
+    data_manager.close()
+    assert summarized <= resident
+    assert len(summarized) < len(dates)